@@ -16,6 +16,8 @@ setuptools.setup(
     license="BSD",
     #install_requires=[], ORIGINAL LINE
     install_requires=['zmq','numpy','wxpython','matplotlib'],
+    # compressed (LZ4, bitshuffle/LZ4) Eiger images
+    extras_require={'lz4': ['lz4']},
     package_dir={"": "src"},
     #packages=["interceptor"], ORIGINAL LINE
     packages=find_packages(where='src'),
@@ -27,6 +29,14 @@ setuptools.setup(
             "intxr.connect = interceptor.command_line.connector_run:entry_point",
             "intxr.connect_mpi = "
             "interceptor.command_line.connector_run_mpi:entry_point",
+            "intxr.connect_mp = "
+            "interceptor.command_line.connector_run_mp:entry_point",
+            "intxr.record = "
+            "interceptor.command_line.stream_run:record_entry_point",
+            "intxr.replay = "
+            "interceptor.command_line.stream_run:replay_entry_point",
+            "intxr.benchmark = "
+            "interceptor.command_line.benchmark_run:entry_point",
         ],
         "gui_scripts": [
             "intxr.gui = interceptor.command_line.ui_run:entry_point",
@@ -36,6 +46,10 @@ setuptools.setup(
             "intxr.gui = intxr.gui",
             "intxr.connect = intxr.connect",
             "intxr.connect_mpi = intxr.connect_mpi",
+            "intxr.connect_mp = intxr.connect_mp",
+            "intxr.record = intxr.record",
+            "intxr.replay = intxr.replay",
+            "intxr.benchmark = intxr.benchmark",
         ],
     },
     scripts=[],
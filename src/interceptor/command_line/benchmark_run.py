@@ -0,0 +1,573 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : End-to-end benchmark of the processing pipeline on a single host.
+Launches a Collector, Readers (and a Connector, with --broker) like
+intxr.connect_mp, feeds them synthetic Eiger frames as the Splitter would, and
+receives the results as the UI would. Each fixed frame count is run as a series,
+and the sustained rate, end-to-end latency (frame sent to result received),
+dropped frames and CPU time per frame are written out as JSON. For example, to
+compare 8 Readers with and without the Connector on 1000 and 5000 frames:
+
+intxr.benchmark --readers 8 --frames 1000 5000 -o direct.json
+intxr.benchmark --readers 8 --frames 1000 5000 --broker -o broker.json
+
+Options that are not listed below (e.g. --credits, --zero_copy, --mpi_bind) are
+passed on to the launched processes.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import signal
+import sys
+import time
+import timeit
+from threading import Event, Thread
+
+import numpy as np
+import zmq
+
+from interceptor import __version__ as intxr_version
+from interceptor.command_line.connector_run import parse_command_args
+from interceptor.command_line.connector_run_mp import Launcher
+from interceptor.command_line.stream_run import parse_rate, read_startup_config
+from interceptor.connector.decoder import encode_image
+from interceptor.connector.output import ResultFormatter
+from interceptor.connector.stats import PERCENTILES
+from interceptor.connector.streams import Replayer
+
+# Eiger 4M
+SHAPE = (2167, 2070)
+
+# frame and series numbers in the result string (output_format)
+FRAME_PATTERN = re.compile(r"\bseries (-?\d+) frame (-?\d+)\b")
+
+
+def parse_benchmark_args():
+    parser = argparse.ArgumentParser(
+        prog="benchmark_run.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="End-to-end pipeline benchmark",
+        epilog=("\n{:-^70}\n".format("")),
+    )
+    parser.add_argument(
+        "-c",
+        "--config_file",
+        type=str,
+        default=None,
+        help='Provide a beamline-specific startup config filepath',
+    )
+    parser.add_argument(
+        "-b",
+        "--beamline", type=str, default='test',
+        help="Beamline of the startup config (its output_format must include the "
+             "series and frame numbers, and filename a custom key)",
+    )
+    parser.add_argument(
+        "--readers", type=int, default=4, help="Number of Readers")
+    parser.add_argument(
+        "--broker", action="store_true", default=False,
+        help="Run a Connector between the stream and the Readers")
+    parser.add_argument(
+        "--frames", type=int, nargs="+", default=[1000],
+        help="Frame count of each run (one series per run)")
+    parser.add_argument(
+        "--rate", type=parse_rate, default="max",
+        help="'max', 'original' (the frame time), or a fixed rate in Hz")
+    parser.add_argument(
+        "--shape", type=int, nargs=2, default=list(SHAPE),
+        help="Image size (rows, columns)")
+    parser.add_argument(
+        "--spots", type=int, default=300, help="Number of spots per image")
+    parser.add_argument(
+        "--compression",
+        type=str,
+        default="bs32-lz4",
+        choices=["", "lz4", "bs32-lz4"],
+        help="Image encoding",
+    )
+    parser.add_argument(
+        "--startup_timeout", type=float, default=60.0,
+        help="Seconds to wait for all Readers to connect")
+    parser.add_argument(
+        "--timeout", type=float, default=10.0,
+        help="End a run after this many seconds without a new result")
+    parser.add_argument(
+        "-o", "--output", type=str, default=None,
+        help="JSON report file (default: stdout)")
+    return parser
+
+
+def make_image(shape=SHAPE, n_spots=300, background=2.0, seed=0):
+    """ Poisson background with Gaussian spots on a regular grid of positions """
+    rng = np.random.default_rng(seed)
+    image = rng.poisson(background, size=shape).astype(np.uint32)
+    yy, xx = np.mgrid[-3:4, -3:4]
+    blob = (200 * np.exp(-(xx ** 2 + yy ** 2) / 2.0)).astype(np.uint32)
+    grid_y = np.arange(5, shape[0] - 5, 15)
+    grid_x = np.arange(5, shape[1] - 5, 15)
+    n_spots = min(n_spots, len(grid_y) * len(grid_x))
+    cells = rng.choice(len(grid_y) * len(grid_x), n_spots, replace=False)
+    for y, x in zip(grid_y[cells // len(grid_x)], grid_x[cells % len(grid_x)]):
+        image[y - 3: y + 4, x - 3: x + 4] += blob
+    return image
+
+
+def make_part(content):
+    """ JSON frame of an Eiger multipart (null-terminated, like the Splitter's) """
+    return json.dumps(content).encode('utf-8') + b"\x00"
+
+
+class SyntheticStream:
+    """ A series of identical synthetic Eiger frames (only the frame number
+    changes), with the interface of a StreamReader, so that it can be sent by a
+    Replayer """
+
+    def __init__(self, n_frames, series=1, image=None, compression="bs32-lz4",
+                 payload=None, header_type="cbfToEiger-0.1", frame_time=0.01):
+        """ Constructor
+    :param n_frames: number of frames
+    :param series: series number
+    :param image: 2D uint32 image (default: make_image())
+    :param compression: '', 'lz4' or 'bs32-lz4'
+    :param payload: (optional) the image, already encoded with compression
+    :param header_type: htype of the series header (header_type in the config)
+    :param frame_time: frame time in the header (and the 'original' rate)
+    """
+        image = make_image() if image is None else image
+        height, width = image.shape
+        self.n_frames = n_frames
+        self.series = series
+        self.frame_time = frame_time
+        if payload is None:
+            payload = encode_image(image, compression=compression)
+        self.payload = payload
+        self.header = [
+            make_part({
+                "htype": header_type,
+                "header_detail": "basic",
+                "series": series,
+                "master_file": "benchmark_{:03d}_master.h5".format(series),
+                "mapping": "",
+                "reporting": "",
+            }),
+            make_part({
+                "description": "Synthetic {}x{}".format(width, height),
+                "beam_center_x": width / 2.0,
+                "beam_center_y": height / 2.0,
+                "detector_distance": 0.15,
+                "wavelength": 0.98,
+                "x_pixel_size": 7.5e-05,
+                "y_pixel_size": 7.5e-05,
+                "x_pixels_in_detector": width,
+                "y_pixels_in_detector": height,
+                "count_time": frame_time,
+                "frame_time": frame_time,
+                "nimages": n_frames,
+            }),
+        ]
+        self.dimensions = make_part({
+            "htype": "dimage_d-1.0",
+            "shape": [width, height],
+            "type": "uint32",
+            "encoding": compression + "<",
+            "size": len(self.payload),
+        })
+        self.config = make_part({
+            "htype": "dconfig-1.0", "real_time": 0, "start_time": 0, "stop_time": 0,
+        })
+
+    def __len__(self):
+        return self.n_frames
+
+    @property
+    def times(self):
+        return np.arange(self.n_frames) * self.frame_time
+
+    def read(self, i):
+        """ Frames of message i (frame number i + 1) """
+        frame_header = make_part({
+            "htype": "dimage-1.0", "series": self.series, "frame": i + 1, "hash": "",
+        })
+        return self.header + [frame_header, self.dimensions, self.payload,
+                              self.config]
+
+
+def legacy_make_result_string(cfg, info):
+    """ Per-frame implementation of Collector.make_result_string before the
+    output format was precompiled; kept as the reference for formatting_cost
+    (and for the output the precompiled formatter has to match) """
+    # Collect results and errors
+    err_list = [
+        info[e] for e in info if ("error" in e or "comment" in e) and info[e] != ""
+    ]
+    errors = "; ".join(err_list)
+    results = (
+        "{0} {1} {2} {3:.2f} {4} "
+        "{5:.2f} {6} {7} {{{8}}}"
+        "".format(
+            info["n_spots"],  # number_of_spots
+            info["n_overloads"],  # number_of_spots_with_overloaded_pixels
+            info["score"],  # composite score (used to be n_indexed...)
+            info["hres"],  # high resolution boundary
+            info["n_ice_rings"],  # number_of_ice-rings
+            info["mean_shape_ratio"],  # mean spot shape ratio
+            info["sg"],  # space group
+            info["uc"],  # unit cell
+            errors,  # errors
+        )
+    )
+
+    # read out config format (if no path specified, read from default config file)
+    if cfg.getstr('output_delimiter') is not None:
+        delimiter = '{} '.format(cfg.getstr('output_delimiter'))
+    else:
+        delimiter = ' '
+    format_keywords = cfg.getstr('output_format').split(',')
+    format_keywords = [i.strip() for i in format_keywords]
+
+    # assemble and return message to UI
+    try:
+        ui_msg = info[cfg.getstr('output_prefix_key')]
+    except KeyError:
+        ui_msg = ''
+    if ui_msg == '':
+        ui_msg = cfg.getstr('default_output_prefix')
+    ui_msg += ' '
+    for kw in format_keywords:
+        keyword = kw
+        bracket = None
+        brackets = ['{}', '()', '[]']
+        split_kw = kw.split(' ')
+        if len(split_kw) == 2 and split_kw[1] in brackets:
+            keyword = split_kw[0]
+            bracket = split_kw[1]
+        try:
+            if kw.startswith('[') and kw.endswith(']'):
+                keyword = ''
+                value = info[kw[1:-1]]
+            elif 'result' in keyword:
+                value = results
+            else:
+                value = info[keyword]
+        except KeyError as e:
+            raise e
+        else:
+            if keyword == '':
+                item = value
+            elif bracket:
+                item = '{0} {1}{2}{3}'.format(keyword, bracket[0],
+                                              value, bracket[1])
+            else:
+                item = '{0} {1}'.format(keyword, value)
+            if format_keywords.index(kw) == len(format_keywords) - 1:
+                delimiter = ''
+            ui_msg += item + delimiter
+    return ui_msg
+
+
+def sample_result():
+    """ Result of a processed frame, as the Collector receives it """
+    return {
+        "proc_name": "ZMQ_001", "series": 1, "frame": 1, "n_spots": 300,
+        "n_overloads": 0, "score": 3, "hres": 2.75, "n_ice_rings": 0,
+        "mean_shape_ratio": 1.2, "sg": "NA", "uc": "NA", "mapping": "",
+        "comment": "", "filename": "benchmark_001_master.h5",
+    }
+
+
+def formatting_cost(cfg, info=None, number=2000):
+    """ Per-frame cost of rendering a result string (in usec), with the
+    precompiled ResultFormatter and with the legacy implementation """
+    info = info or sample_result()
+    formatter = ResultFormatter(cfg)
+    legacy = timeit.timeit(lambda: legacy_make_result_string(cfg, info),
+                           number=number)
+    precompiled = timeit.timeit(lambda: formatter.render(info), number=number)
+    return {
+        "legacy": legacy / number * 1e6,
+        "precompiled": precompiled / number * 1e6,
+    }
+
+
+def process_cpu_time(pid):
+    """ User and system CPU time of a process (all threads) in seconds, from
+    /proc (Linux); None where it can't be read """
+    try:
+        with open('/proc/{}/stat'.format(pid)) as fh:
+            fields = fh.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def summarize_latency(latencies):
+    """ Mean, maximum and percentiles of end-to-end latencies in seconds """
+    if not len(latencies):
+        return {}
+    summary = {"mean": float(np.mean(latencies)), "max": float(np.max(latencies))}
+    for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+        summary["p{}".format(p)] = float(value)
+    return summary
+
+
+class ResultReceiver(Thread):
+    """ Receives the result strings the Collector sends to the UI, and keeps the
+    time each (series, frame) result came in """
+
+    def __init__(self, socket):
+        Thread.__init__(self, daemon=True)
+        self.socket = socket
+        self.received = {}
+        self.n_unmatched = 0
+        self.stopped = Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            if not self.socket.poll(timeout=100):
+                continue
+            message = self.socket.recv_string()
+            now = time.time()
+            match = FRAME_PATTERN.search(message)
+            if match is None:
+                self.n_unmatched += 1
+                continue
+            key = (int(match.group(1)), int(match.group(2)))
+            self.received.setdefault(key, now)
+
+    def series_times(self, series):
+        """ Result times of a series, by frame number """
+        return {f: t for (s, f), t in list(self.received.items()) if s == series}
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Benchmark:
+    """ Runs the pipeline on synthetic frames: this process is the Splitter (a
+    PUSH socket for the Connector, or a ROUTER socket for Readers that connect
+    to it directly), and the UI (a PULL socket for the Collector's results); it
+    also follows the Collector status topic, which counts the results (processed
+    or skipped) that came in """
+
+    def __init__(self, args, extra_args=None):
+        self.args = args
+        self.cfg = read_startup_config(args)
+        self.port = self.cfg.getstr('port')
+        if not (self.cfg.getstr('uihost') and self.cfg.getstr('uiport')):
+            raise ValueError("the benchmark receives results on uihost:uiport, "
+                             "which are not set in the startup config")
+        if not self.cfg.getfloat('status_interval', fallback=0):
+            raise ValueError("the benchmark follows the Collector status topic, "
+                             "which is off (status_interval)")
+
+        argv = ['-b', args.beamline] + (extra_args or [])
+        if args.config_file:
+            argv += ['-c', args.config_file]
+        if args.broker:
+            argv.append('--broker')
+        self.proc_args, _ = parse_command_args().parse_known_args(argv)
+        self.proc_args.n_proc = args.readers + 1 + int(args.broker)
+        self.mode = "push" if args.broker else "router"
+
+        self.context = None
+        self.launcher = None
+        self.status = {}
+        self.image = make_image(shape=tuple(args.shape), n_spots=args.spots)
+        self.payload = encode_image(self.image, compression=args.compression)
+
+    def initialize_zmq_sockets(self):
+        self.context = zmq.Context()
+        self.source = self.context.socket(
+            zmq.PUSH if self.mode == "push" else zmq.ROUTER)
+        self.source.bind("tcp://*:{}".format(self.port))
+        self.ui_socket = self.context.socket(zmq.PULL)
+        self.ui_socket.bind("tcp://*:{}".format(self.cfg.getstr('uiport')))
+        self.status_socket = self.context.socket(zmq.SUB)
+        self.status_socket.setsockopt(zmq.SUBSCRIBE, b"status")
+        self.status_socket.connect("tcp://localhost:4{}".format(self.port[1:]))
+
+    def close_sockets(self):
+        for socket in (self.source, self.ui_socket, self.status_socket):
+            socket.close(linger=0)
+        self.context.term()
+
+    def read_status(self, timeout):
+        """ Waits for the next Collector status (up to timeout sec)
+        :return: True if one came in
+        """
+        if not self.status_socket.poll(timeout=timeout * 1000):
+            return False
+        _, message = self.status_socket.recv_multipart()
+        self.status = json.loads(message.decode('utf-8'))
+        return True
+
+    def wait_for_readers(self):
+        deadline = time.time() + self.args.startup_timeout
+        while time.time() < deadline:
+            if self.read_status(timeout=1) and len(
+                    self.status['readers']) >= self.args.readers:
+                return
+        raise RuntimeError("{} of {} Readers connected within {} sec".format(
+            len(self.status.get('readers', {})), self.args.readers,
+            self.args.startup_timeout))
+
+    def cpu_times(self):
+        """ CPU time of each launched process, by role """
+        times = {}
+        for rank, process in enumerate(self.launcher.processes):
+            if rank == 0:
+                role = "collector"
+            elif rank == 1 and self.args.broker:
+                role = "connector"
+            else:
+                role = "readers"
+            cpu = process_cpu_time(process.pid)
+            if cpu is not None:
+                times[role] = times.get(role, 0) + cpu
+        return times
+
+    def run_series(self, series, n_frames):
+        """ Sends n_frames as one series, and waits until the Collector has all
+        the results (or none came in within the timeout) """
+        stream = SyntheticStream(
+            n_frames, series=series, image=self.image,
+            compression=self.args.compression, payload=self.payload,
+            header_type=self.cfg.getstr('header_type'))
+        replayer = Replayer(stream, rate=self.args.rate)
+        start_frames = self.status.get('total_frames', 0)
+        start_sampled = self.status.get('total_sampled', 0)
+        start_cpu = self.cpu_times()
+
+        sent = replayer.replay(self.source, mode=self.mode,
+                               timeout=self.args.timeout)
+        last_change = time.time()
+        collected = 0
+        while time.time() - last_change < self.args.timeout:
+            if not self.read_status(timeout=self.args.timeout):
+                break
+            n = self.status['total_frames'] - start_frames
+            if n != collected:
+                collected = n
+                last_change = time.time()
+            if collected >= sent['sent']:
+                break
+        processed = self.status['total_sampled'] - start_sampled
+
+        # the UI results of processed frames may trail the status a little
+        deadline = time.time() + self.args.timeout
+        while len(self.receiver.series_times(series)) < processed and (
+                time.time() < deadline):
+            time.sleep(0.05)
+        end_cpu = self.cpu_times()
+        return self.make_report(series, replayer, sent, collected, processed,
+                                start_cpu, end_cpu)
+
+    def make_report(self, series, replayer, sent, collected, processed,
+                    start_cpu, end_cpu):
+        result_times = self.receiver.series_times(series)
+        frames = np.array(sorted(result_times), dtype=int)
+        frames = frames[(frames >= 1) & (frames <= len(replayer.send_times))]
+        received = np.array([result_times[f] for f in frames])
+        latencies = received - replayer.send_times[frames - 1]
+
+        start = replayer.send_times[0] if len(replayer.send_times) else 0
+        elapsed = (received.max() - start) if len(received) else sent['elapsed']
+        cpu = {role: end_cpu[role] - start_cpu.get(role, 0) for role in end_cpu}
+        total_cpu = sum(cpu.values())
+        return {
+            "series": series,
+            "frames": len(replayer.reader),
+            "sent": sent['sent'],
+            "send_rate": sent['rate'],
+            "collected": collected,
+            "processed": processed,
+            "skipped": collected - processed,
+            "dropped": sent['sent'] - collected,
+            "elapsed": elapsed,
+            "rate": collected / elapsed if elapsed > 0 else 0,
+            "processed_rate": processed / elapsed if elapsed > 0 else 0,
+            "latency": summarize_latency(latencies),
+            "stage_latency": self.status.get('latency', {}).get('global', {}),
+            "cpu": cpu,
+            "cpu_per_frame": total_cpu / collected if collected else None,
+        }
+
+    def make_config(self):
+        return {
+            "beamline": self.args.beamline,
+            "readers": self.args.readers,
+            "broker": self.args.broker,
+            "rate": self.args.rate,
+            "shape": list(self.args.shape),
+            "spots": self.args.spots,
+            "compression": self.args.compression,
+            "payload_size": len(self.payload),
+            "process_args": {k: v for k, v in vars(self.proc_args).items()
+                             if isinstance(v, (str, int, float, bool, list))},
+        }
+
+    def run(self):
+        """ Launches the processes, runs each frame count as a series
+        :return: report (dictionary)
+        """
+        report = {
+            "version": intxr_version,
+            "time": time.time(),
+            "host": platform.node(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "config": self.make_config(),
+            "formatting": formatting_cost(self.cfg),
+            "runs": [],
+        }
+        print("*** Result formatting: {legacy:.2f} usec (legacy), {precompiled:.2f} "
+              "usec (precompiled) per frame".format(**report['formatting']),
+              flush=True)
+        self.initialize_zmq_sockets()
+        self.receiver = ResultReceiver(self.ui_socket)
+        self.receiver.start()
+        self.launcher = Launcher(self.proc_args)
+        self.launcher.n_proc = self.proc_args.n_proc
+        try:
+            self.launcher.start()
+            self.wait_for_readers()
+            for series, n_frames in enumerate(self.args.frames, start=1):
+                run = self.run_series(series, n_frames)
+                print("*** {} frames: {:.1f} Hz, latency p50 {:.3f} / p99 {:.3f} "
+                      "sec, {} dropped".format(
+                          n_frames, run['rate'], run['latency'].get('p50', 0),
+                          run['latency'].get('p99', 0), run['dropped']),
+                      flush=True)
+                report['runs'].append(run)
+        finally:
+            self.launcher.shutdown()
+            self.receiver.stop()
+            self.close_sockets()
+        return report
+
+
+def entry_point():
+    args, extra_args = parse_benchmark_args().parse_known_args()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    report = Benchmark(args, extra_args=extra_args).run()
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + "\n")
+        print("*** Benchmark report written to {}".format(args.output))
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    entry_point()
+
+# -- end
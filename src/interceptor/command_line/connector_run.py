@@ -23,7 +23,12 @@ import argparse
 
 from interceptor import __version__ as intxr_version
 from interceptor import packagefinder
-from interceptor.connector.connector import Connector, Reader, Collector
+from interceptor.connector.connector import (
+    Connector,
+    Reader,
+    Collector,
+    AsyncCollector,
+)
 
 
 class ExpandPresets(argparse.Action):
@@ -135,19 +140,60 @@ def parse_command_args():
         default=False,
         help="Insert a broker in between Readers and Splitter",
     )
+    parser.add_argument(
+        "--async_collector",
+        action="store_true",
+        default=False,
+        help="Run the Collector in a single asyncio event loop",
+    )
     parser.add_argument(
         "--drain",
         action="store_true",
         default=False,
         help="In True, will not process received images; used for testing",
     )
+    parser.add_argument(
+        "--credits",
+        type=int,
+        default=0,
+        help="Number of frame requests each Reader keeps outstanding (DEALER "
+             "mode); if 0, Readers request one frame at a time (REQ mode)",
+    )
+    parser.add_argument(
+        "--zero_copy",
+        action="store_true",
+        default=False,
+        help="Receive frames without copying; image data is passed to the "
+             "processor as memoryviews on the ZMQ frames",
+    )
 
     return parser
 
 
+def expand_cpu_list(mpi_bind):
+    """ Expands a list of CPU ranges (as given with --mpi_bind) into CPU ids
+    :param mpi_bind: list of strings, e.g. ['0,', '3,', '24-47,', '72-191']
+    :return: list of integer CPU ids
+    """
+    cpus = []
+    for item in mpi_bind:
+        for rng in [r for r in item.split(',') if r]:
+            bounds = rng.split('-')
+            if len(bounds) == 2:
+                cpus.extend(range(int(bounds[0]), int(bounds[1]) + 1))
+            else:
+                cpus.append(int(bounds[0]))
+    return cpus
+
+
+def get_collector_class(args):
+    return AsyncCollector if args.async_collector else Collector
+
+
 def entry_point():
     args, _ = parse_command_args().parse_known_args()
     localhost = 'localhost'
+    collector = get_collector_class(args)
     if args.rank == -999:
         try:
             from mpi4py import MPI
@@ -158,7 +204,7 @@ def entry_point():
             rank = comm_world.Get_rank()
             localhost = MPI.Get_processor_name().split('.')[0]
             if rank == 0:
-                script = Collector(comm=comm_world, args=args, localhost=localhost)
+                script = collector(comm=comm_world, args=args, localhost=localhost)
             elif rank == 1:
                 if args.broker:
                     script = Connector(comm=comm_world, args=args, localhost=localhost)
@@ -170,7 +216,7 @@ def entry_point():
             script.run()
     else:
         if args.rank == 0:
-            script = Collector(args=args, localhost=localhost)
+            script = collector(args=args, localhost=localhost)
         else:
             script = Reader(args=args, localhost=localhost)
         script.run()
@@ -0,0 +1,180 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Launches Interceptor processes on a single host with multiprocessing,
+as an alternative to mpirun. Takes the same options as intxr.connect; rank 0 is
+the Collector, rank 1 the Connector (if --broker is on), all others are Readers.
+For example, to run a Collector, a Connector and 58 Readers bound to CPUs 2-61:
+
+intxr.connect_mp --mpi_bind 2-61 -b 12-1 --broker
+"""
+
+import copy
+import os
+import signal
+import sys
+import time
+import multiprocessing as mp
+
+from interceptor.command_line.connector_run import (
+    parse_command_args,
+    expand_cpu_list,
+    get_collector_class,
+)
+
+# modules imported once by the fork server, so that every process it forks starts
+# with numpy, ZMQ and the processor already loaded
+PRELOAD = [
+    'numpy',
+    'zmq',
+    'interceptor.connector.processor',
+    'interceptor.connector.connector',
+]
+
+
+def get_cpus(args):
+    if args.mpi_bind:
+        return expand_cpu_list(args.mpi_bind)
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return []
+
+
+def run_process(args, cpu=None):
+    """ Target of each launched process """
+    from interceptor.connector.connector import Connector, Reader
+
+    # the launcher shuts processes down in order (with SIGTERM); turn SIGTERM
+    # into a regular exit, and close the process in a finally block (atexit
+    # handlers are not run in processes forked by the fork server)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+    if args.rank == 0:
+        script = get_collector_class(args)(args=args, localhost='localhost')
+    elif args.rank == 1 and args.broker:
+        script = Connector(args=args, localhost='localhost')
+    else:
+        script = Reader(args=args, localhost='localhost')
+    try:
+        script.run()
+    finally:
+        script.close()
+
+
+def describe(rank, args):
+    if rank == 0:
+        return 'Collector'
+    elif rank == 1 and args.broker:
+        return 'Connector'
+    return 'Reader'
+
+
+class Launcher:
+    """ Spawns Collector, Connector and Readers from a forkserver, pins each to a
+    CPU, and terminates them cleanly on shutdown """
+
+    def __init__(self, args):
+        self.args = args
+        self.cpus = get_cpus(args)
+        self.n_proc = len(self.cpus) if args.mpi_bind else args.n_proc
+        self.context = mp.get_context('forkserver')
+        self.context.set_forkserver_preload(PRELOAD)
+        self.processes = []
+
+    def make_process_args(self, rank):
+        proc_args = copy.copy(self.args)
+        proc_args.rank = rank
+        proc_args.n_proc = self.n_proc
+        return proc_args
+
+    def start(self):
+        for rank in range(self.n_proc):
+            cpu = self.cpus[rank % len(self.cpus)] if self.cpus else None
+            if self.args.dry_run:
+                print('rank {:>3}: {:<9} (cpu {})'.format(
+                    rank, describe(rank, self.args), cpu))
+                continue
+            process = self.context.Process(
+                target=run_process,
+                args=(self.make_process_args(rank), cpu),
+                name='intxr_{}'.format(rank),
+            )
+            process.start()
+            self.processes.append(process)
+
+    def wait(self):
+        for process in self.processes:
+            process.join()
+
+    def shutdown_order(self):
+        """ Processes in the order they are shut down: Readers, then the Connector
+        (if any), then the Collector """
+        n_servers = 2 if self.args.broker else 1
+        return [
+            self.processes[n_servers:],
+            self.processes[1:n_servers],
+            self.processes[:1],
+        ]
+
+    @staticmethod
+    def stop(processes, timeout):
+        """ Terminates processes, and kills the ones still alive after timeout """
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.time() + timeout
+        for process in processes:
+            process.join(timeout=max(deadline - time.time(), 0))
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    def shutdown(self, timeout=5):
+        """ Terminates Readers first, then Connector and Collector; each group is
+        gone before the next one is terminated, so that the final results of the
+        Readers still reach the Collector """
+        for processes in self.shutdown_order():
+            self.stop(processes, timeout)
+
+        # remove temporary eiger_*.stream files
+        curdir = os.path.abspath(os.curdir)
+        for rank in range(self.n_proc):
+            tpath = os.path.join(curdir, 'eiger_{}.stream'.format(rank))
+            if os.path.exists(tpath):
+                os.remove(tpath)
+
+
+def entry_point():
+    args, _ = parse_command_args().parse_known_args()
+    start = time.time()
+    launcher = Launcher(args)
+    if args.dry_run:
+        launcher.start()
+        return
+
+    # SIGTERM to the launcher shuts down all processes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        launcher.start()
+        print("*** Started {} processes in {:.2f} sec".format(
+            launcher.n_proc, time.time() - start), flush=True)
+        launcher.wait()
+    except (KeyboardInterrupt, SystemExit):
+        print("\n*** Terminated")
+    finally:
+        launcher.shutdown()
+        print("*** Total runtime: {:.2f} sec".format(time.time() - start))
+        print("\n~~~ fin ~~~")
+
+
+if __name__ == "__main__":
+    entry_point()
+
+# -- end
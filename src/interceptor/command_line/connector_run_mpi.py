@@ -11,7 +11,7 @@ import os
 import time
 import procrunner
 
-from interceptor.command_line.connector_run import parse_command_args
+from interceptor.command_line.connector_run import parse_command_args, expand_cpu_list
 
 times = []
 
@@ -40,19 +40,8 @@ def make_mpi_command_line(args):
 
     # mpi command
     if args.mpi_bind:
-        estimated_nproc = 0
         ranges = [i.replace(',', '') for i in args.mpi_bind]
-        for r in ranges:
-            rng = r.split('-')
-            if isinstance(rng, list):
-                if len(rng) == 2:
-                    start = int(rng[0])
-                    end = int(rng[1])
-                    estimated_nproc += len(range(start, end + 1))
-                else:
-                    estimated_nproc += 1
-            else:
-                estimated_nproc += 1
+        estimated_nproc = len(expand_cpu_list(args.mpi_bind))
         cpus = ','.join(ranges)
         n_proc = estimated_nproc
         command = list(
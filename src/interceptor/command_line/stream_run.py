@@ -0,0 +1,178 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Records a ZMQ image stream into a container file, and replays a
+recorded stream. Host and port default to those of the beamline in the startup
+config. For example, to record 1000 messages from the beamline 12-1 stream:
+
+intxr.record -b 12-1 -n 1000 series.ixr
+
+and to replay them at twice the original rate to a Connector (intxr.connect
+--broker on the same port), or to Readers connected straight to the stream:
+
+intxr.replay -b 12-1 --speed 2 series.ixr
+intxr.replay -b 12-1 --mode router --rate 100 series.ixr
+"""
+
+import argparse
+import time
+
+import zmq
+
+from interceptor import packagefinder, read_config_file
+from interceptor.connector.streams import (
+    RATES,
+    Replayer,
+    StreamReader,
+    StreamWriter,
+    record_stream,
+)
+
+
+def parse_rate(value):
+    if value in RATES:
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "rate must be one of {} or a number (Hz)".format(", ".join(RATES)))
+
+
+def make_parser(prog, description):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=description,
+        epilog=("\n{:-^70}\n".format("")),
+    )
+    parser.add_argument("path", type=str, help="Stream container file")
+    parser.add_argument(
+        "-c",
+        "--config_file",
+        type=str,
+        default=None,
+        help='Provide a beamline-specific startup config filepath',
+    )
+    parser.add_argument(
+        "-b",
+        "--beamline", type=str, default='DEFAULT', help="Beamline of the experiment",
+    )
+    parser.add_argument(
+        "--port", type=str, default=None, help="Port (default: from config)")
+    return parser
+
+
+def parse_record_args():
+    parser = make_parser("stream_run.py", "Record a ZMQ image stream")
+    parser.add_argument(
+        "--host", type=str, default=None, help="Stream host (default: from config)")
+    parser.add_argument(
+        "--stype",
+        type=str,
+        default="pull",
+        choices=["pull", "req"],
+        help="'pull' for a stream that pushes (e.g. the detector), 'req' for one "
+             "that hands out a message per request (e.g. the Splitter)",
+    )
+    parser.add_argument(
+        "-n", "--n_messages", type=int, default=None,
+        help="Number of messages to record (default: until the stream goes idle)")
+    parser.add_argument(
+        "--timeout", type=float, default=None,
+        help="Stop after this many seconds without a message")
+    return parser
+
+
+def parse_replay_args():
+    parser = make_parser("stream_run.py", "Replay a recorded ZMQ image stream")
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="push",
+        choices=["push", "router"],
+        help="'push' to push messages (to a Connector), 'router' to hand out one "
+             "message per request (to Readers)",
+    )
+    parser.add_argument(
+        "--rate", type=parse_rate, default="original",
+        help="'original', 'max', or a fixed rate in Hz")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="Speed-up of the original rate")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Number of times to replay")
+    parser.add_argument(
+        "--wait", type=float, default=1.0,
+        help="Seconds to wait for receivers to connect before replaying")
+    parser.add_argument(
+        "--timeout", type=float, default=None,
+        help="In router mode, stop after this many seconds without a request")
+    return parser
+
+
+def read_startup_config(args):
+    if args.config_file:
+        s_config = read_config_file(args.config_file)
+    else:
+        s_config = packagefinder('startup.cfg', 'connector', read_config=True)
+    return s_config[args.beamline]
+
+
+def record_entry_point():
+    args = parse_record_args().parse_args()
+    cfg = read_startup_config(args)
+    url = "tcp://{}:{}".format(
+        args.host or cfg.getstr('host'), args.port or cfg.getstr('port'))
+
+    context = zmq.Context()
+    socket = context.socket(zmq.REQ if args.stype == "req" else zmq.PULL)
+    socket.connect(url)
+    print("Recording from {} into {}".format(url, args.path), flush=True)
+    start = time.time()
+    try:
+        with StreamWriter(args.path) as writer:
+            try:
+                record_stream(socket, writer, n_messages=args.n_messages,
+                              timeout=args.timeout,
+                              request=b"RECORDER" if args.stype == "req" else None)
+            except KeyboardInterrupt:
+                pass
+            n_recorded = writer.n_messages
+    finally:
+        socket.close(linger=0)
+        context.term()
+    print("Recorded {} messages in {:.1f} sec".format(
+        n_recorded, time.time() - start))
+
+
+def replay_entry_point():
+    args = parse_replay_args().parse_args()
+    cfg = read_startup_config(args)
+    port = args.port or cfg.getstr('port')
+
+    reader = StreamReader(args.path)
+    context = zmq.Context()
+    socket = context.socket(zmq.ROUTER if args.mode == "router" else zmq.PUSH)
+    socket.bind("tcp://*:{}".format(port))
+    print("Replaying {} messages from {} on port {} ({} mode, rate: {})".format(
+        len(reader), args.path, port, args.mode, args.rate), flush=True)
+    time.sleep(args.wait)
+    try:
+        stats = Replayer(reader, rate=args.rate, speed=args.speed,
+                         repeat=args.repeat).replay(socket, mode=args.mode,
+                                                    timeout=args.timeout)
+    except KeyboardInterrupt:
+        stats = None
+    finally:
+        socket.close(linger=10000)  # deliver what is still queued
+        context.term()
+        reader.close()
+    if stats:
+        print("Sent {} messages in {:.1f} sec ({:.1f} Hz)".format(
+            stats["sent"], stats["elapsed"], stats["rate"]))
+
+
+# -- end
@@ -0,0 +1,118 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Compact binary encoding of Reader results sent to the Collector
+"""
+
+import json
+import struct
+
+# Marks a binary-encoded message; JSON messages always start with '{' or '['
+MAGIC = b"IXR\x01"
+
+ENCODINGS = ["binary", "json"]
+
+# Numeric fields of proc_info / time_info that go into the fixed-size record;
+# a field is only packed if its value has the declared type (so that it decodes
+# to exactly the same value), otherwise it goes into the variable-length section
+FIELDS = [
+    ("series", "q"),
+    ("frame", "q"),
+    ("n_spots", "q"),
+    ("n_overloads", "q"),
+    ("n_ice_rings", "q"),
+    ("n_indexed", "q"),
+    ("sampled", "q"),
+    ("sampling_stride", "q"),
+    ("broker_backlog", "q"),
+    ("broker_dropped", "q"),
+    ("score", "q"),
+    ("hres", "d"),
+    ("mean_shape_ratio", "d"),
+    ("dist", "d"),
+    ("exposure_time", "d"),
+    ("t0", "d"),
+    ("receive_time", "d"),
+    ("wait_time", "d"),
+    ("parse_time", "d"),
+    ("decode_time", "d"),
+    ("spf_time", "d"),
+    ("ice_time", "d"),
+    ("proc_time", "d"),
+    ("total_time", "d"),
+]
+
+# presence bitmask, fixed fields, length of variable-length section
+RECORD = struct.Struct("<I" + "".join(fmt for _, fmt in FIELDS) + "I")
+COUNT = struct.Struct("<I")
+INT_RANGE = (-(2 ** 63), 2 ** 63)
+
+
+def _packable(value, fmt):
+    if isinstance(value, bool):
+        return False
+    if fmt == "q":
+        return isinstance(value, int) and INT_RANGE[0] <= value < INT_RANGE[1]
+    return isinstance(value, float)
+
+
+def encode_result(info):
+    """ Encodes a single result dictionary as a binary record
+    :param info: result (info) dictionary
+    :return: bytes
+    """
+    mask = 0
+    values = []
+    extra = dict(info)
+    for idx, (key, fmt) in enumerate(FIELDS):
+        value = extra.get(key)
+        if value is not None and _packable(value, fmt):
+            mask |= 1 << idx
+            values.append(value)
+            del extra[key]
+        else:
+            values.append(0)
+    var_bytes = json.dumps(extra).encode("utf-8") if extra else b""
+    return RECORD.pack(mask, *values, len(var_bytes)) + var_bytes
+
+
+def encode_results(infos):
+    """ Encodes a list of result dictionaries as one binary message """
+    records = [encode_result(info) for info in infos]
+    return MAGIC + COUNT.pack(len(records)) + b"".join(records)
+
+
+def decode_results(message):
+    """ Decodes a message from a Reader, which can be binary or JSON
+    :param message: bytes-like message
+    :return: list of result dictionaries
+    """
+    buffer = memoryview(message)
+    if buffer[: len(MAGIC)] != MAGIC:
+        decoded = json.loads(bytes(buffer).decode("utf-8"))
+        return decoded if isinstance(decoded, list) else [decoded]
+
+    offset = len(MAGIC)
+    (count,) = COUNT.unpack_from(buffer, offset)
+    offset += COUNT.size
+    infos = []
+    for _ in range(count):
+        unpacked = RECORD.unpack_from(buffer, offset)
+        offset += RECORD.size
+        mask, values, var_length = unpacked[0], unpacked[1:-1], unpacked[-1]
+        info = {}
+        if var_length:
+            var_bytes = bytes(buffer[offset: offset + var_length])
+            info.update(json.loads(var_bytes.decode("utf-8")))
+            offset += var_length
+        for idx, (key, _) in enumerate(FIELDS):
+            if mask & (1 << idx):
+                info[key] = values[idx]
+        infos.append(info)
+    return infos
+
+
+# -- end
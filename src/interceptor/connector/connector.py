@@ -3,19 +3,37 @@ from __future__ import absolute_import, division, print_function
 """
 Author      : Lyubimov, A.Y.
 Created     : 03/31/2020
-Last Changed: 05/15/2020
+Last Changed: 10/17/2026
 Description : Streaming stills processor for live data analysis
 """
 
+import asyncio
+import atexit
+import json
 import os
+import signal
+import sys
 import time
 import zmq
+import zmq.asyncio
 
-from threading import Thread
+from collections import deque
+from queue import Queue, Empty
+from threading import Thread, Lock, current_thread, main_thread
 
 from interceptor import packagefinder, read_config_file
 from interceptor.connector.processor import FastProcessor
-from interceptor.connector import utils
+from interceptor.connector.output import (
+    ResultFormatter,
+    RecordWriter,
+    ConsoleReporter,
+    make_frame_lines,
+    make_latency_lines,
+)
+from interceptor.connector.metrics import MetricsServer
+from interceptor.connector import (
+    utils, codec, overload, reconnect, shm_ring, stats
+)
 
 
 def debug_segfault():
@@ -25,9 +43,58 @@ def debug_segfault():
     ctypes.string_at(1)
 
 
+class SocketRegistry:
+    """ Owns the single ZMQ context of a process and every socket created from it.
+    Sockets are configured with common linger and high-water mark settings on
+    creation, and are closed in an orderly fashion on shutdown """
+
+    def __init__(self, io_threads=1, linger=1000, sndhwm=1000, rcvhwm=1000,
+                 use_asyncio=False):
+        """ Constructor
+    :param io_threads: number of ZMQ I/O threads for the process context
+    :param linger: socket linger period on close (msec)
+    :param sndhwm: send high-water mark (messages)
+    :param rcvhwm: receive high-water mark (messages)
+    :param use_asyncio: if True, create zmq.asyncio sockets
+    """
+        # zmq.Context.instance() returns the same context for the whole process
+        # (and a fresh one after a fork); io_threads only applies on first call
+        self.base_context = zmq.Context.instance(io_threads=io_threads)
+        self.context = self.base_context
+        if use_asyncio:
+            # asyncio sockets come from a shadow of the same underlying context
+            self.context = zmq.asyncio.Context.shadow(self.base_context)
+        self.linger = linger
+        self.sndhwm = sndhwm
+        self.rcvhwm = rcvhwm
+        self.sockets = {}
+
+    def socket(self, socket_type, wid):
+        socket = self.context.socket(getattr(zmq, socket_type.upper()))
+        socket.identity = wid.encode('ascii')
+        socket.setsockopt(zmq.LINGER, self.linger)
+        socket.setsockopt(zmq.SNDHWM, self.sndhwm)
+        socket.setsockopt(zmq.RCVHWM, self.rcvhwm)
+        self.sockets[id(socket)] = socket
+        return socket
+
+    def close(self, socket):
+        self.sockets.pop(id(socket), None)
+        if not socket.closed:
+            socket.close(linger=self.linger)
+
+    def shutdown(self):
+        for socket in list(self.sockets.values()):
+            self.close(socket)
+        if not self.base_context.closed:
+            self.base_context.term()
+
+
 class ZMQProcessBase:
     """ Base class for Connector, Reader, and Collector classes """
 
+    use_asyncio = False
+
     def __init__(self, comm, args, name="zmq_thread", localhost="localhost"):
         """ Constructor
     :param comm: mpi4py communication instance
@@ -50,6 +117,13 @@ class ZMQProcessBase:
         self.timeout_start = None
         self.args = args
         self.generate_config()
+        self.registry = SocketRegistry(
+            io_threads=self.cfg.getint('zmq_io_threads', fallback=1),
+            linger=self.cfg.getint('zmq_linger', fallback=1000),
+            sndhwm=self.cfg.getint('zmq_sndhwm', fallback=1000),
+            rcvhwm=self.cfg.getint('zmq_rcvhwm', fallback=1000),
+            use_asyncio=self.use_asyncio,
+        )
 
     def generate_config(self):
         # generate startup config params
@@ -61,8 +135,8 @@ class ZMQProcessBase:
         # convert to namedtuple because 1) not easily mutable, 2) can call attributes
         self.cfg = s_config[self.args.beamline]
 
-    @staticmethod
     def make_socket(
+            self,
             socket_type,
             wid,
             host=None,
@@ -70,6 +144,7 @@ class ZMQProcessBase:
             url=None,
             bind=False,
             verbose=False,
+            options=None,
     ):
         assert (host and port) or url
 
@@ -77,10 +152,10 @@ class ZMQProcessBase:
         if not url:
             url = "tcp://{}:{}".format(host, port)
 
-        # Create socket
-        context = zmq.Context()
-        socket = context.socket(getattr(zmq, socket_type.upper()))
-        socket.identity = wid.encode('ascii')
+        # Create socket from the shared per-process context
+        socket = self.registry.socket(socket_type, wid)
+        for option, value in (options or {}).items():
+            socket.setsockopt(option, value)
 
         # Connect to URL
         socket.connect(url)
@@ -100,6 +175,17 @@ class ZMQProcessBase:
 
         return socket
 
+    def close_socket(self, socket):
+        self.registry.close(socket)
+
+    def close_sockets(self):
+        """ Closes all sockets owned by this process and terminates the context """
+        self.registry.shutdown()
+
+    def close(self):
+        """ Releases everything the process holds (called on shutdown) """
+        self.close_sockets()
+
     def broadcast(self, data):
         if self.comm:
             self.comm.bcast(data, root=0)
@@ -107,22 +193,51 @@ class ZMQProcessBase:
 
 class Connector(ZMQProcessBase):
     """ A ZMQ Broker class, with a zmq.PULL backend (facing a zmq.PUSH Splitter) and
-    a zmq.ROUTER front end (facing zmq.REQ Readers). Is intended to a) get images
-    from Splitter and assign each image to the least-recently used (LRU) Reader,
-    b) handle start-up / shut-down signals, as well as type-of-processing signals
-    from Splitter, c) manage MPI processes, d) serve as a failpoint away from
-    Splitter, which is writing data to files """
+    a zmq.ROUTER front end (facing zmq.REQ or zmq.DEALER Readers). Is intended to
+    a) get images from Splitter and assign each image to the least-recently used
+    (LRU) Reader, b) handle start-up / shut-down signals, as well as
+    type-of-processing signals from Splitter, c) manage MPI processes, d) serve as
+    a failpoint away from Splitter, which is writing data to files """
 
     def __init__(self, name="CONN", comm=None, args=None, localhost="localhost"):
         super(Connector, self).__init__(
             name=name, comm=comm, args=args, localhost=localhost
         )
         self.initialize_ends()
-        self.readers = []
+
+        # LRU queue of ready readers (one routing envelope per requested frame)
+        self.readers = deque()
+
+        # bounded backlog of frames waiting for a ready reader
+        self.backlog = deque()
+        self.backlog_size = self.cfg.getint('broker_backlog', fallback=0)
+        self.drop_policy = self.cfg.getstr('broker_drop_policy', fallback='oldest')
+        self.drop_nth = self.cfg.getint('broker_drop_nth', fallback=10)
+        self.overflow_count = 0
+        self.counters = {
+            'received': 0, 'dispatched': 0, 'queued': 0, 'dropped': 0, 'shm': 0
+        }
+        self.last_drop_report = 0
+
+        # (optional) shared-memory ring for the image payloads of readers running
+        # on this host; readers that attach to it say so in their requests
+        self.ring = None
+        self.shm_readers = set()
+        self.shm_slots = {}  # ring slots held by each reader
+        n_slots = self.cfg.getint('broker_shm_slots', fallback=0)
+        if n_slots:
+            self.ring = shm_ring.FrameRing(
+                name=shm_ring.ring_name(self.wport),
+                n_slots=n_slots,
+                slot_size=self.cfg.getint(
+                    'broker_shm_slot_size', fallback=33554432),
+                create=True,
+            )
 
     def initialize_ends(self):
         """ initializes front- and backend sockets """
         wport = "6{}".format(str(self.cfg.getstr('port'))[1:])
+        self.wport = wport
         self.read_end = self.make_socket(
             socket_type="router",
             wid="{}_READ".format(self.name),
@@ -136,58 +251,263 @@ class Connector(ZMQProcessBase):
             host=self.cfg.getstr('host'),
             port=self.cfg.getstr('port'),
         )
+
+        # reader-down events from the Collector (which tracks reader heartbeats)
+        self.event_end = None
+        if self.cfg.getfloat('heartbeat_timeout', fallback=0):
+            self.event_end = self.make_socket(
+                socket_type="sub",
+                wid="{}_EVENTS".format(self.name),
+                host=self.localhost,
+                port="4{}".format(str(self.cfg.getstr('port'))[1:]),
+            )
+            self.event_end.setsockopt(zmq.SUBSCRIBE, b"reader-down")
         self.poller = zmq.Poller()
 
+    def dispatch(self, envelope, frames, received):
+        # the stamp (in place of the empty delimiter after the marker) tells the
+        # reader how long the frame waited here, and how many frames still wait
+        stamp = overload.make_stamp(
+            received, len(self.backlog), self.counters['dropped'])
+        if (
+                self.ring is not None
+                and envelope[0] in self.shm_readers
+                and len(frames) > 4
+        ):
+            # pass the image payload through shared memory, unless the ring is
+            # full (in which case the frame goes over TCP like any other)
+            descriptor = self.ring.write(frames[4])
+            if descriptor is not None:
+                slot = shm_ring.DESCRIPTOR.unpack(descriptor)[0]
+                self.shm_slots.setdefault(envelope[0], set()).add(slot)
+                rframes = envelope + [shm_ring.SHM_MARKER, stamp]
+                rframes.extend(frames[:4])
+                rframes.append(descriptor)
+                rframes.extend(frames[5:])
+                self.read_end.send_multipart(rframes)
+                self.counters['dispatched'] += 1
+                self.counters['shm'] += 1
+                return
+
+        rframes = envelope + [b"BROKER", stamp]
+        rframes.extend(frames)
+        self.read_end.send_multipart(rframes)
+        self.counters['dispatched'] += 1
+
+    def enqueue_frames(self, frames, received):
+        """ Places frames (and the time they were received) in the backlog; if
+        the backlog is full, the drop policy decides which frame is lost: 'oldest'
+        drops the oldest queued frame, 'newest' drops the incoming frame, and
+        'nth' admits only every Nth incoming frame (in place of the oldest queued
+        frame) while full """
+        if len(self.backlog) < self.backlog_size:
+            self.backlog.append((frames, received))
+            self.counters['queued'] += 1
+            return
+
+        self.overflow_count += 1
+        if self.backlog and (
+                self.drop_policy == 'oldest' or
+                (self.drop_policy == 'nth' and self.overflow_count % self.drop_nth == 0)
+        ):
+            dropped, _ = self.backlog.popleft()
+            self.backlog.append((frames, received))
+            self.counters['queued'] += 1
+        else:
+            dropped = frames
+        self.counters['dropped'] += 1
+        self.report_drop(dropped)
+
+    def report_drop(self, frames):
+        # report at most once a second, so that printing doesn't add to the overload
+        if time.time() - self.last_drop_report < 1:
+            return
+        self.last_drop_report = time.time()
+        try:
+            frame_no = utils.decode_frame_header(frames[2])["frame"]
+        except Exception:
+            frame_no = '?'
+        print(
+            "WARNING! NO READY READERS! Dropped frame #{} ({} dropped, {} queued, "
+            "{} in backlog)".format(
+                frame_no,
+                self.counters['dropped'],
+                self.counters['queued'],
+                len(self.backlog),
+            ),
+            flush=True,
+        )
+
+    def drop_reader(self, frames):
+        """ Handles a reader-down event from the Collector: the requests of the
+        reader are voided (so no more frames are routed to it), and the ring
+        slots it held are freed; if it comes back, its next request puts it
+        back in line """
+        event = json.loads(bytes(frames[1]).decode('utf-8'))
+        identity = event['reader'].encode('ascii')
+        self.readers = deque(e for e in self.readers if e[0] != identity)
+        slots = self.shm_slots.pop(identity, ())
+        for slot in slots:
+            self.ring.release(slot)
+        print("{} DOWN, no longer routing frames to it ({} ring slots freed)"
+              .format(event['reader'], len(slots)), flush=True)
+
+    def handle_request(self, request):
+        """ Handles a request from a reader; each request is a credit for one
+        frame, and is kept as the envelope the reply has to be routed with """
+        envelope, payload = request[:-1], request[-1]
+        payload, shm, acks = shm_ring.parse_request(payload)
+        if shm and self.ring is not None:
+            # reader is attached to the ring, and is done with these slots; a
+            # late ack from a dropped reader is ignored, as its slots were freed
+            # (and may already hold another reader's frame)
+            self.shm_readers.add(envelope[0])
+            held = self.shm_slots.get(envelope[0], set())
+            for slot in acks:
+                if slot in held:
+                    held.discard(slot)
+                    self.ring.release(slot)
+        if payload == b"Hello":
+            # (re)connected reader; requests from its old socket are void, and
+            # so are the slots it held (replies to them may have been discarded)
+            self.readers = deque(e for e in self.readers if e[0] != envelope[0])
+            if self.ring is not None:
+                for slot in self.shm_slots.pop(envelope[0], ()):
+                    self.ring.release(slot)
+        if self.backlog:
+            frames, received = self.backlog.popleft()
+            self.dispatch(envelope, frames, received)
+        else:
+            self.readers.append(envelope)
+
     def connect_readers(self):
         # register backend and frontend with poller
         self.poller.register(self.read_end, zmq.POLLIN)
         self.poller.register(self.data_end, zmq.POLLIN)
+        if self.event_end is not None:
+            self.poller.register(self.event_end, zmq.POLLIN)
 
         while True:
             sockets = dict(self.poller.poll())
             if self.read_end in sockets:
-                # handle worker activity
-                request = self.read_end.recv_multipart()
-                if not request[0] in self.readers:
-                    self.readers.append(request[0])
+                self.handle_request(self.read_end.recv_multipart())
 
             if self.data_end in sockets:
-                # Receive frames and assign to readers
-                frames = self.data_end.recv_multipart()
+                # Receive frames and assign to least-recently used reader (with
+                # the ring on, the payload is only copied once, into the ring)
+                frames = self.data_end.recv_multipart(copy=self.ring is None)
+                received = time.time()
+                self.counters['received'] += 1
                 if self.readers:
-                    reader = self.readers.pop()
-                    rframes = [reader, b"", b"BROKER", b""]
-                    rframes.extend(frames)
-                    self.read_end.send_multipart(rframes)
+                    self.dispatch(self.readers.popleft(), frames, received)
                 else:
-                    frmdict = utils.decode_frame_header(frames[2])
-                    print(
-                        "WARNING! NO READY READERS! Skipping frame #", frmdict["frame"]
-                    )
+                    self.enqueue_frames(frames, received)
+
+            if self.event_end is not None and self.event_end in sockets:
+                self.drop_reader(self.event_end.recv_multipart())
 
     def run(self):
-        self.connect_readers()
+        try:
+            self.connect_readers()
+        finally:
+            self.close_sockets()
+            if self.ring is not None:
+                self.ring.close()
 
 
 class Reader(ZMQProcessBase):
-    """ ZMQ Reader: requests a single frame (multipart) from the Eiger,
-      converts to dictionary format, attaches to a special format class,
-      carries out processing, and sends the result via ZMQ connection to the
-      Collector class.
+    """ ZMQ Reader: requests a single frame (multipart) from the Eiger (or keeps
+      several requests outstanding in credit mode), converts to dictionary format,
+      attaches to a special format class, carries out processing, and sends the
+      result via ZMQ connection to the Collector class.
   """
 
     def __init__(self, name="zmq_reader", comm=None, args=None, localhost="localhost"):
         super(Reader, self).__init__(
             name=name, comm=comm, args=args, localhost=localhost
         )
+        self.zero_copy = self.args.zero_copy
+        self.credits = self.args.credits
+        self.outstanding = 0  # requests sent and not yet answered with a frame
+
+        # results are sent to the Collector in batches, flushed on size or deadline
+        self.batch_size = self.cfg.getint('result_batch_size', fallback=1)
+        self.batch_timeout = self.cfg.getfloat('result_batch_timeout', fallback=0.02)
+        self.result_batch = []
+        self.batch_deadline = None
+        self.encoding = self.cfg.getstr('result_encoding', fallback='json')
+        if self.encoding not in codec.ENCODINGS:
+            self.encoding = 'json'
+        self.header_cache = {}
+
+        # staged mode: receive/decode, processing and sending run in separate
+        # threads connected by bounded queues
+        self.n_proc_threads = self.cfg.getint('reader_proc_threads', fallback=0)
+        self.stage_queue_size = self.cfg.getint('reader_queue_size', fallback=4)
+        self.occupancy_interval = self.cfg.getfloat(
+            'occupancy_report_interval', fallback=10.0)
+        self.frame_queue = None
+        self.result_queue = None
+        self.stage_threads = []
+        self.stage_busy = {'receive': 0.0, 'process': 0.0, 'send': 0.0}
+        self.stage_lock = Lock()
+
+        # shared-memory ring (broker mode, same host as the Connector): slots
+        # the Reader is done with are acknowledged with its next request
+        self.use_ring = self.args.broker and self.cfg.getint(
+            'broker_shm_slots', fallback=0) > 0
+        self.ring = None
+        self.last_ring_attempt = 0
+        self.frame_slot = None
+        self.released_slots = deque()
+
+        # overload mode: when frames arrive late (or pile up), only every Nth
+        # frame is processed; the others are reported as not sampled
+        self.overload = None
+        if self.cfg.getboolean('overload_control', fallback=False):
+            self.overload = overload.OverloadController(
+                max_latency=self.cfg.getfloat('overload_max_latency', fallback=2.0),
+                max_backlog=self.cfg.getint('overload_max_backlog', fallback=10),
+                max_stride=self.cfg.getint('overload_max_stride', fallback=8),
+                window=self.cfg.getint('overload_window', fallback=10),
+            )
+        self.frame_stamp = None
+
+        # serialize / send times of result batches (per frame), reported to the
+        # Collector at an interval (other stage times travel with each result)
+        self.latency_interval = self.cfg.getfloat(
+            'latency_report_interval', fallback=10.0)
+        self.send_latency = stats.StageHistograms(stages=['serialize', 'send'])
+        self.last_latency_report = time.time()
+
+        # heartbeats tell the Collector that this Reader is alive
+        self.heartbeat_interval = self.cfg.getfloat('heartbeat_interval', fallback=0)
+        self.heartbeat_thread = None
+        self.busy = False  # processing a frame (outside of staged mode)
+
+        # waiting for frames: the timeout (read once) grows while the stream is
+        # idle, and the Reader asks again after each timeout
+        timeout = self.cfg.getstr('timeout')
+        self.reconnector = reconnect.Reconnector(
+            timeout=float(timeout) if timeout else None,
+            max_timeout=self.cfg.getfloat('reconnect_max_timeout', fallback=30.0),
+            factor=self.cfg.getfloat('reconnect_backoff', fallback=2.0),
+        )
+        self.n_frames = 0
+        self.last_frame = 0
+        self.last_result = 0
+
         self.generate_processor()
 
-    def generate_processor(self, run_mode='DEFAULT'):
-        self.processor = FastProcessor(
+    def make_processor(self, run_mode='DEFAULT'):
+        return FastProcessor(
             run_mode=run_mode,
             configfile=self.cfg.getstr('processing_config_file'),
             test=self.args.test,
         )
+
+    def generate_processor(self, run_mode='DEFAULT'):
+        self.processor = self.make_processor(run_mode=run_mode)
         if self.rank == 2:
             self.processor.print_params()
 
@@ -214,6 +534,7 @@ class Reader(ZMQProcessBase):
                 img_info["dat_error"] = 'DATA ERROR: Invalid entry: no "hdict" key!'
             else:
                 if "dseries_end" in fdict["htype"]:
+                    self.header_cache.clear()
                     img_info["state"] = "series-end"
                 elif self.cfg.getstr('header_type') in fdict["htype"]:
                     try:
@@ -230,27 +551,11 @@ class Reader(ZMQProcessBase):
             img_frames = frames[2:]
             self.make_header(frames=hdr_frames)
             try:
-                # Get custom keys (if any) from header
-                hdict = utils.decode_header(header=self.header[0])
-                custom_keys_string = self.cfg.getstr('custom_keys')
-                if custom_keys_string is not None:
-                    custom_keys = [k.strip() for k in custom_keys_string.split(',')]
-                    for ckey in custom_keys:
-                        if ckey == self.cfg.getstr('filepath_key'):
-                            img_info['filename'] = os.path.basename(hdict[ckey])
-                            img_info['full_path'] = hdict[ckey]
-                        else:
-                            if self.cfg.getstr('run_mode_key') in ckey:
-                                p_idx = self.cfg.getint('run_mode_key_index')
-                                img_info["run_mode"] = hdict[ckey].split('.')[p_idx]
-                            img_info[ckey] = hdict[ckey]
-
-                # Get exposure time (frame time) from header
-                hdict_1 = utils.decode_frame(frame=self.header[1])
-                img_info['exposure_time'] = float(hdict_1['frame_time'])
+                # Get series info from header (parsed once per series)
+                img_info.update(self.parse_header())
 
                 # Get frame info from frame
-                fdict = utils.decode_frame_header(img_frames[0][:-1])
+                fdict = utils.decode_frame_header(img_frames[0])
                 img_info.update(
                     {"series": fdict["series"], "frame": fdict["frame"], }
                 )
@@ -261,6 +566,38 @@ class Reader(ZMQProcessBase):
                 img_info["dat_error"] = "CONVERSION ERROR: {}".format(str(e))
         return img_info, return_frames
 
+    def parse_header(self):
+        """ Extracts series-level info (custom keys, run mode, file path and
+        exposure time) from the current header; parsed values are cached under
+        the raw header bytes, so the JSON is only decoded once per series """
+        key = (self.header[0], self.header[1])
+        series_info = self.header_cache.get(key)
+        if series_info is not None:
+            return series_info
+
+        series_info = {}
+        # Get custom keys (if any) from header
+        hdict = utils.decode_header(header=self.header[0])
+        custom_keys_string = self.cfg.getstr('custom_keys')
+        if custom_keys_string is not None:
+            custom_keys = [k.strip() for k in custom_keys_string.split(',')]
+            for ckey in custom_keys:
+                if ckey == self.cfg.getstr('filepath_key'):
+                    series_info['filename'] = os.path.basename(hdict[ckey])
+                    series_info['full_path'] = hdict[ckey]
+                else:
+                    if self.cfg.getstr('run_mode_key') in ckey:
+                        p_idx = self.cfg.getint('run_mode_key_index')
+                        series_info["run_mode"] = hdict[ckey].split('.')[p_idx]
+                    series_info[ckey] = hdict[ckey]
+
+        # Get exposure time (frame time) from header
+        hdict_1 = utils.decode_frame(frame=self.header[1])
+        series_info['exposure_time'] = float(hdict_1['frame_time'])
+
+        self.header_cache[key] = series_info
+        return series_info
+
     def make_header(self, frames):
         if isinstance(frames[0], bytes):
             self.header = [frames[0][:-1], frames[1][:-1]]
@@ -273,13 +610,14 @@ class Reader(ZMQProcessBase):
             data = None
         else:
             data = {"header1": self.header[0], "header2": self.header[1]}
-            for frm in frames:
-                i = frames.index(frm) + 1
+            for i, frm in enumerate(frames, start=1):
                 key = "streamfile_{}".format(i)
-                if i != 3:
-                    data[key] = frm[:-1] if isinstance(frm, bytes) else frm.bytes[:-1]
+                if self.zero_copy:
+                    # memoryview slices share memory with the received ZMQ frames
+                    data[key] = utils.frame_buffer(frm, strip_null=(i != 3))
                 else:
-                    data[key] = frm if isinstance(frm, bytes) else frm.bytes
+                    frm = frm if isinstance(frm, bytes) else frm.bytes
+                    data[key] = frm[:-1] if i != 3 else frm
 
         proc_info = {
             "beamXY": (0, 0),
@@ -291,6 +629,8 @@ class Reader(ZMQProcessBase):
             "n_ice_rings": 0,
             "mean_shape_ratio": 0,
             "n_indexed": 0,
+            "sampled": 1,
+            "sampling_stride": 1,
             "sg": "NA",
             "uc": "NA",
             "comment": "",
@@ -298,17 +638,33 @@ class Reader(ZMQProcessBase):
             "phil": "",
         }
         info.update(proc_info)
+        if self.frame_stamp is not None:
+            _, info["broker_backlog"], info["broker_dropped"] = self.frame_stamp
 
         return data, info
 
-    def process(self, info, frame, filename):
-        s_proc = time.time()
-        # regenerate processor if necessary
-        if info['run_mode'] != self.processor.run_mode:
-            self.generate_processor(run_mode=info['run_mode'])
+    def process(self, info, frame, filename, processor=None, time_info=None):
+        if processor is None:
+            # regenerate processor if necessary
+            if info['run_mode'] != self.processor.run_mode:
+                self.generate_processor(run_mode=info['run_mode'])
+            processor = self.processor
+
+        # decode image payload (timed separately from processing)
+        s_dec = time.time()
+        try:
+            frame = processor.decode(frame)
+        except Exception as e:
+            info["dec_error"] = "DECODING ERROR: {}".format(e)
+            info["proc_time"] = 0
+            return info
+        finally:
+            if time_info is not None:
+                time_info["decode_time"] = time.time() - s_dec
 
         # process image
-        info = self.processor.run(data=frame, filename=filename, info=info)
+        s_proc = time.time()
+        info = processor.run(data=frame, filename=filename, info=info)
         info["proc_time"] = time.time() - s_proc
         return info
 
@@ -322,30 +678,19 @@ class Reader(ZMQProcessBase):
 
     def initialize_zmq_sockets(self, init_r_socket=True):
         try:
-            # If the Connector is active, connect the Reader socket to the Connector;
-            # if not, connect the Reader socket to the Splitter
-            if self.args.broker:
-                dhost = self.localhost
-                dport = "6{}".format(str(self.cfg.getstr('port'))[1:])
-            else:
-                dhost = self.cfg.getstr('host')
-                dport = self.cfg.getstr('port')
+            dhost, dport = self.data_address()
             self.d_socket = self.make_socket(
-                socket_type="req",
+                socket_type="dealer" if self.credits else "req",
                 wid=self.name,
                 host=dhost,
                 port=dport,
                 verbose=self.args.verbose,
+                options=self.data_socket_options(),
             )
             proc_url = "tcp://{}:{}".format(dhost, dport)
 
             if init_r_socket:
-                # if collector_host option exists, use it
-                if self.args.collector_host:
-                    chost = self.args.collector_host
-                else:
-                    chost = self.localhost
-                cport = "7{}".format(str(self.cfg.getstr('port'))[1:])
+                chost, cport = self.collector_address()
                 self.r_socket = self.make_socket(
                     socket_type="push",
                     wid="{}_2C".format(self.name),
@@ -357,48 +702,412 @@ class Reader(ZMQProcessBase):
             print("SOCKET ERROR: {}".format(e))
             exit()
         else:
+            # the connected message is always JSON, and announces the encoding
+            # this Reader will use for its results
             info = {
                 "proc_name": self.name,
                 "proc_url": proc_url,
                 "state": "connected",
+                "encoding": self.encoding,
             }
+            self.post_result(info)
+
+    def data_address(self):
+        # If the Connector is active, connect the Reader socket to the Connector;
+        # if not, connect the Reader socket to the Splitter
+        if self.args.broker:
+            return self.localhost, "6{}".format(str(self.cfg.getstr('port'))[1:])
+        return self.cfg.getstr('host'), self.cfg.getstr('port')
+
+    def collector_address(self):
+        # if collector_host option exists, use it
+        if self.args.collector_host:
+            chost = self.args.collector_host
+        else:
+            chost = self.localhost
+        return chost, "7{}".format(str(self.cfg.getstr('port'))[1:])
+
+    def make_heartbeat(self):
+        """ Heartbeat message: queue state, whether the Reader holds work (a frame
+        being processed, or frames queued for processing), and when the last
+        frame was received and the last result was sent off """
+        queues = {"batch": [len(self.result_batch), self.batch_size]}
+        busy = self.busy
+        if self.frame_queue is not None:
+            queues["frames"] = [self.frame_queue.qsize(), self.stage_queue_size]
+            queues["results"] = [self.result_queue.qsize(), self.stage_queue_size]
+            busy = self.frame_queue.qsize() > 0
+        return {
+            "state": "heartbeat",
+            "proc_name": self.name,
+            "time": time.time(),
+            "busy": busy,
+            "n_frames": self.n_frames,
+            "last_frame": self.last_frame,
+            "last_result": self.last_result,
+            "idle_retries": self.reconnector.idle_retries,
+            "queues": queues,
+        }
+
+    def send_heartbeats(self):
+        """ Heartbeat thread: has its own socket to the Collector, so that
+        heartbeats keep coming while the Reader is busy with a frame """
+        chost, cport = self.collector_address()
+        socket = self.make_socket(
+            socket_type="push",
+            wid="{}_HB".format(self.name),
+            host=chost,
+            port=cport,
+        )
+        while not self.stop:
+            socket.send_json(self.make_heartbeat())
+            time.sleep(self.heartbeat_interval)
+
+    def request_frames(self, n_requests=1, greeting=None):
+        """ Requests frames from the Splitter (or Connector); in REQ mode only one
+        request can be outstanding, while in credit (DEALER) mode each request
+        is a credit for one frame
+        :param n_requests: number of requests (credits) to send
+        :param greeting: (optional) payload of the first request, e.g. b"Hello"
+        """
+        if self.use_ring and self.ring is None:
+            self.attach_ring()
+        for i in range(n_requests):
+            request = greeting if (greeting and i == 0) else self.name.encode('utf-8')
+            if self.ring is not None:
+                request = shm_ring.make_request(request, self.pop_released_slots())
+            if self.credits:
+                # DEALER sockets have to emulate the REQ envelope
+                self.d_socket.send_multipart([b"", request])
+            else:
+                self.d_socket.send(request)
+            self.outstanding += 1
+
+    def receive_frames(self):
+        frames = self.d_socket.recv_multipart(copy=not self.zero_copy)
+        self.outstanding = max(self.outstanding - 1, 0)
+        if self.credits:  # remove the empty delimiter of the DEALER envelope
+            frames = frames[1:]
+        self.frame_slot = None
+        self.frame_stamp = None
+        if self.args.broker:  # if it came from broker, remove first two frames
+            shm = self.ring is not None and bytes(frames[0]) == shm_ring.SHM_MARKER
+            self.frame_stamp = overload.read_stamp(frames[1])
+            frames = frames[2:]
+            if shm:  # image payload is in the ring; frame 4 is its descriptor
+                slot, payload = self.ring.read(frames[4])
+                if self.zero_copy:
+                    frames[4] = payload
+                    self.frame_slot = slot
+                else:
+                    frames[4] = bytes(payload)
+                    self.release_slot(slot)
+        return frames
+
+    def attach_ring(self):
+        # the Connector may not have created the ring yet, so retry (at most
+        # once a second) until attached; frames come over TCP in the meantime
+        if time.time() - self.last_ring_attempt < 1:
+            return
+        self.last_ring_attempt = time.time()
+        dport = "6{}".format(str(self.cfg.getstr('port'))[1:])
+        try:
+            self.ring = shm_ring.FrameRing(name=shm_ring.ring_name(dport))
+        except FileNotFoundError:
+            self.ring = None
+
+    def release_slot(self, slot):
+        if slot is not None:
+            self.released_slots.append(slot)
+
+    def pop_released_slots(self):
+        slots = []
+        while self.released_slots:
+            slots.append(self.released_slots.popleft())
+        return slots
+
+    def admit_frame(self, info, received):
+        """ Overload mode: decides whether a frame is processed, from how long
+        ago the Connector received it and how many frames are waiting (in the
+        Connector backlog and the Reader's own frame queue) """
+        if self.overload is None:
+            return True
+        latency = None
+        backlog = self.frame_queue.qsize() if self.frame_queue is not None else 0
+        if self.frame_stamp is not None:
+            latency = received - self.frame_stamp[0]
+            backlog += self.frame_stamp[1]
+        sampled = self.overload.admit(latency=latency, backlog=backlog)
+        info["sampled"] = int(sampled)
+        info["sampling_stride"] = self.overload.stride
+        return sampled
+
+    def data_socket_options(self):
+        # ZMQ re-establishes a lost TCP connection by itself (backing off up to
+        # the maximum interval); facing the Connector, a relaxed REQ socket can
+        # ask again when no reply came, and ignores a late reply to an earlier
+        # request (which the Connector voids on the greeting)
+        options = {
+            zmq.RECONNECT_IVL: 100,
+            zmq.RECONNECT_IVL_MAX: int(self.reconnector.max_timeout * 1000),
+        }
+        if self.args.broker and not self.credits:
+            options.update({zmq.REQ_RELAXED: 1, zmq.REQ_CORRELATE: 1})
+        return options
+
+    def reconnect(self):
+        """ No frame came within the timeout: asks again on the same socket, and
+        waits longer before the next attempt. The Connector voids the requests
+        still outstanding on the greeting, so they are all sent again; the
+        Splitter doesn't, and answers the requests still queued there, so only
+        the ones missing from the window (one request, or the credits) are sent
+        """
+        self.reconnector.failed()
+        if self.args.verbose:
+            print("{} RECONNECTING (attempt {}, next in {:.1f} sec)".format(
+                self.name, self.reconnector.attempts, self.reconnector.current),
+                flush=True)
+        if self.args.broker:
+            self.outstanding = 0
+        n_requests = max(self.credits, 1) - self.outstanding
+        if n_requests > 0:
+            self.request_frames(n_requests=n_requests, greeting=b"Hello")
+
+    def post_result(self, info):
+        """ Hands result over to the sender stage (staged mode), or sends it """
+        if self.result_queue is not None:
+            self.result_queue.put(info)
+        else:
+            self.send_result(info)
+
+    def send_result(self, info):
+        """ Adds result to the current batch; the batch is sent when it is full,
+        when its deadline has passed, or right away for non-processing info """
+        self.last_result = time.time()
+        if info["state"] == "connected":
+            self.flush_results()
             self.r_socket.send_json(info)
+            return
+        if not self.result_batch:
+            self.batch_deadline = time.time() + self.batch_timeout
+        self.result_batch.append(info)
+        if (
+                len(self.result_batch) >= self.batch_size
+                or info["state"] != "process"
+                or time.time() >= self.batch_deadline
+        ):
+            self.flush_results()
+
+    def flush_results(self):
+        if not self.result_batch:
+            return
+        s_ser = time.time()
+        if self.encoding == 'binary':
+            message = codec.encode_results(self.result_batch)
+        elif len(self.result_batch) == 1:
+            message = json.dumps(self.result_batch[0]).encode('utf-8')
+        else:
+            message = json.dumps(self.result_batch).encode('utf-8')
+        s_send = time.time()
+        self.r_socket.send(message)
+        e_send = time.time()
+
+        n_results = len(self.result_batch)
+        histograms = self.send_latency.histograms
+        histograms['serialize'].record((s_send - s_ser) / n_results)
+        histograms['send'].record((e_send - s_send) / n_results)
+        self.result_batch = []
+        self.batch_deadline = None
+        if self.latency_interval and (
+                e_send - self.last_latency_report >= self.latency_interval):
+            self.report_latency()
+
+    def report_latency(self):
+        """ Sends the serialize / send histograms to the Collector """
+        self.r_socket.send_json({
+            "state": "stats",
+            "proc_name": self.name,
+            "latency": self.send_latency.to_dict(),
+        })
+        self.send_latency = stats.StageHistograms(stages=['serialize', 'send'])
+        self.last_latency_report = time.time()
+
+    def batch_poll_timeout(self, timeout):
+        """ Shortens the poll timeout (msec) so that a pending batch of results is
+        flushed on time while waiting for the next frame """
+        if self.result_queue is not None or not self.result_batch:
+            return timeout
+        remaining = max(0, (self.batch_deadline - time.time()) * 1000)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def add_busy_time(self, stage, busy_time):
+        with self.stage_lock:
+            self.stage_busy[stage] += busy_time
+
+    def report_occupancy(self, elapsed):
+        """ Fraction of time each stage was busy over the last interval (averaged
+        over processing threads), along with the current queue fill levels """
+        with self.stage_lock:
+            busy = self.stage_busy
+            self.stage_busy = {stage: 0.0 for stage in busy}
+        workers = {'receive': 1, 'process': self.n_proc_threads, 'send': 1}
+        return {
+            "state": "stats",
+            "proc_name": self.name,
+            "occupancy": {
+                stage: busy[stage] / (elapsed * workers[stage]) for stage in busy
+            },
+            "queues": {
+                "frames": [self.frame_queue.qsize(), self.stage_queue_size],
+                "results": [self.result_queue.qsize(), self.stage_queue_size],
+            },
+        }
+
+    def process_stage(self, filename):
+        """ Processing thread: runs its own processor (which decodes the image
+        payloads into its own buffers) on received frames """
+        processor = self.make_processor()
+        while True:
+            item = self.frame_queue.get()
+            if item is None:  # shutdown
+                break
+            data, info, time_info, start, slot = item
+            if info['run_mode'] != processor.run_mode:
+                processor = self.make_processor(run_mode=info['run_mode'])
+            s_proc = time.time()
+            try:
+                info = self.process(info, frame=data, filename=filename,
+                                    processor=processor, time_info=time_info)
+            except Exception as e:
+                info["state"] = "error"
+                info["dat_error"] = "PROCESSING ERROR: {}".format(e)
+            time_info["total_time"] = time.time() - start
+            info.update(time_info)
+            self.add_busy_time('process', time.time() - s_proc)
+            self.release_slot(slot)
+            self.result_queue.put(info)
+
+    def send_stage(self):
+        """ Sender thread: batches results and sends them to the Collector; owns
+        the Collector socket, and periodically reports stage occupancy (without
+        reports, it only wakes up for results and batch deadlines) """
+        last_report = time.time()
+        while True:
+            timeout = self.occupancy_interval or None
+            if self.result_batch:
+                remaining = max(self.batch_deadline - time.time(), 0)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            try:
+                info = self.result_queue.get(timeout=timeout)
+            except Empty:
+                info = False
+            if info is None:  # shutdown: send what is left
+                self.flush_results()
+                break
+            s_send = time.time()
+            if info:
+                self.send_result(info)
+            elif self.result_batch and time.time() >= self.batch_deadline:
+                self.flush_results()
+            self.add_busy_time('send', time.time() - s_send)
+
+            elapsed = time.time() - last_report
+            if self.occupancy_interval and elapsed >= self.occupancy_interval:
+                self.send_result(self.report_occupancy(elapsed))
+                last_report = time.time()
+
+    def start_stages(self, filename):
+        self.frame_queue = Queue(maxsize=self.stage_queue_size)
+        self.result_queue = Queue(maxsize=self.stage_queue_size)
+        self.stage_threads = [
+            Thread(
+                target=self.process_stage,
+                args=(filename,),
+                name="{}_PROC_{}".format(self.name, i),
+                daemon=True,
+            )
+            for i in range(self.n_proc_threads)
+        ]
+        self.stage_threads.append(
+            Thread(target=self.send_stage, name="{}_SEND".format(self.name),
+                   daemon=True))
+        for thread in self.stage_threads:
+            thread.start()
+
+    def stop_stages(self):
+        """ Lets the processing threads finish the frames already queued, then
+        the sender thread send the remaining results """
+        *proc_threads, send_thread = self.stage_threads
+        for _ in proc_threads:
+            self.frame_queue.put(None)
+        for thread in proc_threads:
+            thread.join()
+        self.result_queue.put(None)
+        send_thread.join()
+        self.stage_threads = []
 
     def read_stream(self):
         # Write eiger_*.stream file
         filename = self.write_eiger_file()
 
+        # In staged mode, start processing and sender threads (the calling
+        # thread becomes the receive/decode stage)
+        if self.n_proc_threads:
+            self.start_stages(filename)
+
         # Initialize ZMQ sockets
         self.initialize_zmq_sockets()
+        if self.heartbeat_interval:
+            self.heartbeat_thread = Thread(
+                target=self.send_heartbeats, name="{}_HB".format(self.name),
+                daemon=True)
+            self.heartbeat_thread.start()
+
+        # In credit mode, keep N requests outstanding at all times, so that the
+        # next frame is received while the current one is being processed
+        if self.credits:
+            self.request_frames(n_requests=self.credits)
+
+        # Start listening for ZMQ stream; on the way out (e.g. SIGTERM turned
+        # into SystemExit), pending results are sent and the sockets closed
+        try:
+            self.read_frames(filename)
+        finally:
+            self.close()
 
-        # Start listening for ZMQ stream
+    def read_frames(self, filename):
         while True:
             time_info = {
                 "receive_time": 0,
                 "wait_time": 0,
+                "parse_time": 0,
+                "decode_time": 0,
                 "total_time": 0,
             }
             try:
                 start = time.time()
-                self.d_socket.send(self.name.encode('utf-8'))
+                if not self.credits:
+                    self.request_frames()
                 expecting_reply = True
                 while expecting_reply:
-                    timeout = self.cfg.getstr('timeout') * 1000 if self.cfg.getstr(
-                        'timeout') else None
-                    if self.d_socket.poll(timeout=timeout):
+                    timeout = self.reconnector.poll_timeout()
+                    if self.d_socket.poll(timeout=self.batch_poll_timeout(timeout)):
                         fstart = time.time()
-                        frames = self.d_socket.recv_multipart()
+                        frames = self.receive_frames()
+                        self.reconnector.succeeded()
+                        self.n_frames += 1
+                        self.last_frame = fstart
                         time_info["receive_time"] = time.time() - fstart
                         time_info["wait_time"] = time.time() - start - time_info[
                             "receive_time"]
-                        if self.args.broker:  # if it came from broker, remove first two frames
-                            frames = frames[2:]
+                        slot = self.frame_slot
+                        if self.credits:  # replenish the credit for this frame
+                            self.request_frames()
                         expecting_reply = False
+                    elif self.result_queue is None and self.result_batch:
+                        self.flush_results()
                     else:
-                        # close and re-initialize d_socket
-                        self.d_socket.close()
-                        self.initialize_zmq_sockets(init_r_socket=False)
-                        self.d_socket.send(b"Hello")
+                        self.reconnect()
             except Exception as exp:
                 print("DEBUG: {} CONNECT FAILED! {}".format(self.name, exp))
                 continue
@@ -407,22 +1116,42 @@ class Reader(ZMQProcessBase):
                 if self.args.drain:
                     if self.args.verbose:
                         print(
-                            str(frames[0].bytes[:-1])[3:-2],
+                            str(bytes(frames[0])[:-1])[3:-2],
                             "({})".format(self.name),
                             "rcv time: {:.4f} sec".format(time_info["receive_time"]),
                         )
+                    self.release_slot(slot)
                 else:
                     # make data and info dictionaries
+                    s_parse = time.time()
                     data, info = self.make_data_dict(frames)
+                    time_info["parse_time"] = time.time() - s_parse
 
                     # handle different info scenarios
                     # some unknown error
                     if info is None:
                         print("debug: info is None!")
+                        self.release_slot(slot)
                         continue
-                    # normal processing info
+                    # overload mode: frame is reported without processing
+                    elif info["state"] == "process" and not self.admit_frame(
+                            info, received=fstart):
+                        time_info["total_time"] = time.time() - start
+                        info.update(time_info)
+                    # normal processing info (hand over to processing threads in
+                    # staged mode)
                     elif info["state"] == "process":
-                        info = self.process(info, frame=data, filename=filename)
+                        if self.frame_queue is not None:
+                            self.add_busy_time('receive', time.time() - fstart)
+                            self.frame_queue.put(
+                                (data, info, time_info, start, slot))
+                            continue
+                        self.busy = True
+                        try:
+                            info = self.process(info, frame=data, filename=filename,
+                                                time_info=time_info)
+                        finally:
+                            self.busy = False
                         time_info["total_time"] = time.time() - start
                         info.update(time_info)
                     # end-of-series signal (sleep for four seconds... maybe obsolete)
@@ -430,10 +1159,27 @@ class Reader(ZMQProcessBase):
                         time.sleep(4)
                         continue
 
+                    # done with the image (frees its slot in the ring, if any)
+                    self.release_slot(slot)
+
                     # send info to collector
-                    self.r_socket.send_json(info)
+                    self.post_result(info)
 
-        self.d_socket.close()
+    def close(self):
+        """ Stops the heartbeat and stage threads, sends the results that are
+        still pending, and closes the sockets and the ring """
+        self.stop = True
+        if self.heartbeat_thread is not None:
+            self.heartbeat_thread.join(timeout=self.heartbeat_interval + 1)
+            self.heartbeat_thread = None
+        if self.stage_threads:
+            self.stop_stages()
+        if self.result_batch:
+            self.flush_results()
+        self.close_sockets()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
 
     def run(self):
         self.read_stream()
@@ -454,8 +1200,42 @@ class Collector(ZMQProcessBase):
         )
         self.readers = {}
         self.advance_stdout = False
-
-    def monitor_splitter_messages(self):
+        self.formatter = ResultFormatter(self.cfg)
+        self.record_writer = None
+        self.reporter = None
+        self.counter = 0
+
+        # processed vs. skipped frames (Readers in overload mode), published
+        # with the rest of the Collector status on the status topic
+        self.sampling = overload.SamplingStats()
+        self.status_interval = self.cfg.getfloat('status_interval', fallback=0)
+        self.status_socket = None
+        self.last_status = time.time()
+
+        # per-stage latency histograms of the current series
+        self.latency = stats.SeriesLatency()
+
+        # counters for the metrics endpoint (Connector backlog and drops are
+        # the latest values passed on by the Readers with their results)
+        self.ui_failures = 0
+        self.broker_backlog = 0
+        self.broker_dropped = 0
+        self.metrics_server = None
+        self.metrics_enabled = self.cfg.getboolean('metrics_enabled', fallback=False)
+        self.metrics_interval = self.cfg.getfloat('metrics_interval', fallback=1.0)
+
+        # the endpoint serves the latest snapshot, made by the Collector loop (so
+        # that the HTTP thread never reads reader state while it changes)
+        self.metrics_snapshot = []
+        self.last_metrics = (time.time(), {})
+
+        # liveness of Readers that send heartbeats (checked a few times within
+        # the timeout, so that a reader that goes down is noticed in time)
+        self.heartbeat_timeout = self.cfg.getfloat('heartbeat_timeout', fallback=0)
+        self.liveness_interval = self.heartbeat_timeout / 4
+        self.last_liveness_check = time.time()
+
+    def initialize_monitor_socket(self):
         # listen for messages from the splitter monitor port
         # todo: it occurs to me that this can be used for a variety of purposes!
         mport = "5{}".format(str(self.cfg.getstr('port'))[1:])
@@ -468,39 +1248,47 @@ class Collector(ZMQProcessBase):
             verbose=True,
         )
         self.m_socket.setsockopt(zmq.SUBSCRIBE, b'')
+
+    def monitor_splitter_messages(self):
+        self.initialize_monitor_socket()
         while True:
             msg = self.m_socket.recv()
             if msg:
-                print('\n*** RUN FINISHED! ***\n')
-                print(time.strftime('%b %d %Y %I:%M:%S %p'))
-                msg_dict = utils.decode_frame(msg, tags='requests')
-                checked_in = msg_dict['requests']
-                hung_readers = []
-                down_readers = []
-                for rdr in self.readers.keys():
-                    if not rdr in checked_in.keys():
-                        down_readers.append(rdr)
-                    elif not "series_end" in checked_in[rdr]:
-                        hung_readers.append(rdr)
-                if hung_readers:
-                    print('{} Readers down during this run:'.format(len(hung_readers)))
-                    for rdr in hung_readers:
-                        lt = time.localtime(self.readers[rdr]['last_reported'])
-                        silent_since = time.strftime('%b %d %Y %I:%M:%S %p', lt)
-                        print('  {} silent since {}'.format(rdr, silent_since))
-                if down_readers:
-                    print('{} Readers are permanently down:'.format(len(down_readers)))
-                    for rdr in down_readers:
-                        lt = time.localtime(self.readers[rdr]['last_reported'])
-                        silent_since = time.strftime('%b %d %Y %I:%M:%S %p', lt)
-                        print('  {} down since {}'.format(rdr, silent_since))
-                idle_readers = len(self.readers) - len(hung_readers) - len(down_readers)
-                print('{} of {} Readers are CONNECTED and IDLE'.format(
-                    idle_readers,
-                    len(self.readers), ),
-                    flush=True)
-                self.send_check_in_info(hung_readers, down_readers)
-                self.advance_stdout = True
+                self.check_in_readers(msg)
+
+    def check_in_readers(self, msg):
+        """ Reports readers that are down or hung at the end of a run, using the
+        list of readers that checked in with the Splitter """
+        print('\n*** RUN FINISHED! ***\n')
+        print(time.strftime('%b %d %Y %I:%M:%S %p'))
+        msg_dict = utils.decode_frame(msg, tags='requests')
+        checked_in = msg_dict['requests']
+        hung_readers = []
+        down_readers = []
+        for rdr in self.readers.keys():
+            if not rdr in checked_in.keys():
+                down_readers.append(rdr)
+            elif not "series_end" in checked_in[rdr]:
+                hung_readers.append(rdr)
+        if hung_readers:
+            print('{} Readers down during this run:'.format(len(hung_readers)))
+            for rdr in hung_readers:
+                lt = time.localtime(self.readers[rdr]['last_reported'])
+                silent_since = time.strftime('%b %d %Y %I:%M:%S %p', lt)
+                print('  {} silent since {}'.format(rdr, silent_since))
+        if down_readers:
+            print('{} Readers are permanently down:'.format(len(down_readers)))
+            for rdr in down_readers:
+                lt = time.localtime(self.readers[rdr]['last_reported'])
+                silent_since = time.strftime('%b %d %Y %I:%M:%S %p', lt)
+                print('  {} down since {}'.format(rdr, silent_since))
+        idle_readers = len(self.readers) - len(hung_readers) - len(down_readers)
+        print('{} of {} Readers are CONNECTED and IDLE'.format(
+            idle_readers,
+            len(self.readers), ),
+            flush=True)
+        self.send_check_in_info(hung_readers, down_readers)
+        self.advance_stdout = True
 
     def send_check_in_info(self, hung_readers, down_readers):
         down_readers.extend(hung_readers)
@@ -509,14 +1297,28 @@ class Collector(ZMQProcessBase):
 
     def understand_info(self, info):
         reader_name = info['proc_name']
-        if info["state"] == "connected":
+        reader = self.readers.get(reader_name)
+        if reader is not None:
+            reader['last_reported'] = time.time()
+        if info["state"] == "heartbeat":
+            # heartbeats are not printed (even in verbose mode)
+            if reader is not None:
+                reader['heartbeat'] = info
+                reader['queues'] = info['queues']
+            return True
+        elif info["state"] == "connected":
             # add reader index to dictionary of active readers with state "ON"
             self.readers[reader_name] = {
                 'name': reader_name,
                 'status': 'IDLE',
                 'start_time': time.time(),
+                'encoding': info.get('encoding', 'json'),
+                'frames': 0,
+                'last_reported': time.time(),
+                'alive': True,
             }
-            msg = "{} CONNECTED to {}".format(reader_name, info["proc_url"])
+            msg = "{} CONNECTED to {} ({} results)".format(
+                reader_name, info["proc_url"], self.readers[reader_name]['encoding'])
             if len(self.readers) == self.size - 1:
                 msg = '{} Readers connected ({})'.format(
                     len(self.readers),
@@ -527,113 +1329,89 @@ class Collector(ZMQProcessBase):
             # change reader index in dictionary of active readers to "EOS"
             self.readers[reader_name]['status'] = 'IDLE'
             msg = "{} received END-OF-SERIES signal".format(reader_name)
+        elif info["state"] == "stats" and "latency" in info:
+            # serialize / send latency histograms
+            self.latency.update(reader_name, info['latency'])
+            msg = "{} LATENCY REPORT: {}".format(
+                reader_name, ", ".join(sorted(info['latency'])))
+        elif info["state"] == "stats":
+            # stage occupancy report from a staged Reader
+            self.readers[reader_name]['occupancy'] = info['occupancy']
+            self.readers[reader_name]['queues'] = info['queues']
+            msg = "{} OCCUPANCY: {} (queues: {})".format(
+                reader_name,
+                ", ".join("{} {:.0%}".format(stage, occ)
+                          for stage, occ in info['occupancy'].items()),
+                ", ".join("{} {}/{}".format(q, *fill)
+                          for q, fill in info['queues'].items()),
+            )
         else:
-            self.readers[reader_name]['status'] = 'WORKING'
+            reader = self.readers[reader_name]
+            reader['status'] = 'WORKING'
             if info["state"] == "error":
-                msg = "{} DATA ERROR: {}".format(info["proc_name"], info["dat_error"])
+                msg = "{} DATA ERROR: {}".format(
+                    info["proc_name"], info.get("dat_error", "unknown error"))
             elif info["state"] != "process":
                 msg = "DEBUG: {} STATE IS ".format(info["state"])
             else:
+                reader['frames'] += 1
                 return False
 
         if self.args.verbose:
             print(msg, flush=True)
         return True
 
-    def write_to_file(self, rlines):
-        with open(self.args.record, "a") as rf:
-            for rline in rlines:
-                rf.write(rline)
-
-    def make_result_string(self, info):
-        # Collect results and errors
-        err_list = [
-            info[e] for e in info if ("error" in e or "comment" in e) and info[e] != ""
-        ]
-        errors = "; ".join(err_list)
-        results = (
-            "{0} {1} {2} {3:.2f} {4} "
-            "{5:.2f} {6} {7} {{{8}}}"
-            "".format(
-                info["n_spots"],  # number_of_spots
-                info["n_overloads"],  # number_of_spots_with_overloaded_pixels
-                info["score"],  # composite score (used to be n_indexed...)
-                info["hres"],  # high resolution boundary
-                info["n_ice_rings"],  # number_of_ice-rings
-                info["mean_shape_ratio"],  # mean spot shape ratio
-                info["sg"],  # space group
-                info["uc"],  # unit cell
-                errors,  # errors
-            )
+    def close(self):
+        """ Stops the metrics server, and writes out the records still queued;
+        the sockets are left to the collection threads """
+        self.stop_metrics_server()
+        if self.record_writer is not None:
+            self.record_writer.close()
+
+    def start_record_writer(self):
+        max_size = self.cfg.getstr('record_max_size', fallback=None)
+        self.record_writer = RecordWriter(
+            filepath=self.args.record,
+            queue_size=self.cfg.getint('record_queue_size', fallback=10000),
+            buffer_size=self.cfg.getint('record_buffer_size', fallback=1048576),
+            fsync_interval=self.cfg.getfloat('record_fsync_interval', fallback=5.0),
+            max_size=int(max_size) if max_size else None,
+            rotate_by_series=self.cfg.getboolean(
+                'record_rotate_by_series', fallback=False),
         )
+        self.record_writer.start()
+        atexit.register(self.record_writer.close)
 
-        # read out config format (if no path specified, read from default config file)
-        if self.cfg.getstr('output_delimiter') is not None:
-            delimiter = '{} '.format(self.cfg.getstr('output_delimiter'))
-        else:
-            delimiter = ' '
-        format_keywords = self.cfg.getstr('output_format').split(',')
-        format_keywords = [i.strip() for i in format_keywords]
+    def write_to_file(self, rlines, series=None):
+        if self.record_writer is None:
+            self.start_record_writer()
+        self.record_writer.write(rlines, series=series)
 
-        # assemble and return message to UI
-        try:
-            ui_msg = info[self.cfg.getstr('output_prefix_key')]
-        except KeyError:
-            ui_msg = ''
-        if ui_msg == '':
-            ui_msg = self.cfg.getstr('default_output_prefix')
-        ui_msg += ' '
-        for kw in format_keywords:
-            keyword = kw
-            bracket = None
-            brackets = ['{}', '()', '[]']
-            split_kw = kw.split(' ')
-            if len(split_kw) == 2 and split_kw[1] in brackets:
-                keyword = split_kw[0]
-                bracket = split_kw[1]
-            try:
-                if kw.startswith('[') and kw.endswith(']'):
-                    keyword = ''
-                    value = info[kw[1:-1]]
-                elif 'result' in keyword:
-                    value = results
-                else:
-                    value = info[keyword]
-            except KeyError as e:
-                raise e
-            else:
-                if keyword == '':
-                    item = value
-                elif bracket:
-                    item = '{0} {1}{2}{3}'.format(keyword, bracket[0],
-                                                  value, bracket[1])
-                else:
-                    item = '{0} {1}'.format(keyword, value)
-                if format_keywords.index(kw) == len(format_keywords) - 1:
-                    delimiter = ''
-                ui_msg += item + delimiter
-        return ui_msg
+    def make_result_string(self, info):
+        return self.formatter.render(info)
 
     def print_to_stdout(self, counter, info, ui_msg):
-        lines = [
-            "*** [{}] ({}) SERIES {}, FRAME {} ({}):".format(
-                counter, info["proc_name"], info["series"], info["frame"],
-                info["full_path"]
-            ),
-            "  {}".format(ui_msg),
-            "  TIME: wait = {:.4f} sec, recv = {:.4f} sec, "
-            "proc = {:.4f} ,total = {:.2f} sec".format(
-                info["wait_time"],
-                info["receive_time"],
-                info["proc_time"],
-                info["total_time"],
-            ),
-            "***\n",
-        ]
-        for ln in lines:
-            print(ln)
+        # per-frame printing and aggregation happen in the reporter thread
+        if self.reporter is None:
+            self.start_reporter()
+        self.reporter.add(counter, info, ui_msg)
         if self.args.record:
-            self.write_to_file(lines)
+            lines = make_frame_lines(counter, info, ui_msg)
+            self.write_to_file(lines, series=info["series"])
+
+    def make_reporter(self):
+        # with --time, every frame is printed (connector_run_mpi counts them)
+        sample_every = 1 if self.args.time else self.cfg.getint(
+            'console_sample_every', fallback=0)
+        return ConsoleReporter(
+            interval=self.cfg.getfloat('console_report_interval', fallback=5.0),
+            sample_every=sample_every,
+            hit_threshold=self.cfg.getint('console_hit_threshold', fallback=10),
+        )
+
+    def start_reporter(self):
+        self.reporter = self.make_reporter()
+        self.reporter.start()
 
     def output_results(self, counter, info, verbose=False):
         ui_msg = None
@@ -671,38 +1449,379 @@ class Collector(ZMQProcessBase):
             )
             self.ui_socket.setsockopt(zmq.SNDTIMEO, 1000)
 
+        if self.status_interval or self.heartbeat_timeout:
+            sport = "4{}".format(str(self.cfg.getstr('port'))[1:])
+            self.status_socket = self.make_socket(
+                socket_type="pub",
+                wid=self.name + "_STATUS",
+                host=self.localhost,
+                port=sport,
+                bind=True,
+            )
+
+    def make_status(self):
+        status = self.sampling.report()
+        status.update({
+            "time": time.time(),
+            "readers": {name: rdr['status'] for name, rdr in self.readers.items()},
+            "latency": self.latency.summary(),
+        })
+        return status
+
+    def publish_status(self):
+        """ Publishes the status (frame rate, sampling, reader states) on the
+        status topic """
+        self.last_status = time.time()
+        self.publish(b"status", self.make_status())
+
+    def publish(self, topic, message):
+        if self.status_socket is not None:
+            self.status_socket.send_multipart(
+                [topic, json.dumps(message).encode('utf-8')])
+
+    def check_liveness(self):
+        """ Marks readers that have been silent (no heartbeat or result) for
+        longer than heartbeat_timeout as DOWN, and readers that are heard from
+        again as IDLE; each change is published as a reader-down / reader-up
+        event (the Connector stops routing frames to readers that are down).
+        Heartbeats come from a thread of their own, so a reader that holds work
+        but hasn't taken a frame within heartbeat_timeout is DOWN as well (hung,
+        e.g. in the processor) """
+        now = time.time()
+        self.last_liveness_check = now
+        for name, reader in self.readers.items():
+            if 'heartbeat' not in reader:  # reader doesn't send heartbeats
+                continue
+            heartbeat = reader['heartbeat']
+            silent = now - reader['last_reported']
+            stalled = heartbeat['time'] - heartbeat['last_frame']
+            hung = heartbeat.get('busy', False) and stalled >= self.heartbeat_timeout
+            alive = silent < self.heartbeat_timeout and not hung
+            if alive == reader['alive']:
+                continue
+            reader['alive'] = alive
+            reader['status'] = 'IDLE' if alive else 'DOWN'
+            topic = b"reader-up" if alive else b"reader-down"
+            if hung:
+                reason = "hung, no new frame for {:.1f} sec".format(stalled)
+            else:
+                reason = "silent for {:.1f} sec".format(silent)
+            print("{} {} ({})".format(
+                name, 'is BACK' if alive else 'is DOWN', reason), flush=True)
+            self.publish(topic, {
+                "reader": name,
+                "time": now,
+                "last_reported": reader['last_reported'],
+                "last_frame": heartbeat.get('last_frame'),
+                "hung": hung,
+            })
+
+    def poll_timeout(self):
+        if self.heartbeat_timeout:
+            return min(500, self.liveness_interval * 1000)
+        return 500
+
     def collect_results(self):
         self.initialize_zmq_sockets()
-        counter = 0
+        self.start_metrics_server()
         while True:
-            if self.c_socket.poll(timeout=500):
-                info = self.c_socket.recv_json()
-                if info:
-                    # understand info (if not regular info, don't send to UI)
-                    if self.understand_info(info):
-                        continue
-                    else:
-                        counter += 1
-
-                    # send string to UI (DHS or Interceptor GUI)
-                    ui_msg = self.output_results(
-                        counter, info, verbose=self.args.verbose
-                    )
-                    if self.cfg.getboolean('send_to_ui') or (self.cfg.getstr(
-                            'uihost') and self.cfg.getstr('uiport')):
-                        try:
-                            self.ui_socket.send_string(ui_msg)
-                        except Exception as e:
-                            print('UI SEND ERROR: ', e)
+            if self.c_socket.poll(timeout=self.poll_timeout()):
+                self.handle_results(self.c_socket.recv(copy=False))
             else:
-                if self.advance_stdout:
-                    self.advance_stdout = False
-                    print('', flush=True)
+                self.advance_after_idle()
+            if self.heartbeat_timeout and (
+                    time.time() - self.last_liveness_check >= self.liveness_interval):
+                self.check_liveness()
+            if self.status_socket is not None and (
+                    time.time() - self.last_status >= self.status_interval):
+                self.publish_status()
+            if self.metrics_server is not None and (
+                    time.time() - self.last_metrics[0] >= self.metrics_interval):
+                self.publish_metrics()
+
+    def handle_results(self, message):
+        """ Handles one message from a Reader, which holds one result or a batch
+        of results, encoded as binary records or JSON """
+        try:
+            infos = codec.decode_results(message)
+        except Exception as e:
+            print('RESULT DECODING ERROR: ', e)
+            return
+        for info in infos:
+            if not info:
+                continue
+
+            # understand info (if not regular info, don't send to UI); a bad
+            # message is reported and skipped, so that it can't stop collection
+            try:
+                if self.understand_info(info):
+                    continue
+            except Exception as e:
+                print('RESULT HANDLING ERROR ({}): {}'.format(
+                    info.get('proc_name'), e))
+                continue
+            self.counter += 1
+            sampled = info.get("sampled", 1)
+            self.sampling.add(sampled)
+            if sampled:
+                self.add_latency(info)
+            if "broker_backlog" in info:
+                self.broker_backlog = info["broker_backlog"]
+                self.broker_dropped = max(
+                    self.broker_dropped, info["broker_dropped"])
+
+            # send string to UI (DHS or Interceptor GUI); frames that were not
+            # processed (overload mode) would only show up as blanks
+            ui_msg = self.output_results(
+                self.counter, info, verbose=self.args.verbose
+            )
+            if not sampled:
+                continue
+            if self.cfg.getboolean('send_to_ui') or (self.cfg.getstr(
+                    'uihost') and self.cfg.getstr('uiport')):
+                self.send_to_ui(ui_msg)
+
+    def add_latency(self, info):
+        """ Adds the stage times of a result to the histograms of its series; the
+        percentiles of the previous series are reported when a new one starts """
+        if info.get('series') != self.latency.series:
+            if self.latency.readers and self.args.verbose:
+                print("\n".join(make_latency_lines(self.latency.summary())),
+                      flush=True)
+            self.latency.reset(series=info.get('series'))
+        self.latency.add(info)
+
+    def send_to_ui(self, ui_msg):
+        try:
+            self.ui_socket.send_string(ui_msg)
+        except Exception as e:
+            self.ui_failures += 1
+            print('UI SEND ERROR: ', e)
+
+    def start_metrics_server(self):
+        if not self.metrics_enabled:
+            return
+        self.publish_metrics()
+        port = "8{}".format(str(self.cfg.getstr('port'))[1:])
+        try:
+            self.metrics_server = MetricsServer(
+                lambda: self.metrics_snapshot,
+                host=self.cfg.getstr('metrics_host', fallback='localhost'),
+                port=int(port),
+            )
+        except OSError as e:
+            print('METRICS SERVER ERROR: ', e)
+        else:
+            self.metrics_server.start()
+
+    def stop_metrics_server(self):
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+
+    def publish_metrics(self):
+        """ Replaces the snapshot served by the metrics endpoint (a new list, so
+        the HTTP thread always sees a complete one) """
+        self.metrics_snapshot = self.make_metrics()
+
+    def make_metrics(self):
+        """ Collector metrics (see metrics.format_metrics); runs in the Collector
+        loop, every metrics_interval. Frame rates are averaged since the previous
+        snapshot """
+        now = time.time()
+        readers = list(self.readers.items())
+        counts = {name: reader.get('frames', 0) for name, reader in readers}
+        counts[None] = self.counter
+        last_time, last_counts = self.last_metrics
+        self.last_metrics = (now, counts)
+        elapsed = now - last_time
+
+        def rate(key):
+            if key not in last_counts or elapsed <= 0:
+                return 0
+            return (counts[key] - last_counts[key]) / elapsed
+
+        latency = []
+        for stage, summary in self.latency.summary()['global'].items():
+            labels = {'stage': stage}
+            for p in stats.PERCENTILES:
+                latency.append(('', dict(labels, quantile=p / 100),
+                                summary['p{}'.format(p)]))
+            latency.append(('_sum', labels, summary['mean'] * summary['count']))
+            latency.append(('_count', labels, summary['count']))
+
+        return [
+            ('interceptor_frames_total', 'counter',
+             'Results received from Readers', [('', None, self.counter)]),
+            ('interceptor_frames_sampled_total', 'counter',
+             'Results of frames that were processed (not skipped in overload '
+             'mode)', [('', None, self.sampling.total['sampled'])]),
+            ('interceptor_frame_rate', 'gauge', 'Results per second',
+             [('', None, rate(None))]),
+            ('interceptor_reader_frames_total', 'counter',
+             'Results received per Reader',
+             [('', {'reader': name}, counts[name]) for name, _ in readers]),
+            ('interceptor_reader_frame_rate', 'gauge',
+             'Results per second per Reader',
+             [('', {'reader': name}, rate(name)) for name, _ in readers]),
+            ('interceptor_reader_up', 'gauge',
+             'Whether the Reader is alive (heard from within heartbeat_timeout)',
+             [('', {'reader': name}, reader.get('alive', True))
+              for name, reader in readers]),
+            ('interceptor_reader_idle_retries_total', 'counter',
+             'Requests a Reader repeated after a poll timeout (idle stream)',
+             [('', {'reader': name}, reader['heartbeat'].get('idle_retries', 0))
+              for name, reader in readers if 'heartbeat' in reader]),
+            ('interceptor_reader_queued_frames', 'gauge',
+             'Frames and results waiting in the queues of staged Readers',
+             [('', {'reader': name, 'queue': queue}, fill[0])
+              for name, reader in readers
+              for queue, fill in reader.get('queues', {}).items()]),
+            ('interceptor_broker_backlog', 'gauge',
+             'Frames waiting in the Connector backlog',
+             [('', None, self.broker_backlog)]),
+            ('interceptor_broker_dropped_frames_total', 'counter',
+             'Frames dropped by the Connector', [('', None, self.broker_dropped)]),
+            ('interceptor_ui_send_failures_total', 'counter',
+             'Results that could not be sent to the UI',
+             [('', None, self.ui_failures)]),
+            ('interceptor_stage_latency_seconds', 'summary',
+             'Latency of pipeline stages in the current series', latency),
+        ]
+
+    def advance_after_idle(self):
+        if self.advance_stdout:
+            self.advance_stdout = False
+            print('', flush=True)
 
     def run(self):
-        report_thread = Thread(target=self.collect_results)
-        monitor_thread = Thread(target=self.monitor_splitter_messages)
+        # turn SIGTERM (e.g. from mpirun) into a regular exit, so that exit
+        # handlers (such as the record file flush) are run
+        if current_thread() is main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        report_thread = Thread(target=self.collect_results, daemon=True)
+        monitor_thread = Thread(target=self.monitor_splitter_messages, daemon=True)
         report_thread.start()
         monitor_thread.start()
+        # block until told to exit, so that the caller can close the Collector;
+        # the collection threads are daemons, and stop with the process
+        report_thread.join()
+
+
+class AsyncCollector(Collector):
+    """ Collector that runs in a single asyncio event loop: the result socket,
+      the Splitter monitor socket, the UI socket and periodic tasks (such as the
+      console summary) share one thread, so reader state is never contended.
+  """
+
+    use_asyncio = True
+
+    def __init__(self, name="COLLECTOR", comm=None, args=None, localhost=None):
+        super(AsyncCollector, self).__init__(
+            name=name, comm=comm, args=args, localhost=localhost
+        )
+        self.drain_limit = self.cfg.getint('collector_drain_limit', fallback=1000)
+        self.ui_dropped = 0
+        self.periodic_tasks = []
+        self.reporter = self.make_reporter()
+        self.add_periodic_task(self.reporter.interval, self.report_stats)
+        if self.status_interval:
+            self.add_periodic_task(self.status_interval, self.publish_status)
+        if self.heartbeat_timeout:
+            self.add_periodic_task(self.liveness_interval, self.check_liveness)
+        if self.metrics_enabled:
+            self.add_periodic_task(self.metrics_interval, self.publish_metrics)
+
+    def add_periodic_task(self, interval, callback):
+        """ Registers a callback to be run in the event loop every <interval>
+        seconds (must be called before run()) """
+        self.periodic_tasks.append((interval, callback))
+
+    def print_to_stdout(self, counter, info, ui_msg):
+        # aggregated right here; the summary is printed by a periodic task
+        self.reporter.aggregate(counter, info, ui_msg)
+        if self.args.record:
+            lines = make_frame_lines(counter, info, ui_msg)
+            self.write_to_file(lines, series=info["series"])
+
+    def report_stats(self):
+        self.reporter.report()
+        if self.ui_dropped:
+            print("  ({} results not sent to UI)".format(self.ui_dropped),
+                  flush=True)
+            self.ui_dropped = 0
+
+    def send_to_ui(self, ui_msg):
+        # never wait for the UI inside the event loop; if it can't take the
+        # message right away, the message is dropped
+        if ui_msg is None:
+            return
+        try:
+            future = self.ui_socket.send_string(ui_msg, flags=zmq.NOBLOCK)
+        except Exception as e:
+            self.ui_failures += 1
+            print('UI SEND ERROR: ', e)
+        else:
+            future.add_done_callback(self.check_ui_send)
+
+    def check_ui_send(self, future):
+        exp = future.exception()
+        if isinstance(exp, zmq.Again):
+            self.ui_dropped += 1
+            self.ui_failures += 1
+        elif exp is not None:
+            self.ui_failures += 1
+            print('UI SEND ERROR: ', exp)
+
+    def handle_monitor_message(self, msg):
+        if msg:
+            self.check_in_readers(msg)
+
+    async def drain(self, socket, handler, on_idle=None, timeout=None):
+        """ Waits for a socket to become readable, then handles every message
+        that has arrived (up to drain_limit) before yielding to other tasks """
+        while True:
+            if not await socket.poll(timeout=timeout):
+                if on_idle:
+                    on_idle()
+                continue
+            for _ in range(self.drain_limit):
+                try:
+                    message = await socket.recv(flags=zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                handler(message)
+
+    async def run_periodic(self, interval, callback):
+        while True:
+            await asyncio.sleep(interval)
+            callback()
+
+    async def main(self):
+        self.initialize_zmq_sockets()
+        self.initialize_monitor_socket()
+        self.start_metrics_server()
+
+        # turn SIGTERM into a regular shutdown of the loop
+        if current_thread() is main_thread():
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel)
+
+        tasks = [
+            self.drain(self.c_socket, self.handle_results,
+                       on_idle=self.advance_after_idle, timeout=500),
+            self.drain(self.m_socket, self.handle_monitor_message),
+        ]
+        tasks.extend(self.run_periodic(i, cb) for i, cb in self.periodic_tasks)
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.stop_metrics_server()
+            self.close_sockets()
+
+    def run(self):
+        asyncio.run(self.main())
 
 # -- end
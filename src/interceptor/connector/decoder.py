@@ -0,0 +1,289 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Decoding of Eiger stream image payloads (raw, LZ4 and
+bitshuffle/LZ4) into reusable buffers
+"""
+
+import struct
+
+import numpy as np
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+
+from interceptor.connector import utils
+
+# header of a bitshuffle/LZ4 payload: uncompressed size, block size (in bytes);
+# each block is then prefixed with its compressed size
+BSLZ4_HEADER = struct.Struct(">QI")
+BLOCK_HEADER = struct.Struct(">I")
+
+# default block size of the Eiger (and the bitshuffle library), in bytes
+BSLZ4_BLOCK_SIZE = 8192
+
+# blocks are (un)shuffled this many at a time, so that intermediate arrays stay
+# in cache
+CHUNK_BLOCKS = 64
+
+# masks and shifts of the three steps of an 8x8 bit-matrix transpose
+TRANSPOSE_STEPS = [
+    (7, np.uint64(0x00AA00AA00AA00AA)),
+    (14, np.uint64(0x0000CCCC0000CCCC)),
+    (28, np.uint64(0x00000000F0F0F0F0)),
+]
+
+
+class BufferPool:
+    """ Preallocated arrays, handed out round-robin for each shape and dtype;
+    an array is reused after `size` more requests of the same kind, so callers
+    must be done with it by then """
+
+    def __init__(self, size=2, max_kinds=4):
+        """ Constructor
+    :param size: number of arrays of each shape and dtype
+    :param max_kinds: number of shape/dtype combinations kept (the oldest are
+    dropped, e.g. when the detector mode changes)
+    """
+        self.size = max(size, 1)
+        self.max_kinds = max_kinds
+        self.buffers = {}
+        self.next = {}
+
+    def get(self, shape, dtype):
+        key = (tuple(shape), np.dtype(dtype).str)
+        if key not in self.buffers:
+            if len(self.buffers) >= self.max_kinds:
+                oldest = next(iter(self.buffers))
+                del self.buffers[oldest]
+                del self.next[oldest]
+            self.buffers[key] = []
+            self.next[key] = 0
+        buffers = self.buffers[key]
+        idx = self.next[key]
+        if idx == len(buffers):
+            buffers.append(np.empty(shape, dtype=dtype))
+        self.next[key] = (idx + 1) % self.size
+        return buffers[idx]
+
+
+def transpose_bits(words, scratch):
+    """ Transposes the 8x8 bit matrix (byte = row, bit = column) in each word
+    :param words: uint64 array, transposed in place
+    :param scratch: uint64 array of the same shape
+    """
+    for shift, mask in TRANSPOSE_STEPS:
+        np.right_shift(words, shift, out=scratch)
+        scratch ^= words
+        scratch &= mask
+        words ^= scratch
+        scratch <<= shift
+        words ^= scratch
+
+
+def shuffle_blocks(src, dst, block_elems, elem_size, pool, unshuffle=True):
+    """ Bit(un)shuffles consecutive blocks of elements. A shuffled block holds
+    bit j of byte i of all its elements in row 8 * i + j (element k in bit k % 8
+    of byte k // 8 of the row), so both directions are transposes of 8x8 bit
+    matrices between the rows and groups of eight elements
+    :param src: uint8 array (a whole number of blocks)
+    :param dst: uint8 array of the same size
+    :param block_elems: number of elements in a block (multiple of 8)
+    :param elem_size: element size in bytes
+    :param pool: BufferPool for the intermediate arrays
+    :param unshuffle: if True, src is shuffled and dst unshuffled; otherwise
+    the other way round
+    """
+    m = block_elems // 8
+    n_blocks = len(src) // (block_elems * elem_size)
+    shuffled = (src if unshuffle else dst).reshape(n_blocks, elem_size, 8, m)
+    plain = (dst if unshuffle else src).reshape(n_blocks, block_elems, elem_size)
+    chunk = min(CHUNK_BLOCKS, n_blocks)
+    words, scratch = pool.get((2, chunk, elem_size, m), np.uint64)
+
+    # bytes are moved one row (or one byte of the elements) at a time, so that
+    # the copies run along the long axis
+    for b0 in range(0, n_blocks, chunk):
+        b1 = min(b0 + chunk, n_blocks)
+        w = words[: b1 - b0]
+        w_bytes = w.view(np.uint8).reshape(b1 - b0, elem_size, m, 8)
+        w_elems = w_bytes.reshape(b1 - b0, elem_size, block_elems)
+        if unshuffle:
+            for j in range(8):
+                w_bytes[:, :, :, j] = shuffled[b0:b1, :, j, :]
+            transpose_bits(w, scratch[: b1 - b0])
+            for i in range(elem_size):
+                plain[b0:b1, :, i] = w_elems[:, i]
+        else:
+            for i in range(elem_size):
+                w_elems[:, i] = plain[b0:b1, :, i]
+            transpose_bits(w, scratch[: b1 - b0])
+            for j in range(8):
+                shuffled[b0:b1, :, j, :] = w_bytes[:, :, :, j]
+
+
+def block_layout(n_elems, block_elems):
+    """ Blocks of a bitshuffle/LZ4 payload: full blocks, a last block with a
+    multiple of 8 elements, and up to 7 elements that are stored as they are
+    :return: number of full blocks, elements in the last block, leftover elements
+    """
+    n_full, last = divmod(n_elems, block_elems)
+    return n_full, last - last % 8, last % 8
+
+
+def parse_encoding(encoding):
+    """ Splits an Eiger encoding string (e.g. "bs32-lz4<") into the compression
+    and the byte order
+    """
+    encoding = encoding or '<'
+    byteorder = encoding[-1] if encoding[-1] in '<>' else '<'
+    return encoding.rstrip('<>'), byteorder
+
+
+def require_lz4(compression):
+    if lz4_block is None:
+        raise RuntimeError(
+            'the lz4 package is required for "{}" images'.format(compression))
+
+
+class FrameDecoder:
+    """ Decodes image payloads, as described by the dimension frame (second
+    frame of each image in the Eiger stream). Compressed payloads are decoded
+    into arrays from a BufferPool, so no new image-sized arrays are allocated
+    per frame; raw payloads are returned as (read-only) views on the frame """
+
+    COMPRESSIONS = ['', 'lz4']
+
+    def __init__(self, pool_size=2):
+        """ Constructor
+    :param pool_size: number of decoded images of the same shape that can be
+    alive at the same time
+    """
+        self.pool = BufferPool(size=pool_size)
+        self.scratch = BufferPool(size=1)
+        self.dimension_frame = None
+        self.dimensions = None
+
+    def read_dimensions(self, frame):
+        """ Image shape, dtype and compression from a dimension frame (parsed
+        again only when it changes)
+        :return: shape (rows, columns), dtype, compression
+        """
+        frame = bytes(frame)
+        if frame != self.dimension_frame:
+            ddict = utils.decode_frame(frame)
+            compression, byteorder = parse_encoding(ddict.get('encoding'))
+            if compression not in self.COMPRESSIONS and not (
+                    compression.startswith('bs') and compression.endswith('-lz4')):
+                raise ValueError('unsupported image encoding "{}"'.format(
+                    ddict.get('encoding')))
+            width, height = ddict['shape']
+            dtype = np.dtype(ddict['type']).newbyteorder(byteorder)
+            self.dimensions = ((height, width), dtype, compression)
+            self.dimension_frame = frame
+        return self.dimensions
+
+    def decode(self, dimension_frame, payload):
+        """ Decodes an image payload
+        :param dimension_frame: dimension frame of the image
+        :param payload: image payload (bytes, memoryview or zmq.Frame)
+        :return: 2D NumPy array
+        """
+        shape, dtype, compression = self.read_dimensions(dimension_frame)
+        if compression == '':
+            return utils.frame_to_array(payload, dtype=dtype, shape=shape)
+        require_lz4(compression)
+        image = self.pool.get(shape, dtype)
+        if compression == 'lz4':
+            self.decode_lz4(utils.frame_buffer(payload), image)
+        else:
+            self.decode_bslz4(utils.frame_buffer(payload), image)
+        return image
+
+    @staticmethod
+    def decode_lz4(payload, image):
+        raw = lz4_block.decompress(payload, uncompressed_size=image.nbytes)
+        if len(raw) != image.nbytes:
+            raise ValueError('decoded size does not match the image shape')
+        image.reshape(-1).view(np.uint8)[:] = np.frombuffer(raw, dtype=np.uint8)
+
+    def decode_bslz4(self, payload, image):
+        total, block_size = BSLZ4_HEADER.unpack_from(payload)
+        if total != image.nbytes:
+            raise ValueError('payload size does not match the image shape')
+        elem_size = image.itemsize
+        block_elems = block_size // elem_size
+        n_full, last_elems, n_rest = block_layout(image.size, block_elems)
+
+        # decompress all blocks (still shuffled) into one scratch buffer
+        shuffled = self.scratch.get((image.nbytes,), np.uint8)
+        pos = BSLZ4_HEADER.size
+        out_pos = 0
+        for i in range(n_full + (last_elems > 0)):
+            size, = BLOCK_HEADER.unpack_from(payload, pos)
+            pos += BLOCK_HEADER.size
+            n_bytes = block_size if i < n_full else last_elems * elem_size
+            block = lz4_block.decompress(payload[pos: pos + size],
+                                         uncompressed_size=n_bytes)
+            shuffled[out_pos: out_pos + n_bytes] = np.frombuffer(block, np.uint8)
+            pos += size
+            out_pos += n_bytes
+
+        out = image.reshape(-1).view(np.uint8)
+        full = n_full * block_size
+        if n_full:
+            shuffle_blocks(shuffled[:full], out[:full], block_elems, elem_size,
+                           self.scratch)
+        if last_elems:
+            shuffle_blocks(shuffled[full: out_pos], out[full: out_pos],
+                           last_elems, elem_size, self.scratch)
+        if n_rest:
+            out[out_pos:] = np.frombuffer(
+                payload[pos: pos + n_rest * elem_size], np.uint8)
+
+
+def encode_image(image, compression='bs32-lz4', block_size=BSLZ4_BLOCK_SIZE):
+    """ Encodes an image the way the Eiger does (for simulated streams and
+    tests)
+    :param image: 2D NumPy array
+    :param compression: '', 'lz4' or 'bsN-lz4'
+    :param block_size: bitshuffle block size in bytes
+    :return: payload (bytes)
+    """
+    image = np.ascontiguousarray(image)
+    raw = image.reshape(-1).view(np.uint8)
+    if compression == '':
+        return raw.tobytes()
+    require_lz4(compression)
+    if compression == 'lz4':
+        return lz4_block.compress(raw, store_size=False)
+
+    elem_size = image.itemsize
+    block_elems = block_size // elem_size
+    n_full, last_elems, n_rest = block_layout(image.size, block_elems)
+    shuffled = np.empty_like(raw)
+    full = n_full * block_size
+    end = full + last_elems * elem_size
+    pool = BufferPool(size=1)
+    if n_full:
+        shuffle_blocks(raw[:full], shuffled[:full], block_elems, elem_size, pool,
+                       unshuffle=False)
+    if last_elems:
+        shuffle_blocks(raw[full:end], shuffled[full:end], last_elems, elem_size,
+                       pool, unshuffle=False)
+
+    parts = [BSLZ4_HEADER.pack(image.nbytes, block_size)]
+    for start in list(range(0, full, block_size)) + ([full] if last_elems else []):
+        stop = min(start + block_size, end)
+        block = lz4_block.compress(shuffled[start:stop], store_size=False)
+        parts += [BLOCK_HEADER.pack(len(block)), block]
+    parts.append(raw[end:].tobytes())
+    return b"".join(parts)
+
+
+# -- end
@@ -0,0 +1,217 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Per-pixel detector geometry (d-spacing, radial bins, resolution
+mask), computed once per series and optionally cached on disk
+"""
+
+import hashlib
+import os
+
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+# series header keys that define the geometry
+GEOMETRY_KEYS = [
+    'beam_center_x',
+    'beam_center_y',
+    'detector_distance',
+    'wavelength',
+    'x_pixel_size',
+    'y_pixel_size',
+]
+
+ARRAYS = ['d_spacing', 'radial_bin', 'mask', 'bin_edges']
+
+# geometries in memory, shared by every GeometryCache of the process (processors
+# are remade when the run mode changes, and there is one per processing thread)
+GEOMETRIES = OrderedDict()
+GEOMETRIES_LOCK = Lock()
+
+
+def read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+class DetectorGeometry:
+    """ Geometry arrays for one detector setting; all arrays are read-only, so
+    they can be shared by every frame of the series (and memory-mapped from the
+    on-disk cache). The detector is assumed to be flat and normal to the beam
+
+      - d_spacing: d-spacing of each pixel center (float32, in Angstrom)
+      - radial_bin: index of each pixel in n_bins bins of equal width in 1/d^2
+      - mask: True for pixels within the resolution range (None for no limits)
+      - bin_edges: 1/d^2 at the edges of the radial bins
+    """
+
+    def __init__(self, d_spacing, radial_bin, mask, bin_edges):
+        self.d_spacing = d_spacing
+        self.radial_bin = radial_bin
+        self.mask = mask
+        self.bin_edges = bin_edges
+        self.n_bins = len(bin_edges) - 1
+
+    @property
+    def bin_d(self):
+        """ d-spacing at the center of each radial bin """
+        centers = (self.bin_edges[:-1] + self.bin_edges[1:]) / 2
+        return 1 / np.sqrt(centers)
+
+    def pixel_at(self, x, y):
+        """ Pixel indices (rows, columns) of (sub-pixel) image positions """
+        h, w = self.d_spacing.shape
+        rows = np.clip(np.asarray(y, dtype=np.int64), 0, h - 1)
+        cols = np.clip(np.asarray(x, dtype=np.int64), 0, w - 1)
+        return rows, cols
+
+    def d_at(self, x, y):
+        """ d-spacings at (sub-pixel) image positions, e.g. spot centroids """
+        return self.d_spacing[self.pixel_at(x, y)]
+
+    @classmethod
+    def compute(cls, params, shape, n_bins=1000, d_min=None, d_max=None):
+        """ Computes the geometry arrays
+        :param params: geometry values from the series header (GEOMETRY_KEYS;
+        distances and pixel sizes in m, wavelength in Angstrom)
+        :param shape: image shape (rows, columns)
+        :param n_bins: number of radial bins
+        :param d_min: (optional) high resolution limit of the mask
+        :param d_max: (optional) low resolution limit of the mask
+        :return: DetectorGeometry
+        """
+        h, w = shape
+        distance = params['detector_distance']
+        wavelength = params['wavelength']
+        dx = (np.arange(w) + 0.5 - params['beam_center_x']) * params['x_pixel_size']
+        dy = (np.arange(h) + 0.5 - params['beam_center_y']) * params['y_pixel_size']
+        r2 = dy[:, None] ** 2 + dx[None, :] ** 2
+
+        # 1/d^2 = (2 sin(theta) / wavelength)^2 = 2 (1 - cos(2 theta)) / wavelength^2
+        inv_d2 = np.sqrt(r2 + distance ** 2)
+        np.divide(distance, inv_d2, out=inv_d2)
+        np.subtract(1, inv_d2, out=inv_d2)
+        inv_d2 *= 2 / wavelength ** 2
+        with np.errstate(divide='ignore'):
+            d_spacing = (1 / np.sqrt(inv_d2)).astype(np.float32)
+
+        bin_edges = np.linspace(0, inv_d2.max(), n_bins + 1)
+        bin_dtype = np.int16 if n_bins <= np.iinfo(np.int16).max else np.int32
+        radial_bin = np.minimum(
+            inv_d2 * (n_bins / bin_edges[-1]), n_bins - 1).astype(bin_dtype)
+
+        mask = None
+        if d_min or d_max:
+            mask = np.ones(shape, dtype=bool)
+            if d_min:
+                mask &= d_spacing >= d_min
+            if d_max:
+                mask &= d_spacing <= d_max
+            mask = read_only(mask)
+        return cls(
+            d_spacing=read_only(d_spacing),
+            radial_bin=read_only(radial_bin),
+            mask=mask,
+            bin_edges=read_only(bin_edges),
+        )
+
+    def save(self, path):
+        """ Writes the arrays as .npy files into a new directory (renamed into
+        place at the end, so that concurrent Readers never see partial files) """
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        os.makedirs(tmp_path, exist_ok=True)
+        for name in ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(os.path.join(tmp_path, name + '.npy'), array)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:  # another Reader got there first
+            for filename in os.listdir(tmp_path):
+                os.remove(os.path.join(tmp_path, filename))
+            os.rmdir(tmp_path)
+
+    @classmethod
+    def load(cls, path):
+        """ Memory-maps the arrays of a saved geometry (read-only; Readers on
+        the same host share the pages) """
+        arrays = {}
+        for name in ARRAYS:
+            filepath = os.path.join(path, name + '.npy')
+            arrays[name] = np.load(filepath, mmap_mode='r') if os.path.exists(
+                filepath) else None
+        return cls(**arrays)
+
+
+class GeometryCache:
+    """ Detector geometries keyed by the series header values they depend on;
+    a geometry is computed when a series with a new setting starts, and reused
+    for every frame after that. The geometries in memory are shared within the
+    process (see GEOMETRIES) """
+
+    def __init__(self, n_bins=1000, d_min=None, d_max=None, cache_dir=None,
+                 max_entries=2):
+        """ Constructor
+    :param n_bins: number of radial bins
+    :param d_min: (optional) high resolution limit of the mask
+    :param d_max: (optional) low resolution limit of the mask
+    :param cache_dir: (optional) directory of the on-disk cache
+    :param max_entries: number of geometries kept in memory
+    """
+        self.n_bins = n_bins
+        self.d_min = d_min
+        self.d_max = d_max
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.geometries = GEOMETRIES
+
+    def make_key(self, header, shape):
+        params = tuple(float(header[k]) for k in GEOMETRY_KEYS)
+        return params + tuple(shape) + (self.n_bins, self.d_min, self.d_max)
+
+    def cache_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, 'geometry_{}'.format(digest))
+
+    def get(self, header, shape):
+        """ Geometry for a series
+        :param header: decoded series header (needs the GEOMETRY_KEYS)
+        :param shape: image shape (rows, columns)
+        :return: DetectorGeometry
+        """
+        key = self.make_key(header, shape)
+        with GEOMETRIES_LOCK:  # (computed once, even if several threads ask)
+            geometry = self.geometries.get(key)
+            if geometry is not None:
+                self.geometries.move_to_end(key)
+                return geometry
+            geometry = self.load_or_compute(key, header, shape)
+            self.geometries[key] = geometry
+            while len(self.geometries) > self.max_entries:
+                self.geometries.popitem(last=False)
+            return geometry
+
+    def load_or_compute(self, key, header, shape):
+        """ Geometry from the on-disk cache, or computed (and saved there) """
+        path = self.cache_path(key) if self.cache_dir else None
+        if path and os.path.isdir(path):
+            geometry = DetectorGeometry.load(path)
+        else:
+            geometry = DetectorGeometry.compute(
+                {k: float(header[k]) for k in GEOMETRY_KEYS}, shape,
+                n_bins=self.n_bins, d_min=self.d_min, d_max=self.d_max)
+            if path:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    geometry.save(path)
+                except OSError as e:
+                    print('GEOMETRY CACHE ERROR: {}'.format(e))
+        return geometry
+
+
+# -- end
@@ -0,0 +1,93 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Ice-ring detection from a radial intensity profile
+"""
+
+import numpy as np
+
+# d-spacings of the strongest rings of hexagonal ice (Angstrom)
+ICE_RINGS = [3.897, 3.669, 3.441, 2.671, 2.249, 2.072, 1.948, 1.918, 1.883, 1.721]
+
+
+class IceRingDetector:
+    """ Flags ice rings by comparing the mean intensity of the radial bins on
+    each ring with that of the bins on either side of it. Only the bins near ice
+    rings are needed, so the pixels in them (and their bins) are selected once
+    per series; each frame then takes a single np.bincount over those pixels """
+
+    def __init__(self, geometry, mask=None, width=0.002, sigma=5.0,
+                 contrast=0.1, min_pixels=50):
+        """ Constructor
+    :param geometry: DetectorGeometry of the series
+    :param mask: (optional) 2D boolean array, True for valid pixels
+    :param width: width of an ice ring (in 1/d^2)
+    :param sigma: minimum significance of a ring over its background
+    :param contrast: minimum relative excess of a ring over its background
+    :param min_pixels: minimum number of pixels on a ring (and beside it)
+    """
+        self.geometry = geometry
+        self.sigma = sigma
+        self.contrast = contrast
+        self.min_pixels = min_pixels
+
+        lower = geometry.bin_edges[:-1]
+        upper = geometry.bin_edges[1:]
+        rings = []
+        for d in ICE_RINGS:
+            center = 1 / d ** 2
+            rings.append((
+                (upper > center - width / 2) & (lower < center + width / 2),
+                (upper > center - 2.5 * width) & (lower < center + 2.5 * width),
+            ))
+        self.ice_bin = np.logical_or.reduce([on_ring for on_ring, _ in rings])
+
+        # bins around the rings are renumbered 0..n_window-1
+        in_window = np.logical_or.reduce([window for _, window in rings])
+        window_idx = np.cumsum(in_window) - 1
+        self.n_window = int(in_window.sum())
+        self.rings = []
+        for on_ring, window in rings:
+            background = window & ~self.ice_bin
+            if on_ring.any() and background.any():
+                self.rings.append((window_idx[on_ring], window_idx[background]))
+
+        selected = in_window[geometry.radial_bin]
+        if mask is not None:
+            selected &= mask
+        self.pixels = np.flatnonzero(selected)
+        self.bins = window_idx[geometry.radial_bin.ravel()[self.pixels]]
+        self.counts = np.bincount(self.bins, minlength=self.n_window)
+
+    def count_rings(self, image):
+        """ Number of ice rings on an image """
+        if not self.rings:
+            return 0
+        sums = np.bincount(self.bins, weights=image.ravel()[self.pixels],
+                           minlength=self.n_window)
+        n_rings = 0
+        for on_ring, background in self.rings:
+            n_ring = self.counts[on_ring].sum()
+            n_bg = self.counts[background].sum()
+            if n_ring < self.min_pixels or n_bg < self.min_pixels:
+                continue
+            ring_mean = sums[on_ring].sum() / n_ring
+            bg_mean = sums[background].sum() / n_bg
+            # Poisson error of the mean on the ring
+            error = np.sqrt(max(bg_mean, 1) / n_ring)
+            if (ring_mean - bg_mean > self.sigma * error
+                    and ring_mean > bg_mean * (1 + self.contrast)):
+                n_rings += 1
+        return n_rings
+
+    def on_ice_ring(self, x, y):
+        """ True for (sub-pixel) image positions, e.g. spot centroids, that are
+        on an ice ring """
+        pixels = self.geometry.pixel_at(x, y)
+        return self.ice_bin[self.geometry.radial_bin[pixels]]
+
+
+# -- end
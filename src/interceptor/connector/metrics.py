@@ -0,0 +1,86 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : HTTP endpoint serving Collector metrics in Prometheus text format
+"""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{{{}}}".format(",".join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels.items()))
+
+
+def format_metrics(metrics):
+    """ Renders metrics in the Prometheus text format
+    :param metrics: list of (name, type, help, samples), where samples is a list
+    of (suffix, labels, value): suffix of the sample name (e.g. '_count' of a
+    summary, or ''), labels a dictionary (or None)
+    :return: string
+    """
+    lines = []
+    for name, mtype, help_text, samples in metrics:
+        lines.append("# HELP {} {}".format(name, help_text))
+        lines.append("# TYPE {} {}".format(name, mtype))
+        for suffix, labels, value in samples:
+            lines.append("{}{}{} {}".format(
+                name, suffix, format_labels(labels), repr(float(value))))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        try:
+            body = format_metrics(self.server.collect()).encode('utf-8')
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # no line on stdout for each scrape
+        pass
+
+
+class MetricsServer(Thread):
+    """ Serves metrics over HTTP from a background thread; the metrics are
+    collected (by the given callable) only when scraped, so the Collector loop
+    only keeps its counters up to date """
+
+    def __init__(self, collect, host='localhost', port=8999):
+        """ Constructor
+    :param collect: callable that returns the metrics (see format_metrics)
+    :param host: host (interface) to listen on
+    :param port: port to listen on (0 for any free port)
+    """
+        Thread.__init__(self, name="metrics_server", daemon=True)
+        self.server = HTTPServer((host, port), MetricsHandler)
+        self.server.collect = collect
+        self.port = self.server.server_address[1]
+
+    def run(self):
+        self.server.serve_forever()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# -- end
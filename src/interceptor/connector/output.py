@@ -0,0 +1,365 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Output handlers for the Collector
+"""
+
+import os
+import time
+
+from queue import Queue, Empty, Full
+from threading import Thread
+
+
+def make_frame_lines(counter, info, ui_msg):
+    """ Per-frame report lines, as printed to stdout and recorded to file """
+    return [
+        "*** [{}] ({}) SERIES {}, FRAME {} ({}):".format(
+            counter, info["proc_name"], info["series"], info["frame"],
+            info["full_path"]
+        ),
+        "  {}".format(ui_msg),
+        "  TIME: wait = {:.4f} sec, recv = {:.4f} sec, parse = {:.4f} sec, "
+        "dec = {:.4f} sec, proc = {:.4f} ,total = {:.2f} sec".format(
+            info["wait_time"],
+            info["receive_time"],
+            info.get("parse_time", 0),
+            info.get("decode_time", 0),
+            info["proc_time"],
+            info["total_time"],
+        ),
+        "***\n",
+    ]
+
+
+def make_latency_lines(summary):
+    """ Report lines for the stage latencies of a series (see
+    stats.SeriesLatency.summary): percentiles over all Readers, and the 99th
+    percentile of each stage per Reader """
+    lines = ["*** LATENCY, SERIES {}:".format(summary["series"])]
+    for stage, stage_stats in summary["global"].items():
+        lines.append(
+            "  {}: p50 = {:.4f} sec, p95 = {:.4f} sec, p99 = {:.4f} sec, max = "
+            "{:.4f} sec ({} frames)".format(
+                stage,
+                stage_stats["p50"],
+                stage_stats["p95"],
+                stage_stats["p99"],
+                stage_stats["max"],
+                stage_stats["count"],
+            )
+        )
+    for name, reader_stats in summary["readers"].items():
+        lines.append("  {} p99: {}".format(name, ", ".join(
+            "{} = {:.4f}".format(stage, stage_stats["p99"])
+            for stage, stage_stats in reader_stats.items())))
+    return lines
+
+
+class ResultFormatter:
+    """ Compiles the output format spec from the startup config into a template
+    once, so that each result string is rendered in a single pass """
+
+    RESULT_TEMPLATE = "{0} {1} {2} {3:.2f} {4} {5:.2f} {6} {7} {{{8}}}"
+    RESULT_KEYS = (
+        "n_spots",  # number_of_spots
+        "n_overloads",  # number_of_spots_with_overloaded_pixels
+        "score",  # composite score (used to be n_indexed...)
+        "hres",  # high resolution boundary
+        "n_ice_rings",  # number_of_ice-rings
+        "mean_shape_ratio",  # mean spot shape ratio
+        "sg",  # space group
+        "uc",  # unit cell
+    )
+    BRACKETS = ['{}', '()', '[]']
+
+    def __init__(self, cfg):
+        """ Constructor
+    :param cfg: startup config section (output_* keys)
+    """
+        self.prefix_key = cfg.getstr('output_prefix_key')
+        self.default_prefix = cfg.getstr('default_output_prefix')
+        if cfg.getstr('output_delimiter') is not None:
+            delimiter = '{} '.format(cfg.getstr('output_delimiter'))
+        else:
+            delimiter = ' '
+        format_keywords = [i.strip() for i in cfg.getstr('output_format').split(',')]
+        self.compile(format_keywords, delimiter)
+
+    @staticmethod
+    def escape(text):
+        return text.replace('{', '{{').replace('}', '}}')
+
+    def compile(self, format_keywords, delimiter):
+        """ Turns format keywords into one format template and the list of info
+        keys whose values fill it (None stands for the result string) """
+        items = []
+        self.keys = []
+        for kw in format_keywords:
+            keyword = kw
+            bracket = None
+            split_kw = kw.split(' ')
+            if len(split_kw) == 2 and split_kw[1] in self.BRACKETS:
+                keyword = split_kw[0]
+                bracket = split_kw[1]
+
+            if kw.startswith('[') and kw.endswith(']'):
+                keyword = ''
+                self.keys.append(kw[1:-1])
+            elif 'result' in keyword:
+                self.keys.append(None)
+            else:
+                self.keys.append(keyword)
+
+            if keyword == '':
+                items.append('{}')
+            elif bracket:
+                items.append('{0} {1}{{}}{2}'.format(
+                    self.escape(keyword),
+                    self.escape(bracket[0]),
+                    self.escape(bracket[1]),
+                ))
+            else:
+                items.append('{} {{}}'.format(self.escape(keyword)))
+        self.template = '{} ' + self.escape(delimiter).join(items)
+
+    def make_results(self, info):
+        # Collect results and errors
+        err_list = [
+            info[e] for e in info if ("error" in e or "comment" in e) and info[e] != ""
+        ]
+        errors = "; ".join(err_list)
+        values = [info[k] for k in self.RESULT_KEYS]
+        values.append(errors)
+        return self.RESULT_TEMPLATE.format(*values)
+
+    def render(self, info):
+        """ Renders result string for the UI; raises KeyError if a keyword in
+        the output format is missing from the info dictionary """
+        prefix = info.get(self.prefix_key, '')
+        if prefix == '':
+            prefix = self.default_prefix
+        values = [
+            self.make_results(info) if key is None else info[key]
+            for key in self.keys
+        ]
+        return self.template.format(prefix, *values)
+
+
+class RecordWriter(Thread):
+    """ Writes Collector records to file from a background thread, so that file
+    I/O stays off the result path. Lines are passed through a bounded queue and
+    written with a large buffer; the file is fsync'ed periodically, rotated by
+    size and/or series, and flushed when the writer is closed """
+
+    def __init__(
+            self,
+            filepath,
+            queue_size=10000,
+            buffer_size=1048576,
+            fsync_interval=5.0,
+            max_size=None,
+            rotate_by_series=False,
+    ):
+        """ Constructor
+    :param filepath: path of the record file
+    :param queue_size: maximum number of pending records (writes block when full)
+    :param buffer_size: file write buffer size (bytes)
+    :param fsync_interval: seconds between fsyncs (None or 0 to never fsync)
+    :param max_size: rotate the file once it reaches this size (bytes)
+    :param rotate_by_series: rotate the file whenever a new series starts
+    """
+        Thread.__init__(self, name="record_writer", daemon=True)
+        self.filepath = filepath
+        self.queue = Queue(maxsize=queue_size)
+        self.buffer_size = buffer_size
+        self.fsync_interval = fsync_interval
+        self.max_size = max_size
+        self.rotate_by_series = rotate_by_series
+        self.series = None
+        self.closed = False
+        self.rf = None
+
+    def write(self, lines, series=None):
+        if not self.closed:
+            self.queue.put((lines, series))
+
+    def close(self):
+        """ Writes all pending records, flushes and closes the file """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        if self.is_alive():
+            self.join()
+
+    def open_file(self):
+        self.rf = open(self.filepath, "a", buffering=self.buffer_size)
+        self.size = self.rf.tell()
+
+    def sync(self):
+        self.rf.flush()
+        os.fsync(self.rf.fileno())
+        self.last_sync = time.time()
+
+    def rotate(self):
+        """ Moves the current file to the next free <filepath>.N and starts a new
+        one """
+        self.rf.close()
+        idx = 1
+        while os.path.exists("{}.{}".format(self.filepath, idx)):
+            idx += 1
+        os.rename(self.filepath, "{}.{}".format(self.filepath, idx))
+        self.open_file()
+
+    def write_lines(self, lines, series):
+        if series is not None and series != self.series:
+            if self.rotate_by_series and self.series is not None and self.size:
+                self.rotate()
+            self.series = series
+        for line in lines:
+            self.size += self.rf.write(line)
+        if self.max_size and self.size >= self.max_size:
+            self.rotate()
+
+    def run(self):
+        self.open_file()
+        self.last_sync = time.time()
+        try:
+            while True:
+                timeout = None
+                if self.fsync_interval:
+                    timeout = max(self.last_sync + self.fsync_interval - time.time(), 0)
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except Empty:
+                    item = False
+                if item is None:
+                    break
+                elif item:
+                    self.write_lines(*item)
+                if self.fsync_interval:
+                    if time.time() >= self.last_sync + self.fsync_interval:
+                        self.sync()
+        finally:
+            self.sync()
+            self.rf.close()
+
+
+class ConsoleReporter(Thread):
+    """ Prints aggregated Collector statistics (frame rate, hit rate, per-reader
+    latency) from a background thread at a fixed interval, and optionally every
+    Nth frame in full, so that verbose output doesn't slow down the Collector """
+
+    def __init__(self, interval=5.0, sample_every=0, hit_threshold=10,
+                 queue_size=10000):
+        """ Constructor
+    :param interval: seconds between summaries
+    :param sample_every: print every Nth frame in full (0 to print none)
+    :param hit_threshold: minimum number of spots for a frame to count as a hit
+    :param queue_size: maximum number of pending frames (excess is not reported)
+    """
+        Thread.__init__(self, name="console_reporter", daemon=True)
+        self.queue = Queue(maxsize=queue_size)
+        self.interval = interval
+        self.sample_every = sample_every
+        self.hit_threshold = hit_threshold
+        self.skipped = 0
+        self.errors = 0
+        self.reset()
+
+    def reset(self):
+        self.window_start = time.time()
+        self.n_frames = 0
+        self.n_sampled = 0
+        self.n_hits = 0
+        self.reader_stats = {}
+
+    def add(self, counter, info, ui_msg):
+        try:
+            self.queue.put_nowait((counter, info, ui_msg))
+        except Full:
+            self.skipped += 1
+
+    def aggregate(self, counter, info, ui_msg):
+        self.n_frames += 1
+        # frames skipped by a Reader in overload mode don't count for hit rate
+        if info.get("sampled", 1):
+            self.n_sampled += 1
+            if info.get("n_spots", 0) >= self.hit_threshold:
+                self.n_hits += 1
+        stats = self.reader_stats.setdefault(
+            info["proc_name"], {"frames": 0, "total_time": 0, "proc_time": 0}
+        )
+        stats["frames"] += 1
+        stats["total_time"] += info.get("total_time", 0)
+        stats["proc_time"] += info.get("proc_time", 0)
+        if self.sample_every and counter % self.sample_every == 0:
+            for ln in make_frame_lines(counter, info, ui_msg):
+                print(ln)
+
+    def report(self):
+        elapsed = time.time() - self.window_start
+        if self.n_frames:
+            lines = [
+                "*** {}: {} frames in {:.1f} sec ({:.1f} Hz), hit rate {:.1f}% "
+                "({} hits)".format(
+                    time.strftime('%b %d %Y %I:%M:%S %p'),
+                    self.n_frames,
+                    elapsed,
+                    self.n_frames / elapsed,
+                    self.n_hits / self.n_sampled * 100 if self.n_sampled else 0,
+                    self.n_hits,
+                )
+            ]
+            if self.n_sampled < self.n_frames:
+                lines[0] += ", sampled {:.1f}%".format(
+                    self.n_sampled / self.n_frames * 100)
+            for name in sorted(self.reader_stats):
+                stats = self.reader_stats[name]
+                lines.append(
+                    "  {}: {} frames, avg latency = {:.4f} sec, avg proc = {:.4f} "
+                    "sec".format(
+                        name,
+                        stats["frames"],
+                        stats["total_time"] / stats["frames"],
+                        stats["proc_time"] / stats["frames"],
+                    )
+                )
+            if self.skipped:
+                lines.append("  ({} frames not reported)".format(self.skipped))
+                self.skipped = 0
+            if self.errors:
+                lines.append("  ({} frames could not be reported)".format(
+                    self.errors))
+                self.errors = 0
+            print("\n".join(lines), flush=True)
+        self.reset()
+
+    def run(self):
+        while True:
+            timeout = max(self.window_start + self.interval - time.time(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except Empty:
+                pass
+            else:
+                # one bad record must not end reporting (the queue would fill up,
+                # and every later frame would go unreported)
+                try:
+                    self.aggregate(*item)
+                except Exception as e:
+                    self.errors += 1
+                    print('REPORTER ERROR: ', e, flush=True)
+            if time.time() >= self.window_start + self.interval:
+                try:
+                    self.report()
+                except Exception as e:
+                    print('REPORTER ERROR: ', e, flush=True)
+                    self.reset()
+
+
+# -- end
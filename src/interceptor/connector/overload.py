@@ -0,0 +1,130 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Adaptive frame sampling for Readers that fall behind the stream
+"""
+
+import struct
+import time
+
+# stamp the Connector puts in the second frame of a dispatched multipart: time
+# the frame was received from the Splitter, number of frames in its backlog,
+# number of frames it dropped so far
+BROKER_STAMP = struct.Struct("<dII")
+
+
+def make_stamp(received, backlog, dropped=0):
+    return BROKER_STAMP.pack(received, backlog, dropped)
+
+
+def read_stamp(frame):
+    """ Reads a Connector stamp
+    :param frame: second frame of a multipart from the Connector
+    :return: received (time), backlog, dropped; or None if the frame has no
+    stamp
+    """
+    frame = bytes(frame)
+    if len(frame) != BROKER_STAMP.size:
+        return None
+    return BROKER_STAMP.unpack(frame)
+
+
+class OverloadController:
+    """ Decides which frames a Reader processes in full. While the pipeline keeps
+    up, every frame is processed (stride 1); when frames arrive late (latency
+    since the Connector received them) or the backlog grows, only every Nth
+    frame is processed, and the rest are reported without processing. N doubles
+    (up to max_stride) after a window of frames that were mostly behind, and is
+    halved after a window of frames that were all well within the limits """
+
+    def __init__(self, max_latency=2.0, max_backlog=10, max_stride=8, window=10):
+        """ Constructor
+    :param max_latency: frames older than this (in seconds) are behind
+    :param max_backlog: frames that arrive with this many frames (or more)
+    waiting behind them are behind
+    :param max_stride: largest N (1 to never skip frames)
+    :param window: number of frames between adjustments of N
+    """
+        self.max_latency = max_latency
+        self.max_backlog = max_backlog
+        self.max_stride = max(max_stride, 1)
+        self.window = window
+        self.stride = 1
+        self.counter = 0
+        self.n_window = 0
+        self.n_behind = 0
+        self.n_ahead = 0
+
+    def is_behind(self, latency, backlog):
+        if latency is not None and latency > self.max_latency:
+            return True
+        return bool(self.max_backlog) and backlog >= self.max_backlog
+
+    def is_ahead(self, latency, backlog):
+        if latency is not None and latency > self.max_latency / 2:
+            return False
+        return not self.max_backlog or backlog < self.max_backlog / 2
+
+    def admit(self, latency=None, backlog=0):
+        """ Records the state of the pipeline when a frame arrives, and decides
+        whether the frame is processed
+        :param latency: (optional) seconds since the frame entered the pipeline
+        :param backlog: number of frames waiting (Connector and Reader queues)
+        :return: True if the frame is to be processed
+        """
+        self.n_window += 1
+        self.n_behind += self.is_behind(latency, backlog)
+        self.n_ahead += self.is_ahead(latency, backlog)
+        if self.n_window >= self.window:
+            if self.n_behind > self.n_window // 2:
+                self.stride = min(self.stride * 2, self.max_stride)
+            elif self.n_ahead == self.n_window:
+                self.stride = max(self.stride // 2, 1)
+            self.n_window = self.n_behind = self.n_ahead = 0
+
+        self.counter += 1
+        return self.counter % self.stride == 0
+
+
+class SamplingStats:
+    """ Counts of processed (sampled) and skipped frames seen by the Collector,
+    in total and since the last report """
+
+    def __init__(self):
+        self.total = {'frames': 0, 'sampled': 0}
+        self.window = {'frames': 0, 'sampled': 0}
+        self.window_start = time.time()
+
+    def add(self, sampled):
+        for counts in (self.total, self.window):
+            counts['frames'] += 1
+            counts['sampled'] += bool(sampled)
+
+    @staticmethod
+    def ratio(counts):
+        return counts['sampled'] / counts['frames'] if counts['frames'] else 1.0
+
+    def report(self):
+        """ Sampling since the last report (and in total); starts a new window
+        :return: dictionary
+        """
+        now = time.time()
+        elapsed = now - self.window_start
+        report = {
+            'frames': self.window['frames'],
+            'sampled': self.window['sampled'],
+            'sampling_ratio': self.ratio(self.window),
+            'rate': self.window['frames'] / elapsed if elapsed > 0 else 0,
+            'total_frames': self.total['frames'],
+            'total_sampled': self.total['sampled'],
+            'total_sampling_ratio': self.ratio(self.total),
+        }
+        self.window = {'frames': 0, 'sampled': 0}
+        self.window_start = now
+        return report
+
+
+# -- end
@@ -3,14 +3,21 @@ from __future__ import absolute_import, division, print_function
 """
 Author      : Lyubimov, A.Y.
 Created     : 03/31/2020
-Last Changed: 05/15/2020
+Last Changed: 10/17/2026
 Description : Streaming stills processor for live data analysis
 """
 
 import copy
-import time  # noqa: F401; keep around for testing
+import time
 
 import numpy as np
+
+from interceptor import packagefinder, read_config_file
+from interceptor.connector import utils
+from interceptor.connector.decoder import FrameDecoder
+from interceptor.connector.geometry import GEOMETRY_KEYS, GeometryCache
+from interceptor.connector.icerings import IceRingDetector
+from interceptor.connector.spotfinder import DispersionSpotFinder
 """
 from cctbx import sgtbx
 from iotbx import phil as ip
@@ -35,6 +42,9 @@ from interceptor.format import FormatEigerStreamSSRL
 from iota.components.iota_utils import Capturing
 """
 
+# resolution steps (Angstrom) that add to the hit score
+SCORE_RESOLUTION = (4.0, 3.0, 2.5, 2.0)
+
 
 class Processor:
     def __init__(self, params, composite_tag=None, rank=0):
@@ -146,15 +156,130 @@ class FastProcessor(Processor):
         self.test = test
         self.run_mode = run_mode
 
+        # processing config (section named after the run mode, if there is one)
+        if configfile:
+            p_config = read_config_file(configfile)
+        else:
+            p_config = packagefinder('processing.cfg', 'connector', read_config=True)
+        if run_mode in p_config:
+            self.cfg = p_config[run_mode]
+        else:
+            self.cfg = p_config['DEFAULT']
+
+        max_spot_size = self.cfg.getstr('spf_max_spot_size', fallback=None)
+        self.spotfinder = DispersionSpotFinder(
+            kernel_size=self.cfg.getint('spf_kernel_size', fallback=3),
+            gain=self.cfg.getfloat('spf_gain', fallback=1.0),
+            sigma_background=self.cfg.getfloat('spf_sigma_background', fallback=6.0),
+            sigma_strong=self.cfg.getfloat('spf_sigma_strong', fallback=3.0),
+            min_local=self.cfg.getint('spf_min_local', fallback=2),
+            global_threshold=self.cfg.getfloat('spf_global_threshold', fallback=0),
+            min_spot_size=self.cfg.getint('spf_min_spot_size', fallback=2),
+            max_spot_size=int(max_spot_size) if max_spot_size else None,
+        )
+
+        # decoded images go into a pool of reusable buffers
+        self.decoder = FrameDecoder(
+            pool_size=self.cfg.getint('decoder_pool_size', fallback=2))
+
+        # per-pixel geometry (d-spacing, radial bins, resolution mask), made
+        # once per detector setting
+        d_min = self.cfg.getstr('spf_d_min', fallback=None)
+        d_max = self.cfg.getstr('spf_d_max', fallback=None)
+        self.geometry_cache = GeometryCache(
+            n_bins=self.cfg.getint('geometry_radial_bins', fallback=1000),
+            d_min=float(d_min) if d_min else None,
+            d_max=float(d_max) if d_max else None,
+            cache_dir=self.cfg.getstr('geometry_cache_dir', fallback=None),
+        )
+
+        # hit score (see calculate_score)
+        self.calculate_score = self.cfg.getboolean('spf_calculate_score',
+                                                   fallback=True)
+        self.min_spots = self.cfg.getint('min_Bragg_peaks', fallback=10)
 
+        # ice rings (detected on every frame; spots on them are dropped if
+        # spf_ice_filter is set)
+        self.ice_filter = self.cfg.getboolean('spf_ice_filter', fallback=False)
+        self.ice_params = {
+            'width': self.cfg.getfloat('spf_ice_ring_width', fallback=0.002),
+            'sigma': self.cfg.getfloat('spf_ice_ring_sigma', fallback=5.0),
+            'contrast': self.cfg.getfloat('spf_ice_ring_contrast', fallback=0.1),
+        }
+
+        # detector info parsed from the series header (once per series)
+        self.header = None
+        self.detector = None
 
     def generate_params(self):
         return 0 , 0
 
     def print_params(self):
         print("\nParameters for this run: ")
+        for key in self.cfg:
+            if key.startswith('spf_'):
+                print("  {} = {}".format(key, self.cfg.getstr(key)))
         print("\n")
 
+    def read_detector(self, header):
+        """ Detector info from the series header (header2 of the stream) """
+        if header != self.header:
+            hdict = utils.decode_frame(header)
+            cutoff = hdict.get('countrate_correction_count_cutoff')
+            self.detector = {
+                'beam_center': (
+                    hdict.get('beam_center_x'), hdict.get('beam_center_y')),
+                'distance': hdict.get('detector_distance'),
+                'wavelength': hdict.get('wavelength'),
+                'pixel_size': hdict.get('x_pixel_size'),
+                'cutoff': int(cutoff) if cutoff else None,
+                'mask': None,
+                'geometry_params': hdict if all(
+                    hdict.get(k) for k in GEOMETRY_KEYS) else None,
+                'geometry': None,
+                'ice': None,
+            }
+            self.header = header
+        return self.detector
+
+    def decode(self, data):
+        """ Decodes the image payload of a data dictionary (adds an 'image' key)
+        :param data: data dictionary (as made by Reader.make_data_dict)
+        :return: data dictionary
+        """
+        data['image'] = self.decoder.decode(data['streamfile_2'],
+                                            data['streamfile_3'])
+        return data
+
+    def read_image(self, data):
+        """ Image, mask and overloaded pixels from a data dictionary
+        :param data: data dictionary (decoded, or as made by Reader.make_data_dict)
+        :return: image, mask, overloads (2D NumPy arrays)
+        """
+        detector = self.read_detector(data['header2'])
+        image = data.get('image')
+        if image is None:
+            image = self.decode(data)['image']
+
+        # pixels flagged with the maximum value (module gaps, bad pixels) are
+        # the same on every frame, so the mask is made once per series (along
+        # with the geometry, which limits it to the resolution range)
+        mask = detector['mask']
+        if mask is None or mask.shape != image.shape:
+            mask = image != np.iinfo(image.dtype).max
+            if detector['geometry_params']:
+                geometry = self.geometry_cache.get(detector['geometry_params'],
+                                                   image.shape)
+                if geometry.mask is not None:
+                    mask &= geometry.mask
+                detector['geometry'] = geometry
+                detector['ice'] = IceRingDetector(geometry, mask, **self.ice_params)
+            detector['mask'] = mask
+        overloads = None
+        if detector['cutoff']:
+            overloads = image >= detector['cutoff']
+        return image, mask, overloads
+
     def refine_bravais_settings(self, reflections, experiments):
         return 0
 
@@ -165,18 +290,59 @@ class FastProcessor(Processor):
         return 0, 0
 
     def process(self, data, filename, info):
-        return 0
+        image, mask, overloads = self.read_image(data)
+        s_spf = time.time()
+        spots = self.spotfinder.find_spots(image, mask=mask, overloads=overloads)
+        info['spf_time'] = time.time() - s_spf
+        ice = self.detector['ice']
+        if ice is not None:
+            s_ice = time.time()
+            info['n_ice_rings'] = ice.count_rings(image)
+            if self.ice_filter:
+                keep = ~ice.on_ice_ring(spots['x'], spots['y'])
+                spots = {key: values[keep] for key, values in spots.items()}
+            info['ice_time'] = time.time() - s_ice
+        n_spots = len(spots['size'])
+        info['n_spots'] = n_spots
+        info['n_overloads'] = int(spots['overloaded'].sum())
+        if n_spots:
+            info['mean_shape_ratio'] = float(spots['shape_ratio'].mean())
+            geometry = self.detector['geometry']
+            if geometry is not None:
+                d_spacing = geometry.d_at(spots['x'], spots['y'])
+                info['hres'] = float(d_spacing.min())
+        if self.calculate_score:
+            info['score'] = calculate_score(
+                n_spots, info.get('hres'), min_spots=self.min_spots)
+        return info
 
     def run(self, data, filename, info):
-        return self.process(data, filename, info)
+        try:
+            info = self.process(data, filename, info)
+        except Exception as e:
+            info['spf_error'] = 'SPOTFINDING ERROR: {}'.format(e)
+        return info
 
 
 
 
 
 
-def calculate_score(experiments, observed):
-    pass
+def calculate_score(n_spots, hres=None, min_spots=10):
+    """ Composite hit score from spotfinding results: 0 for a blank (fewer than
+    min_spots spots), 1 for a hit, plus one for each resolution step (see
+    SCORE_RESOLUTION) that the strongest spots reach
+    :param n_spots: number of spots found
+    :param hres: resolution of the highest-resolution spot (in Angstrom)
+    :param min_spots: minimum number of spots for a hit
+    :return: score (int)
+    """
+    if n_spots < min_spots:
+        return 0
+    score = 1
+    if hres:
+        score += sum(1 for d in SCORE_RESOLUTION if hres <= d)
+    return score
 
 
 
@@ -0,0 +1,49 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Exponential backoff for Readers waiting on an idle stream
+"""
+
+
+class Reconnector:
+    """ Poll timeouts of a Reader waiting for frames. When no frame comes within
+    the timeout, the Reader asks again (on the same socket), and the timeout
+    grows by a constant factor up to a maximum, so that a Splitter that is idle
+    between series (or down) is asked less and less often; the first frame
+    that arrives resets the timeout """
+
+    def __init__(self, timeout=None, max_timeout=30.0, factor=2.0):
+        """ Constructor
+    :param timeout: initial timeout in seconds (None to wait forever)
+    :param max_timeout: largest timeout in seconds
+    :param factor: growth of the timeout after each attempt
+    """
+        self.timeout = timeout
+        self.max_timeout = max(max_timeout, timeout or 0)
+        self.factor = factor
+        self.current = timeout
+        self.attempts = 0  # since the last frame
+        self.idle_retries = 0  # in total (requests repeated on an idle stream)
+
+    def poll_timeout(self):
+        """ Current timeout in msec (for socket.poll), or None """
+        return None if self.current is None else self.current * 1000
+
+    def failed(self):
+        """ Records an attempt after a timeout, and backs off """
+        self.attempts += 1
+        self.idle_retries += 1
+        if self.current is not None:
+            self.current = min(self.current * self.factor, self.max_timeout)
+
+    def succeeded(self):
+        """ Records a received frame (resets the timeout) """
+        if self.attempts:
+            self.attempts = 0
+            self.current = self.timeout
+
+
+# -- end
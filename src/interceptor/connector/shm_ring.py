@@ -0,0 +1,125 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Shared-memory ring of image slots between the Connector and Readers
+running on the same host
+"""
+
+import struct
+import sys
+
+from collections import deque
+from multiprocessing import shared_memory, resource_tracker
+
+# marks a multipart from the Connector whose image payload is in the ring
+SHM_MARKER = b"BROKER_SHM"
+
+# slot descriptor that replaces the image payload frame (slot, offset, size)
+DESCRIPTOR = struct.Struct("<QQQ")
+
+
+def ring_name(port):
+    return "intxr_ring_{}".format(port)
+
+
+def make_request(request, acks=()):
+    """ Request payload of a Reader attached to the ring: the request (Reader
+    name or greeting) followed by the slots it is done with, e.g. b"Hello|3,4"
+    """
+    return request + b"|" + b",".join(str(slot).encode() for slot in acks)
+
+
+def parse_request(payload):
+    """ Splits a request payload into request, ring flag and acknowledged slots
+    :param payload: request payload from a Reader
+    :return: request, shm (True if the Reader is attached to the ring), slots
+    """
+    request, sep, acks = payload.partition(b"|")
+    slots = [int(slot) for slot in acks.split(b",") if slot]
+    return request, bool(sep), slots
+
+
+class FrameRing:
+    """ Fixed number of fixed-size slots in one shared memory block. The
+    Connector (owner) writes image payloads into free slots and hands out slot
+    descriptors; Readers map the slot directly and acknowledge it once they are
+    done with the image, at which point the Connector can reuse the slot """
+
+    def __init__(self, name, n_slots=None, slot_size=None, create=False):
+        """ Constructor
+    :param name: name of the shared memory block
+    :param n_slots: number of slots (owner only)
+    :param slot_size: size of each slot in bytes (owner only)
+    :param create: if True, create the ring (Connector); otherwise attach to an
+    existing one (Reader)
+    """
+        self.name = name
+        self.owner = create
+        if create:
+            size = n_slots * slot_size
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                      size=size)
+            except FileExistsError:
+                # left over from a Connector that didn't shut down cleanly
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                      size=size)
+            self.n_slots = n_slots
+            self.slot_size = slot_size
+            self.free = deque(range(n_slots))
+            self.in_use = set()
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if sys.version_info < (3, 13):
+                # the resource tracker would unlink the block when this process
+                # exits, even though the Connector still owns it
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            self.n_slots = None
+            self.slot_size = None
+        self.buf = self.shm.buf
+
+    def write(self, payload):
+        """ Copies payload into a free slot
+        :param payload: bytes-like image payload
+        :return: slot descriptor (bytes), or None if no slot is available
+        """
+        size = memoryview(payload).nbytes
+        if not self.free or size > self.slot_size:
+            return None
+        slot = self.free.popleft()
+        offset = slot * self.slot_size
+        self.buf[offset: offset + size] = memoryview(payload).cast("B")
+        self.in_use.add(slot)
+        return DESCRIPTOR.pack(slot, offset, size)
+
+    def release(self, slot):
+        if slot in self.in_use:
+            self.in_use.discard(slot)
+            self.free.append(slot)
+
+    def read(self, descriptor):
+        """ Maps a slot
+        :param descriptor: slot descriptor received from the Connector
+        :return: slot number, memoryview on the image payload in the slot
+        """
+        slot, offset, size = DESCRIPTOR.unpack_from(descriptor)
+        return slot, self.buf[offset: offset + size]
+
+    def close(self):
+        self.buf = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # views on the ring are still alive; the mapping goes away on exit
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+# -- end
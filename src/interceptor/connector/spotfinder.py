@@ -0,0 +1,284 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Vectorized dispersion spotfinder (NumPy)
+"""
+
+import numpy as np
+
+# neighbor offsets (dy, dx) that link strong pixels into spots (8-connectivity;
+# each pair of neighbors only needs to be looked at once)
+NEIGHBORS = [(0, 1), (1, -1), (1, 0), (1, 1)]
+
+# image rows processed at a time (intermediate arrays should fit in cache)
+BLOCK_ROWS = 32
+
+
+class DispersionSpotFinder:
+    """ Finds strong pixels with the dispersion algorithm (as in DIALS) and groups
+    them into spots. Local sums are computed for blocks of rows at a time, and
+    the variance only for pixels that pass the (cheaper) intensity test. A pixel
+    is strong if:
+
+      - it is valid (in the mask) and has at least min_local valid neighbors
+      - the index of dispersion (variance / mean) of its neighborhood is above
+        gain * (1 + sigma_background * sqrt(2 / (n - 1)))
+      - its value is above mean + sigma_strong * sqrt(gain * mean)
+      - its value is above global_threshold
+
+    Overloaded pixels are excluded from the neighborhood statistics, but count
+    as strong pixels (the spots they belong to are overloaded spots) """
+
+    def __init__(
+            self,
+            kernel_size=3,
+            gain=1.0,
+            sigma_background=6.0,
+            sigma_strong=3.0,
+            min_local=2,
+            global_threshold=0,
+            min_spot_size=2,
+            max_spot_size=1000,
+    ):
+        """ Constructor
+    :param kernel_size: half-width of the local window (3 gives a 7x7 window)
+    :param gain: detector gain
+    :param sigma_background: dispersion threshold (in standard deviations)
+    :param sigma_strong: intensity threshold (in standard deviations)
+    :param min_local: minimum number of valid pixels in the local window
+    :param global_threshold: minimum value of a strong pixel
+    :param min_spot_size: minimum number of pixels in a spot
+    :param max_spot_size: maximum number of pixels in a spot (None for no limit)
+    """
+        self.kernel_size = kernel_size
+        self.gain = gain
+        self.sigma_background = sigma_background
+        self.sigma_strong = sigma_strong
+        self.min_local = min_local
+        self.global_threshold = global_threshold
+        self.min_spot_size = min_spot_size
+        self.max_spot_size = max_spot_size
+
+        # valid-pixel counts (and their inverse), reused while the mask stays the
+        # same (i.e. for the whole series)
+        self.count_key = None
+        self.count = None
+        self.count_inv = None
+
+    def pad(self, values, dtype):
+        """ Zero-pads an image by k rows/columns on each side """
+        k = self.kernel_size
+        h, w = values.shape
+        padded = np.zeros((h + 2 * k, w + 2 * k), dtype=dtype)
+        padded[k: k + h, k: k + w] = values
+        return padded
+
+    def window_sums(self, padded, r0, r1):
+        """ Sums of the (2k+1)x(2k+1) neighborhoods of image rows r0..r1-1; box
+        sums are separable, so this is a sliding sum over rows, then over
+        columns (for small kernels, adding shifted slices is faster in NumPy
+        than differences of cumulative sums, and just as exact) """
+        d = 2 * self.kernel_size + 1
+        w = padded.shape[1] - d + 1
+        vertical = padded[r0: r1].copy()
+        for i in range(1, d):
+            vertical += padded[r0 + i: r1 + i]
+        box = vertical[:, :w].copy()
+        for i in range(1, d):
+            box += vertical[:, i: w + i]
+        return box
+
+    def valid_count(self, mask):
+        key = (mask.shape, id(mask))
+        if key != self.count_key:
+            padded = self.pad(mask, np.int32)
+            self.count = self.window_sums(padded, 0, mask.shape[0])
+            self.count_inv = (1 / np.maximum(self.count, 1)).astype(np.float32)
+            self.count_key = key
+        return self.count, self.count_inv
+
+    def find_strong_pixels(self, image, mask, overloads=None):
+        """ Dispersion threshold; the image is processed in blocks of rows, so
+        that intermediate arrays stay in cache
+        :param image: 2D array of pixel values
+        :param mask: 2D boolean array, True for valid pixels
+        :param overloads: (optional) 2D boolean array of overloaded pixels
+        :return: flat indices of strong pixels (sorted)
+        """
+        h, w = image.shape
+        k = self.kernel_size
+        d = 2 * k + 1
+        count, count_inv = self.valid_count(mask)
+        values = np.where(mask, image, 0)
+
+        # overloaded pixels are few, so they are handled as flat indices: they
+        # are taken out of the image and the valid counts around them
+        ovl_pixels = np.zeros(0, dtype=np.int64)
+        if overloads is not None:
+            ovl_pixels = np.flatnonzero(overloads)
+            ovl_pixels = ovl_pixels[mask.ravel()[ovl_pixels]]
+            values.ravel()[ovl_pixels] = 0
+        ovl_rows = ovl_pixels // w
+        padded_ovl = None
+        if len(ovl_pixels):
+            padded_ovl = np.zeros((h + 2 * k, w + 2 * k), dtype=np.int32)
+            padded_ovl[ovl_rows + k, ovl_pixels % w + k] = 1
+
+        # window sums are exact in int32 as long as they can't overflow
+        dtype = np.int32 if int(values.max()) * d * d < 2 ** 31 else np.int64
+        padded = self.pad(values, dtype)
+
+        min_local = max(self.min_local, 2)
+        strong = []
+        for r0 in range(0, h, BLOCK_ROWS):
+            r1 = min(r0 + BLOCK_ROWS, h)
+            n = count[r0:r1]
+            n_inv = count_inv[r0:r1]
+            if padded_ovl is not None and np.searchsorted(
+                    ovl_rows, r0 - k) < np.searchsorted(ovl_rows, r1 + k):
+                n = n - self.window_sums(padded_ovl, r0, r1)
+                n_inv = (1 / np.maximum(n, 1)).astype(np.float32)
+            value = padded[r0 + k: r1 + k, k: k + w]
+            total = self.window_sums(padded, r0, r1)
+
+            # value > mean + sigma_strong * sqrt(gain * mean); only pixels that
+            # pass are candidates, for which the variance is then computed
+            mean = total * n_inv
+            threshold = np.sqrt(mean * self.gain)
+            threshold *= self.sigma_strong
+            threshold += mean
+            idx = np.flatnonzero(value > threshold)
+            idx = idx[n.ravel()[idx] >= min_local]
+            if self.global_threshold:
+                idx = idx[value.ravel()[idx] > self.global_threshold]
+            if len(idx) == 0:
+                continue
+
+            rows, cols = np.divmod(idx, w)
+            n_c = n.ravel()[idx].astype(np.float64)
+            sum_c = total.ravel()[idx].astype(np.float64)
+            sum_sq_c = self.point_sums(padded, rows + r0, cols)
+            variance = (n_c * sum_sq_c - sum_c * sum_c) / (n_c * (n_c - 1))
+            bg_threshold = self.gain * (
+                    1 + self.sigma_background * np.sqrt(2 / (n_c - 1)))
+            is_strong = variance * n_c > bg_threshold * sum_c
+            strong.append(idx[is_strong] + r0 * w)
+
+        strong.append(ovl_pixels)
+        return np.unique(np.concatenate(strong))
+
+    def point_sums(self, padded, rows, cols):
+        """ Sums of squared values in the neighborhoods of a few pixels """
+        d = 2 * self.kernel_size + 1
+        width = padded.shape[1]
+        offsets = (np.arange(d)[:, None] * width + np.arange(d)).ravel()
+        windows = padded.ravel().take((rows * width + cols)[:, None] + offsets)
+        windows = windows.astype(np.float64)
+        return np.einsum('ij,ij->i', windows, windows)
+
+    @staticmethod
+    def label_pixels(pixels, width):
+        """ Connected-component labels of a sparse set of pixels, by propagating
+        the smallest label across neighbor links until nothing changes
+        :param pixels: sorted flat indices of the pixels
+        :param width: image width
+        :return: array of spot indices (0..n_spots-1), one per pixel
+        """
+        n_pix = len(pixels)
+        x = pixels % width
+        links_a = []
+        links_b = []
+        for dy, dx in NEIGHBORS:
+            neighbor = pixels + dy * width + dx
+            pos = np.minimum(np.searchsorted(pixels, neighbor), n_pix - 1)
+            found = (pixels[pos] == neighbor) & (x + dx >= 0) & (x + dx < width)
+            links_a.append(np.flatnonzero(found))
+            links_b.append(pos[found])
+        a = np.concatenate(links_a)
+        b = np.concatenate(links_b)
+
+        labels = np.arange(n_pix)
+        while True:
+            lowest = np.minimum(labels[a], labels[b])
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, a, lowest)
+            np.minimum.at(new_labels, b, lowest)
+            new_labels = new_labels[new_labels]  # pointer jumping
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+        return np.unique(labels, return_inverse=True)[1]
+
+    def find_spots(self, image, mask=None, overloads=None):
+        """ Finds spots on an image
+        :param image: 2D array of pixel values
+        :param mask: (optional) 2D boolean array, True for valid pixels
+        :param overloads: (optional) 2D boolean array of overloaded pixels
+        :return: dictionary of per-spot arrays (size, intensity, x, y,
+        shape_ratio, overloaded)
+        """
+        if mask is None:
+            mask = np.ones(image.shape, dtype=bool)
+        pixels = self.find_strong_pixels(image, mask, overloads=overloads)
+        if len(pixels) == 0:
+            return make_spots()
+
+        width = image.shape[1]
+        spot_idx = self.label_pixels(pixels, width)
+        n_spots = spot_idx.max() + 1
+
+        # spot properties (intensity-weighted centroids and second moments)
+        weight = image.ravel()[pixels].astype(np.float64)
+        y, x = np.divmod(pixels, width)
+        size = np.bincount(spot_idx, minlength=n_spots)
+        intensity = np.bincount(spot_idx, weights=weight, minlength=n_spots)
+        norm = np.where(intensity > 0, intensity, 1)
+        cx = np.bincount(spot_idx, weights=weight * x, minlength=n_spots) / norm
+        cy = np.bincount(spot_idx, weights=weight * y, minlength=n_spots) / norm
+        dx = x - cx[spot_idx]
+        dy = y - cy[spot_idx]
+        sxx = np.bincount(spot_idx, weights=weight * dx * dx, minlength=n_spots)
+        syy = np.bincount(spot_idx, weights=weight * dy * dy, minlength=n_spots)
+        sxy = np.bincount(spot_idx, weights=weight * dx * dy, minlength=n_spots)
+        half_trace = (sxx + syy) / 2
+        root = np.sqrt(((sxx - syy) / 2) ** 2 + sxy ** 2)
+        major = half_trace + root
+        minor = half_trace - root
+        shape_ratio = np.sqrt(
+            np.divide(major, minor, out=np.ones_like(major), where=minor > 0))
+        if overloads is not None:
+            overloaded = np.bincount(
+                spot_idx, weights=overloads.ravel()[pixels], minlength=n_spots) > 0
+        else:
+            overloaded = np.zeros(n_spots, dtype=bool)
+
+        keep = size >= self.min_spot_size
+        if self.max_spot_size:
+            keep &= size <= self.max_spot_size
+        return make_spots(
+            size=size[keep],
+            intensity=intensity[keep],
+            x=cx[keep],
+            y=cy[keep],
+            shape_ratio=shape_ratio[keep],
+            overloaded=overloaded[keep],
+        )
+
+
+def make_spots(**spots):
+    empty = {
+        'size': np.zeros(0, dtype=np.int64),
+        'intensity': np.zeros(0),
+        'x': np.zeros(0),
+        'y': np.zeros(0),
+        'shape_ratio': np.zeros(0),
+        'overloaded': np.zeros(0, dtype=bool),
+    }
+    empty.update(spots)
+    return empty
+
+
+# -- end
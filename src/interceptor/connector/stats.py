@@ -0,0 +1,185 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Latency histograms for the pipeline stages of each frame
+"""
+
+import numpy as np
+
+# pipeline stages timed for each frame; the time of a stage is in the result
+# (info) under <stage>_time. Readers time 'serialize' and 'send' per batch of
+# results, and report them separately (see Reader.report_latency)
+STAGES = [
+    'wait',  # waiting for a frame
+    'receive',  # receiving the multipart
+    'parse',  # header parsing and conversion of the multipart
+    'decode',  # decoding of the image payload
+    'spf',  # spotfinding (within proc)
+    'ice',  # ice-ring detection (within proc)
+    'proc',  # processing
+    'serialize',  # encoding of results (per frame)
+    'send',  # sending of results to the Collector (per frame)
+    'total',  # from the request for the frame to the result
+]
+PERCENTILES = [50, 95, 99]
+
+
+class LatencyHistogram:
+    """ Histogram of latencies with HDR-style (log-linear) buckets: values are
+    counted in microseconds, exactly below 2^sub_bits, and with a relative
+    error of at most 2^-(sub_bits - 1) above that. The buckets are a fixed-size
+    array, so histograms from different Readers can simply be added """
+
+    def __init__(self, sub_bits=7, max_value=100.0):
+        """ Constructor
+    :param sub_bits: log2 of the number of buckets per power of two
+    :param max_value: largest value (in seconds); larger values are clamped
+    """
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half = self.sub_count // 2
+        self.max_us = int(max_value * 1e6)
+        self.counts = np.zeros(self.bucket_index(self.max_us) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def bucket_index(self, value_us):
+        if value_us < self.sub_count:
+            return value_us
+        shift = value_us.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + (
+            (value_us >> shift) - self.half)
+
+    def bucket_range(self, index):
+        """ Lowest value (microseconds) and width of a bucket """
+        if index < self.sub_count:
+            return index, 1
+        shift, offset = divmod(index - self.sub_count, self.half)
+        return (self.half + offset) << (shift + 1), 1 << (shift + 1)
+
+    def record(self, value):
+        """ Adds a latency (in seconds) """
+        value_us = min(max(int(value * 1e6), 0), self.max_us)
+        self.counts[self.bucket_index(value_us)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """ Latency (in seconds) below which the given percentage of values is;
+        the middle of the bucket the percentile falls into """
+        cumulative = np.cumsum(self.counts)
+        if not cumulative[-1]:
+            return 0.0
+        rank = max(int(np.ceil(percent / 100 * cumulative[-1])), 1)
+        index = int(np.searchsorted(cumulative, rank))
+        lower, width = self.bucket_range(index)
+        return min((lower + (width - 1) / 2) / 1e6, self.max)
+
+    def summary(self, percentiles=PERCENTILES):
+        count = self.count
+        summary = {'count': count, 'mean': self.total / count if count else 0.0,
+                   'max': self.max}
+        for p in percentiles:
+            summary['p{}'.format(p)] = self.percentile(p)
+        return summary
+
+    def to_dict(self):
+        """ Sparse representation (for JSON) """
+        indices = np.flatnonzero(self.counts)
+        return {
+            'buckets': indices.tolist(),
+            'counts': self.counts[indices].tolist(),
+            'total': self.total,
+            'max': self.max,
+        }
+
+    def update(self, hdict):
+        """ Merges the sparse representation of a histogram (see to_dict) """
+        self.counts[np.asarray(hdict['buckets'], dtype=np.intp)] += np.asarray(
+            hdict['counts'], dtype=np.int64)
+        self.total += hdict['total']
+        self.max = max(self.max, hdict['max'])
+
+
+class StageHistograms:
+    """ One LatencyHistogram per pipeline stage """
+
+    def __init__(self, stages=STAGES):
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+
+    def add(self, info):
+        """ Adds the stage times of a result """
+        for stage, histogram in self.histograms.items():
+            value = info.get(stage + '_time')
+            if value is not None:
+                histogram.record(value)
+
+    def merge(self, other):
+        for stage, histogram in other.histograms.items():
+            self.histograms[stage].merge(histogram)
+
+    def summary(self):
+        return {stage: histogram.summary()
+                for stage, histogram in self.histograms.items() if histogram.count}
+
+    def to_dict(self):
+        return {stage: histogram.to_dict()
+                for stage, histogram in self.histograms.items() if histogram.count}
+
+    def update(self, hdicts):
+        for stage, hdict in hdicts.items():
+            self.histograms[stage].update(hdict)
+
+
+class SeriesLatency:
+    """ Per-reader stage histograms of the current series (the Collector starts
+    over when results from a new series arrive) """
+
+    def __init__(self):
+        self.series = None
+        self.readers = {}
+
+    def reset(self, series=None):
+        self.series = series
+        self.readers = {}
+
+    def reader(self, name):
+        histograms = self.readers.get(name)
+        if histograms is None:
+            histograms = self.readers[name] = StageHistograms()
+        return histograms
+
+    def add(self, info):
+        self.reader(info['proc_name']).add(info)
+
+    def update(self, name, hdicts):
+        """ Merges stage histograms reported by a Reader (see StageHistograms) """
+        self.reader(name).update(hdicts)
+
+    def summary(self):
+        """ Stage latencies (count, mean, max, percentiles) of the series, over
+        all Readers ('global') and per Reader """
+        readers = sorted(self.readers.items())  # (may be read from another thread)
+        combined = StageHistograms()
+        for _, histograms in readers:
+            combined.merge(histograms)
+        return {
+            'series': self.series,
+            'global': combined.summary(),
+            'readers': {name: histograms.summary() for name, histograms in readers},
+        }
+
+
+# -- end
@@ -0,0 +1,274 @@
+from __future__ import absolute_import, division, print_function
+
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Recording of ZMQ multipart streams into an indexed, append-only
+container file, and rate-controlled replay of recorded streams
+"""
+
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+# container file: MAGIC, then one record per multipart message (MESSAGE header,
+# the length of each frame, the frames); the index (<path>.idx) has one entry per
+# message and is only a shortcut, as it can always be rebuilt from the records
+MAGIC = b"IXRSTRM\x01"
+MESSAGE = struct.Struct("<dI")  # time received, number of frames
+FRAME_LENGTH = struct.Struct("<Q")
+INDEX = np.dtype([
+    ("offset", "<u8"),  # of the message record
+    ("size", "<u8"),  # of the message record
+    ("time", "<f8"),
+    ("n_frames", "<u4"),
+])
+
+RATES = ["original", "max"]
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+class StreamWriter:
+    """ Appends multipart messages to a container file (new or existing), and
+    their entries to its index """
+
+    def __init__(self, path):
+        self.path = path
+        self.fh = open(path, "ab")
+        if self.fh.tell() == 0:
+            self.fh.write(MAGIC)
+        else:
+            # bring the index up to date, and cut off a truncated last record
+            # (e.g. of a recording that was killed) before appending
+            reader = StreamReader(path)
+            end = reader.end
+            reader.close()
+            self.fh.truncate(end)
+        self.index_fh = open(index_path(path), "ab")
+        self.n_messages = 0
+
+    def write(self, frames, received=None):
+        """ Appends a multipart message
+        :param frames: list of bytes-like frames
+        :param received: (optional) time the message was received
+        """
+        received = time.time() if received is None else received
+        frames = [memoryview(f).cast("B") for f in frames]
+        offset = self.fh.tell()
+        self.fh.write(MESSAGE.pack(received, len(frames)))
+        self.fh.write(b"".join(FRAME_LENGTH.pack(f.nbytes) for f in frames))
+        for frame in frames:
+            self.fh.write(frame)
+        entry = np.array(
+            [(offset, self.fh.tell() - offset, received, len(frames))], dtype=INDEX)
+        self.index_fh.write(entry.tobytes())
+        self.n_messages += 1
+
+    def flush(self):
+        # records first, so that the index never points past the end of the file
+        self.fh.flush()
+        self.index_fh.flush()
+
+    def close(self):
+        self.flush()
+        self.fh.close()
+        self.index_fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StreamReader:
+    """ Random access to the messages of a container file, which is memory-mapped
+    (frames are memoryviews on the file). The index is read if it is there; if it
+    is missing or behind the file (e.g. the recorder was killed), the missing
+    entries are rebuilt from the records and the index file is rewritten """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{} is not a stream container".format(path))
+            self.size = os.fstat(fh.fileno()).st_size
+            self.mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.mmap)
+
+        index = np.zeros(0, dtype=INDEX)
+        rewrite = not os.path.exists(index_path(path))
+        if not rewrite:
+            index = np.fromfile(index_path(path), dtype=INDEX)
+            # drop entries that point past the data (index written, data lost)
+            valid = index["offset"] + index["size"] <= self.size
+            rewrite = not valid.all()
+            index = index[valid]
+        scanned = self.scan(self.index_end(index))
+        if len(scanned) or rewrite:
+            index = np.concatenate([index, scanned])
+            try:
+                index.tofile(index_path(path))
+            except OSError as e:
+                print("STREAM INDEX ERROR: {}".format(e))
+        self.index = index
+        # end of the last complete record
+        self.end = self.index_end(index)
+
+    @staticmethod
+    def index_end(index):
+        if not len(index):
+            return len(MAGIC)
+        return int(index["offset"][-1] + index["size"][-1])
+
+    def scan(self, offset):
+        """ Index entries of the records from offset on (a truncated last
+        record is left out) """
+        entries = []
+        while offset + MESSAGE.size <= self.size:
+            received, n_frames = MESSAGE.unpack_from(self.buf, offset)
+            lengths_end = offset + MESSAGE.size + n_frames * FRAME_LENGTH.size
+            if lengths_end > self.size:
+                break
+            lengths = np.frombuffer(self.buf, dtype="<u8", count=n_frames,
+                                    offset=offset + MESSAGE.size)
+            size = lengths_end - offset + int(lengths.sum())
+            if offset + size > self.size:
+                break
+            entries.append((offset, size, received, n_frames))
+            offset += size
+        return np.array(entries, dtype=INDEX)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def times(self):
+        return self.index["time"]
+
+    def read(self, i):
+        """ Frames of message i (memoryviews on the file) """
+        offset, _, _, n_frames = self.index[i]
+        offset = int(offset) + MESSAGE.size
+        lengths = np.frombuffer(self.buf, dtype="<u8", count=int(n_frames),
+                                offset=offset)
+        offset += int(n_frames) * FRAME_LENGTH.size
+        frames = []
+        for length in lengths.tolist():
+            frames.append(self.buf[offset: offset + length])
+            offset += length
+        return frames
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.read(i)
+
+    def close(self):
+        try:
+            self.buf.release()
+            self.mmap.close()
+        except BufferError:
+            # frames are still in use (e.g. by ZMQ); the mapping goes with them
+            pass
+
+
+def record_stream(socket, writer, n_messages=None, timeout=None, request=None):
+    """ Records messages from a socket until n_messages are recorded, or none
+    came within the timeout
+    :param socket: connected PULL (or REQ, if request is given) socket
+    :param writer: StreamWriter
+    :param n_messages: (optional) number of messages to record
+    :param timeout: (optional) seconds to wait for a message
+    :param request: (optional) request sent before each message (REQ socket)
+    :return: number of recorded messages
+    """
+    n_recorded = 0
+    while n_messages is None or n_recorded < n_messages:
+        if request is not None:
+            socket.send(request)
+        if not socket.poll(timeout=None if timeout is None else timeout * 1000):
+            break
+        frames = socket.recv_multipart(copy=False)
+        writer.write([frame.buffer for frame in frames], received=time.time())
+        n_recorded += 1
+    writer.flush()
+    return n_recorded
+
+
+class Replayer:
+    """ Sends the messages of a recorded stream at the original rate (scaled by
+    speed), at a fixed rate, or as fast as possible; either pushes them (to a
+    Connector, or anything else that pulls from a PUSH socket), or hands one
+    message to each request (Readers connected straight to the source) """
+
+    def __init__(self, reader, rate="original", speed=1.0, repeat=1):
+        """ Constructor
+    :param reader: StreamReader
+    :param rate: 'original', 'max', or a fixed rate in Hz
+    :param speed: speed-up of the original rate
+    :param repeat: number of times the stream is replayed
+    """
+        self.reader = reader
+        self.rate = rate
+        self.speed = speed
+        self.repeat = repeat
+        self.send_times = np.zeros(0)
+
+    def offsets(self):
+        """ Send time of each message, relative to the start of the replay """
+        n = len(self.reader)
+        if self.rate == "max":
+            return np.zeros(n * self.repeat)
+        if self.rate == "original":
+            times = self.reader.times - self.reader.times[0]
+            # each repetition starts one mean interval after the previous end
+            period = times[-1] + (times[-1] / (n - 1) if n > 1 else 0)
+            times = np.concatenate([times + r * period for r in range(self.repeat)])
+            return times / self.speed
+        return np.arange(n * self.repeat) / float(self.rate)
+
+    def replay(self, socket, mode="push", timeout=None):
+        """ Replays the stream
+        :param socket: bound (or connected) PUSH or ROUTER socket
+        :param mode: 'push' to send each message, 'router' to send each message
+        in reply to a request
+        :param timeout: (optional) seconds to wait for a request ('router' mode)
+        :return: dictionary with the number of messages sent, elapsed time, rate
+        (the time each message was sent is kept in send_times)
+        """
+        n = len(self.reader)
+        offsets = self.offsets()
+        self.send_times = np.zeros(len(offsets))
+        start = time.time()
+        n_sent = 0
+        for i, offset in enumerate(offsets):
+            delay = start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            frames = self.reader.read(i % n)
+            if mode == "router":
+                if not socket.poll(
+                        timeout=None if timeout is None else timeout * 1000):
+                    break
+                request = socket.recv_multipart()
+                frames = request[:-1] + frames
+            socket.send_multipart(frames, copy=False)
+            self.send_times[n_sent] = time.time()
+            n_sent += 1
+        self.send_times = self.send_times[:n_sent]
+        elapsed = time.time() - start
+        return {
+            "sent": n_sent,
+            "elapsed": elapsed,
+            "rate": n_sent / elapsed if elapsed > 0 else 0,
+        }
+
+
+# -- end
@@ -1,5 +1,7 @@
 import json
 
+import numpy as np
+
 
 def decode_frame(frame, tags=None):
     """ Extract tag values from frame
@@ -9,7 +11,7 @@ def decode_frame(frame, tags=None):
     """
 
     # extract string and convert to JSON dict
-    framebytes = frame if isinstance(frame, bytes) else frame.bytes
+    framebytes = frame if isinstance(frame, bytes) else bytes(frame)
     if framebytes[-1] == 0:
         framestring = framebytes[:-1].decode('utf-8')
     else:
@@ -34,3 +36,26 @@ def decode_header(header):
 def decode_frame_header(frame):
    tags = ['frame', 'series']
    return decode_frame(frame, tags)
+
+
+def frame_buffer(frame, strip_null=False):
+    """ Zero-copy view of a ZMQ frame
+    :param frame: bytes, memoryview or zmq.Frame object
+    :param strip_null: if True, drop the trailing byte of the frame
+    :return: memoryview on the frame data
+    """
+    buffer = memoryview(frame)
+    return buffer[:-1] if strip_null else buffer
+
+
+def frame_to_array(frame, dtype=np.uint8, shape=None):
+    """ Zero-copy NumPy array on the data of a ZMQ frame
+    :param frame: bytes, memoryview or zmq.Frame object
+    :param dtype: NumPy dtype of the array elements
+    :param shape: (optional) array shape
+    :return: read-only NumPy array sharing memory with the frame
+    """
+    array = np.frombuffer(frame_buffer(frame), dtype=dtype)
+    if shape is not None:
+        array = array.reshape(shape)
+    return array
@@ -7,8 +7,11 @@ Last Changed: 05/15/2020
 Description : pytest fixtures for data importing and processing
 """
 
+import json
 import os
 import shutil
+
+import numpy as np
 import pytest
 
 from interceptor import packagefinder
@@ -16,6 +19,10 @@ from interceptor.connector.connector import Reader, Collector
 from interceptor.command_line.connector_run import parse_command_args
 args, _ = parse_command_args().parse_known_args()
 
+# Eiger 4M-sized payload of uint32 pixels
+HEIGHT, WIDTH = 2167, 2070
+PAYLOAD_SIZE = HEIGHT * WIDTH * 4
+
 
 class MinimalReader(Reader):
     def __init__(self, name='test', args=None):
@@ -79,3 +86,137 @@ def process_test_image(imported_data, proc_for_testing):
 def print_info(process_test_image):
     collector = FileCollector()
     return collector.make_result_string(info=process_test_image)
+
+
+# -- factories shared by the unit tests (each fixture returns a function, so that
+# tests can make as many objects as they need, with their own options)
+
+
+def read_test_frames():
+    """ Test image multipart: headers and frame parts from the test images, and
+    an Eiger 4M-sized payload of uint32 pixels (0, 1, 2...) """
+    img_dir = packagefinder('images', 'test', module='interceptor')
+    frames = []
+    for n in [1, 2, 3, 4, None, 6]:
+        if n is None:
+            frames.append(np.arange(PAYLOAD_SIZE // 4, dtype=np.uint32).tobytes())
+            continue
+        filepath = os.path.join(img_dir, 'zmq_000001_{:02d}.zmq'.format(n))
+        with open(filepath, 'rb') as fh:
+            frames.append(fh.read())
+    return frames
+
+
+def make_test_args(argstring='-b test'):
+    test_args, _ = parse_command_args().parse_known_args(argstring.split())
+    return test_args
+
+
+def make_test_info(frame=1):
+    """ Result of a processed frame, as sent by a Reader """
+    return {
+        "state": "process",
+        "proc_name": "ZMQ_002",
+        "proc_url": "tcp://localhost:9999",
+        "series": 1,
+        "frame": frame,
+        "run_mode": None,
+        "mapping": "",
+        "exposure_time": 0.1,
+        "filename": "hdf5_test_0361-000_master.h5",
+        "beamXY": [0, 0],
+        "dist": 0,
+        "n_spots": 641,
+        "n_overloads": 0,
+        "hres": 1.64,
+        "score": 10,
+        "n_ice_rings": 8,
+        "mean_shape_ratio": 1.41,
+        "n_indexed": 0,
+        "sg": "NA",
+        "uc": "NA",
+        "comment": "",
+        "t0": 0,
+        "phil": "",
+        "receive_time": 0.0012,
+        "wait_time": 0.25,
+        "proc_time": 0.041,
+        "total_time": 0.29,
+    }
+
+
+def make_test_image(shape=(HEIGHT, WIDTH), n_spots=300, background=2.0, seed=0):
+    """ Poisson background with Gaussian spots at random (integer) positions
+    :return: image, spot rows, spot columns
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.poisson(background, size=shape).astype(np.uint32)
+    yy, xx = np.mgrid[-3:4, -3:4]
+    blob = (200 * np.exp(-(xx ** 2 + yy ** 2) / 2.0)).astype(np.uint32)
+    grid_y = np.arange(5, shape[0] - 5, 15)
+    grid_x = np.arange(5, shape[1] - 5, 15)
+    cells = rng.choice(len(grid_y) * len(grid_x), n_spots, replace=False)
+    ys = grid_y[cells // len(grid_x)]
+    xs = grid_x[cells % len(grid_x)]
+    for y, x in zip(ys, xs):
+        image[y - 3: y + 4, x - 3: x + 4] += blob
+    return image, ys, xs
+
+
+def make_test_data(image, encoding='<'):
+    """ Data dictionary (as made by Reader.make_data_dict) of an image, with the
+    headers of the test images """
+    frames = read_test_frames()
+    dimensions = {
+        "htype": "dimage_d-1.0",
+        "shape": [image.shape[1], image.shape[0]],
+        "type": "uint32",
+        "encoding": encoding,
+    }
+    return {
+        "header1": frames[0][:-1],
+        "header2": frames[1][:-1],
+        "streamfile_1": frames[2][:-1],
+        "streamfile_2": json.dumps(dimensions).encode(),
+        "streamfile_3": image.tobytes(),
+    }
+
+
+@pytest.fixture
+def make_frames():
+    return read_test_frames
+
+
+@pytest.fixture
+def make_args():
+    return make_test_args
+
+
+@pytest.fixture
+def make_reader():
+    def make(argstring='-b test'):
+        return Reader(name='test', args=make_test_args(argstring))
+    return make
+
+
+@pytest.fixture
+def make_collector():
+    def make(argstring='-b test', collector_class=Collector):
+        return collector_class(
+            name='test', args=make_test_args(argstring), localhost='localhost')
+    return make
+
+
+@pytest.fixture
+def make_info():
+    return make_test_info
+
+
+@pytest.fixture
+def make_image():
+    return make_test_image
+
+
+@pytest.fixture
+def make_data():
+    return make_test_data
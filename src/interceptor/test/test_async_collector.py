@@ -0,0 +1,94 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the asyncio-based Collector
+"""
+
+import asyncio
+import json
+import time
+from threading import Thread
+
+import zmq
+
+from interceptor.connector import codec
+from interceptor.connector.connector import AsyncCollector
+
+
+def bind_to_random_ports(collector):
+    """ Has the Collector bind its sockets to random ports, in place of the ports
+    derived from its base port; the ports are returned by socket identity once
+    the sockets are made """
+    ports = {}
+    make_socket = collector.make_socket
+
+    def make_random_socket(socket_type, wid, bind=False, **kwargs):
+        if not bind:
+            return make_socket(socket_type, wid, **kwargs)
+        socket = collector.registry.socket(socket_type, wid)
+        ports[wid] = socket.bind_to_random_port('tcp://127.0.0.1')
+        return socket
+
+    collector.make_socket = make_random_socket
+    return ports
+
+
+def test_async_collector(make_info, make_collector):
+    collector = make_collector(collector_class=AsyncCollector)
+    ports = bind_to_random_ports(collector)
+
+    context = zmq.Context()
+    ui = context.socket(zmq.PULL)
+    collector.cfg['uihost'] = '127.0.0.1'
+    collector.cfg['uiport'] = str(ui.bind_to_random_port('tcp://127.0.0.1'))
+    results = context.socket(zmq.PUSH)
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(collector.main())
+    thread = Thread(target=loop.run_until_complete, args=(task,))
+    thread.start()
+    try:
+        deadline = time.time() + 5
+        while collector.name not in ports and time.time() < deadline:
+            time.sleep(0.01)
+        results.connect('tcp://127.0.0.1:{}'.format(ports[collector.name]))
+        results.send_json({
+            "proc_name": "ZMQ_002",
+            "proc_url": "tcp://localhost:9999",
+            "state": "connected",
+            "encoding": "binary",
+        })
+        results.send(codec.encode_results([make_info(n) for n in range(1, 6)]))
+        results.send(json.dumps(make_info(6)).encode())
+
+        ui_msgs = []
+        while len(ui_msgs) < 6 and ui.poll(timeout=5000):
+            ui_msgs.append(ui.recv_string())
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(timeout=5)
+        results.close(linger=0)
+        ui.close(linger=0)
+        context.term()
+
+    assert not thread.is_alive()
+    assert len(ui_msgs) == 6
+    assert collector.counter == 6
+    assert 'ZMQ_002' in collector.readers
+    assert collector.reporter.n_frames == 0  # frames only aggregated in verbose
+
+
+def test_send_to_ui_errors(make_collector):
+    collector = make_collector(collector_class=AsyncCollector)
+
+    class BrokenSocket:
+        def send_string(self, msg, flags=0):
+            raise ValueError('cannot send')
+
+    # neither a missing message nor a failing send stops the Collector
+    collector.ui_socket = BrokenSocket()
+    collector.send_to_ui(None)
+    assert collector.ui_failures == 0
+    collector.send_to_ui('result')
+    assert collector.ui_failures == 1
@@ -0,0 +1,35 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the Connector backlog and its drop policies
+"""
+
+import pytest
+
+from interceptor.connector.connector import Connector
+
+
+@pytest.mark.parametrize('policy, nth, size, kept, n_queued', [
+    ('oldest', 10, 3, [4, 5, 6], 6),
+    ('newest', 10, 3, [1, 2, 3], 3),
+    ('nth', 2, 3, [2, 3, 5], 4),
+    ('nth', 10, 3, [1, 2, 3], 3),
+    ('oldest', 10, 0, [], 0),
+    ('nth', 1, 0, [], 0),
+])
+def test_drop_policy(make_args, policy, nth, size, kept, n_queued):
+    connector = Connector(name='test', args=make_args('-b test --broker'))
+    connector.backlog_size = size
+    connector.drop_policy = policy
+    connector.drop_nth = nth
+    try:
+        for frame in range(1, 7):
+            connector.enqueue_frames([b'header', str(frame).encode()], frame)
+            assert len(connector.backlog) <= size
+        assert [received for _, received in connector.backlog] == kept
+        assert [int(frames[1]) for frames, _ in connector.backlog] == kept
+        assert connector.counters['queued'] == n_queued
+        assert connector.counters['dropped'] == 6 - size
+    finally:
+        connector.close_sockets()
@@ -0,0 +1,85 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for batched Reader results
+"""
+
+import time
+
+import pytest
+import zmq
+
+from interceptor.connector import codec
+from interceptor.connector.reconnect import Reconnector
+
+
+@pytest.fixture
+def batch_reader(make_reader):
+    """ Reader whose results go to a PULL socket (reader.sink) in place of the
+    Collector """
+    reader = make_reader('-b test')
+    reader.encoding = 'binary'
+    reader.sink = zmq.Context.instance().socket(zmq.PULL)
+    reader.sink.bind('inproc://batch_test')
+    reader.r_socket = reader.make_socket(
+        socket_type='push', wid='ZMQ_001_2C', url='inproc://batch_test')
+    yield reader
+    reader.sink.close(linger=0)
+    reader.close_sockets()
+
+
+def receive_batches(reader, timeout=0):
+    batches = []
+    while reader.sink.poll(timeout=timeout):
+        batches.append(codec.decode_results(reader.sink.recv()))
+    return batches
+
+
+def test_flush_on_size(batch_reader, make_info):
+    reader = batch_reader
+    reader.batch_size = 3
+    reader.batch_timeout = 60
+    for frame in range(1, 5):
+        reader.send_result(make_info(frame))
+    batches = receive_batches(reader, timeout=100)
+    assert [[r['frame'] for r in batch] for batch in batches] == [[1, 2, 3]]
+    assert len(reader.result_batch) == 1
+
+    # anything but a processing result goes out right away, with the batch
+    reader.send_result(dict(make_info(5), state='stats'))
+    batches = receive_batches(reader, timeout=100)
+    assert [[r['frame'] for r in batch] for batch in batches] == [[4, 5]]
+    assert not reader.result_batch
+
+
+def test_flush_on_poll_timeout(batch_reader, make_info):
+    reader = batch_reader
+    reader.batch_size = 64
+    reader.batch_timeout = 0.05
+    reader.send_result(make_info(1))
+    assert not receive_batches(reader)
+
+    # waiting for the next frame, the poll is cut short by the batch deadline
+    assert reader.batch_poll_timeout(None) <= 50
+    assert reader.batch_poll_timeout(10) == 10
+
+    # no frame comes in: the batch is sent when the poll times out, and the
+    # Reader only then goes on to reconnect
+    reader.d_socket = zmq.Context.instance().socket(zmq.PULL)
+    reader.d_socket.bind('inproc://batch_frames')
+    reader.reconnector = Reconnector(timeout=0.5)
+    reader.request_frames = lambda **kwargs: None
+    sent = []
+
+    def reconnect():
+        sent.extend(receive_batches(reader))
+        raise SystemExit(0)
+
+    reader.reconnect = reconnect
+    start = time.time()
+    with pytest.raises(SystemExit):
+        reader.read_frames('test.stream')
+    assert [[r['frame'] for r in batch] for batch in sent] == [[1]]
+    assert time.time() - start >= 0.5
+    reader.d_socket.close(linger=0)
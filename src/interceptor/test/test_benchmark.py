@@ -0,0 +1,66 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the pipeline benchmark harness
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from interceptor import packagefinder
+from interceptor.command_line import benchmark_run
+from interceptor.connector.output import ResultFormatter
+
+
+def test_synthetic_stream(make_reader):
+    image = benchmark_run.make_image(shape=(64, 80), n_spots=5)
+    stream = benchmark_run.SyntheticStream(3, series=2, image=image)
+    assert len(stream) == 3
+    assert np.allclose(np.diff(stream.times), stream.frame_time)
+
+    # the Reader takes each message for an image of the series
+    reader = make_reader('-b test')
+    for i in range(len(stream)):
+        data, info = reader.make_data_dict(stream.read(i))
+        assert info['state'] == 'process'
+        assert (info['series'], info['frame']) == (2, i + 1)
+        assert info['filename'] == 'benchmark_002_master.h5'
+
+    assert np.array_equal(reader.processor.decode(data)['image'], image)
+
+
+def test_frame_pattern():
+    cfg = packagefinder('startup.cfg', 'connector', read_config=True)['test']
+    info = {
+        'series': 2, 'frame': 17, 'n_spots': 10, 'n_overloads': 0, 'score': 1,
+        'hres': 2.5, 'n_ice_rings': 0, 'mean_shape_ratio': 1.0, 'sg': 'NA',
+        'uc': 'NA', 'mapping': '', 'filename': 'benchmark_002_master.h5',
+    }
+    match = benchmark_run.FRAME_PATTERN.search(ResultFormatter(cfg).render(info))
+    assert match.groups() == ('2', '17')
+
+
+def test_summarize_latency():
+    assert benchmark_run.summarize_latency([]) == {}
+    summary = benchmark_run.summarize_latency(np.arange(1, 101) / 1000.0)
+    assert summary['max'] == pytest.approx(0.1)
+    assert summary['mean'] == pytest.approx(0.0505)
+    assert summary['p50'] == pytest.approx(0.0505)
+    assert summary['p99'] == pytest.approx(0.09901)
+
+
+def test_process_cpu_time():
+    if not os.path.exists('/proc/self/stat'):
+        pytest.skip('no /proc')
+    assert benchmark_run.process_cpu_time(os.getpid()) > 0
+    assert benchmark_run.process_cpu_time(-1) is None
+
+
+def test_formatting_cost():
+    cfg = packagefinder('startup.cfg', 'connector', read_config=True)['test']
+    cost = benchmark_run.formatting_cost(cfg, number=10)
+    assert set(cost) == {'legacy', 'precompiled'}
+    assert all(value > 0 for value in cost.values())
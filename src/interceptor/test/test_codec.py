@@ -0,0 +1,38 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for binary encoding of Reader results
+"""
+
+import json
+
+from interceptor.connector import codec
+
+
+def test_binary_round_trip(make_info):
+    infos = [make_info(frame=n) for n in range(1, 65)]
+    message = codec.encode_results(infos)
+    assert message.startswith(codec.MAGIC)
+    assert codec.decode_results(message) == infos
+
+
+def test_type_preserved(make_info):
+    # values that don't match the declared field type must survive unchanged
+    info = make_info()
+    info.update({"hres": 99, "score": 0.5, "n_spots": True, "frame": "NA"})
+    decoded = codec.decode_results(codec.encode_results([info]))[0]
+    assert decoded == info
+    assert isinstance(decoded["hres"], int)
+    assert decoded["n_spots"] is True
+
+
+def test_json_fallback(make_info):
+    info = make_info()
+    assert codec.decode_results(json.dumps(info).encode()) == [info]
+    assert codec.decode_results(json.dumps([info, info]).encode()) == [info, info]
+
+
+def test_binary_smaller_than_json(make_info):
+    infos = [make_info(frame=n) for n in range(64)]
+    assert len(codec.encode_results(infos)) < len(json.dumps(infos).encode())
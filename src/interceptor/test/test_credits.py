@@ -0,0 +1,108 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for credit-based (DEALER) frame fetching
+"""
+
+import pytest
+import zmq
+
+from interceptor.connector import overload
+
+
+def test_credit_flow(make_reader):
+    context = zmq.Context()  # not the Reader's, which it terminates on close
+    splitter = context.socket(zmq.ROUTER)
+    port = splitter.bind_to_random_port('tcp://127.0.0.1')
+
+    reader = make_reader('-b test --credits 3')
+    reader.name = 'ZMQ_001'
+    reader.cfg['host'] = '127.0.0.1'
+    reader.cfg['port'] = str(port)
+    reader.collector_address = lambda: ('127.0.0.1', 7999)  # no results sent
+    reader.registry.linger = 0
+    try:
+        reader.initialize_zmq_sockets()
+        assert reader.d_socket.type == zmq.DEALER
+
+        # all credits are outstanding at once, each in a REQ-style envelope
+        reader.request_frames(n_requests=reader.credits, greeting=b'Hello')
+        requests = []
+        while len(requests) < 3 and splitter.poll(timeout=5000):
+            requests.append(splitter.recv_multipart())
+        assert [r[1:] for r in requests] == [
+            [b'', b'Hello'], [b'', b'ZMQ_001'], [b'', b'ZMQ_001']]
+        assert all(r[0] == b'ZMQ_001' for r in requests)
+
+        # each request is answered with a frame; the envelope is stripped
+        for i, request in enumerate(requests):
+            splitter.send_multipart(request[:-1] + [b'frame', str(i).encode()])
+        for i in range(3):
+            assert reader.d_socket.poll(timeout=5000)
+            assert reader.receive_frames() == [b'frame', str(i).encode()]
+        assert reader.outstanding == 0
+
+        # a credit is replenished for every frame received
+        reader.request_frames()
+        assert splitter.poll(timeout=5000)
+        assert splitter.recv_multipart()[1:] == [b'', b'ZMQ_001']
+        assert not splitter.poll(timeout=100)
+        assert reader.outstanding == 1
+    finally:
+        reader.close_sockets()
+        splitter.close(linger=0)
+        context.term()
+
+
+def receive_requests(peer, timeout=200):
+    requests = []
+    while peer.poll(timeout=timeout):
+        requests.append(peer.recv_multipart())
+    return requests
+
+
+@pytest.mark.parametrize('argstring, resent', [
+    # the Splitter keeps the credits still outstanding: only lost ones are sent
+    ('-b test --credits 3', [0, 1]),
+    # the Connector voids them all on the greeting: the window is sent again
+    ('-b test --credits 3 --broker', [3, 3]),
+])
+def test_reconnect_credits(make_reader, argstring, resent):
+    context = zmq.Context()  # not the Reader's, which it terminates on close
+    peer = context.socket(zmq.ROUTER)
+    port = peer.bind_to_random_port('tcp://127.0.0.1')
+
+    reader = make_reader(argstring)
+    reader.name = 'ZMQ_001'
+    reader.data_address = lambda: ('127.0.0.1', port)
+    reader.collector_address = lambda: ('127.0.0.1', 7999)  # no results sent
+    reader.registry.linger = 0
+    try:
+        reader.initialize_zmq_sockets()
+        reader.request_frames(n_requests=reader.credits)
+        requests = receive_requests(peer)
+        assert len(requests) == 3
+
+        # no frame within the timeout
+        reader.reconnect()
+        assert len(receive_requests(peer)) == resent[0]
+        assert reader.outstanding == 3
+
+        # a frame comes in, and its credit is lost (not replenished)
+        reply = [b'frame']
+        if reader.args.broker:
+            reply = [b'BROKER', overload.make_stamp(0, 0, 0)] + reply
+        peer.send_multipart(requests[0][:-1] + reply)
+        assert reader.d_socket.poll(timeout=5000)
+        reader.receive_frames()
+        assert reader.outstanding == 2
+        reader.reconnect()
+        requests = receive_requests(peer)
+        assert len(requests) == resent[1]
+        assert requests[0][-1] == b'Hello'
+        assert reader.outstanding == 3
+    finally:
+        reader.close_sockets()
+        peer.close(linger=0)
+        context.term()
@@ -0,0 +1,151 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test and benchmark for decoding of Eiger image payloads
+"""
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from interceptor.connector import decoder
+from interceptor.connector.processor import FastProcessor
+
+# 13 x 37 uint32 image (see make_test_image), compressed with the bitshuffle
+# HDF5 filter (LZ4, default block size); no full block, and one element that is
+# stored uncompressed
+REFERENCE_BSLZ4 = bytes.fromhex(
+    "0000000000000784000020000000016e5fcd6426b399050000149d14004f3399cd6c0500"
+    "04af5bd29296b4a42d6d694b0a000c10da280035256d790a00f708694ba1ff0268bf04d2"
+    "6f01f45f00ff9740fb2d90fe0ba0140020fd171400107e140063e8bf04da6f911400f32a"
+    "25907e0b67ce71e68c63ce1ce7cc38ce8e71cc98e38c19c798318e19779c31e31833c731"
+    "738e33671c73e63867c671668c63c61c77cc38c68c2800f24db5945a4b29b594564a69ad"
+    "94d65a692db5d6526a2da5d4525e29a5b5525a6aa5a5d45a4aa9a5b4524a6ba5b4d64a6b"
+    "a9b596526b29a596d24a29ad9539e79c73ce39e798738e31e71a638e31c618638c31c618"
+    "639c31c639639c73c62000b2c79c738c39c718738c31d62000afe38c31ce19c1071f7cf0"
+    "050000dee4c1073e7ce083073ef8e0830f0500a3030f3ef0e1ab52b52a55050015b70a00"
+    "011400a7952a55a95295aa55a95a050016ba0f0036540100010016020b002700040c0017"
+    "080c0017100c000f3c00ffffffffff51500000000000e3000000"
+)
+
+
+def make_test_image(shape=(13, 37), dtype=np.uint32):
+    n = int(np.prod(shape))
+    image = (np.arange(n) * 7919 % 251).astype(dtype).reshape(shape)
+    image.flat[::97] = np.iinfo(dtype).max
+    return image
+
+
+def make_dimensions(image, encoding):
+    return json.dumps({
+        "htype": "dimage_d-1.0",
+        "shape": [image.shape[1], image.shape[0]],
+        "type": image.dtype.name,
+        "encoding": encoding,
+    }).encode()
+
+
+def reference_bitshuffle(block, elem_size):
+    """ Bitshuffle of a single block, one bit at a time """
+    n = len(block) // elem_size
+    elems = block.reshape(n, elem_size)
+    bits = np.unpackbits(elems, axis=1, bitorder='little')  # (n, 8 * elem_size)
+    return np.packbits(bits.T, axis=1, bitorder='little').ravel()
+
+
+@pytest.mark.parametrize("elem_size, block_elems", [(4, 2048), (2, 64), (1, 8)])
+def test_shuffle_blocks(elem_size, block_elems):
+    rng = np.random.default_rng(0)
+    n_blocks = 3
+    block_bytes = block_elems * elem_size
+    plain = rng.integers(0, 256, n_blocks * block_bytes, dtype=np.uint8)
+    shuffled = np.empty_like(plain)
+    pool = decoder.BufferPool(size=1)
+    decoder.shuffle_blocks(plain, shuffled, block_elems, elem_size, pool,
+                           unshuffle=False)
+    for b in range(n_blocks):
+        block = slice(b * block_bytes, (b + 1) * block_bytes)
+        assert np.array_equal(
+            shuffled[block], reference_bitshuffle(plain[block], elem_size))
+
+    unshuffled = np.empty_like(plain)
+    decoder.shuffle_blocks(shuffled, unshuffled, block_elems, elem_size, pool)
+    assert np.array_equal(unshuffled, plain)
+
+
+def test_buffer_pool():
+    pool = decoder.BufferPool(size=2, max_kinds=2)
+    a = pool.get((4, 4), np.uint32)
+    b = pool.get((4, 4), np.uint32)
+    assert a is not b
+    assert pool.get((4, 4), np.uint32) is a
+    assert pool.get((4, 4), np.uint16) is not a
+    pool.get((8, 8), np.uint16)
+    assert len(pool.buffers) == 2
+    assert pool.get((4, 4), np.uint32) is not a
+
+
+def test_raw_and_unsupported():
+    image = make_test_image()
+    frame_decoder = decoder.FrameDecoder()
+    decoded = frame_decoder.decode(make_dimensions(image, '<'), image.tobytes())
+    assert np.array_equal(decoded, image)
+    with pytest.raises(ValueError):
+        frame_decoder.decode(make_dimensions(image, 'bslz4-zstd<'), b'')
+
+
+def test_reference_payload():
+    pytest.importorskip("lz4")
+    image = make_test_image()
+    frame_decoder = decoder.FrameDecoder()
+    decoded = frame_decoder.decode(make_dimensions(image, 'bs32-lz4<'),
+                                   REFERENCE_BSLZ4)
+    assert np.array_equal(decoded, image)
+
+
+@pytest.mark.parametrize("encoding, dtype, block_size", [
+    ('lz4<', np.uint32, 8192),
+    ('bs32-lz4<', np.uint32, 8192),
+    ('bs32-lz4<', np.uint32, 1024),
+    ('bs16-lz4<', np.uint16, 8192),
+])
+def test_round_trip(encoding, dtype, block_size):
+    pytest.importorskip("lz4")
+    image = make_test_image(shape=(61, 87), dtype=dtype)
+    dimensions = make_dimensions(image, encoding)
+    payload = decoder.encode_image(image, encoding[:-1], block_size=block_size)
+    frame_decoder = decoder.FrameDecoder(pool_size=2)
+    decoded = [frame_decoder.decode(dimensions, payload) for _ in range(3)]
+    assert all(np.array_equal(d, image) for d in decoded)
+    assert decoded[2] is decoded[0]  # buffers are reused
+
+
+def test_processor(make_image, make_data):
+    pytest.importorskip("lz4")
+    image, ys, _ = make_image()
+    data = make_data(image, encoding='bs32-lz4<')
+    data['streamfile_3'] = decoder.encode_image(image)
+    processor = FastProcessor()
+    processor.ice_filter = False  # spots are at random positions
+    info = processor.run(processor.decode(data), 'test', info={})
+    assert 'spf_error' not in info
+    assert info['n_spots'] == len(ys)
+
+
+def test_decoding_time(make_image):
+    pytest.importorskip("lz4")
+    image, _, _ = make_image()
+    payload = decoder.encode_image(image)
+    dimensions = make_dimensions(image, 'bs32-lz4<')
+    frame_decoder = decoder.FrameDecoder()
+    frame_decoder.decode(dimensions, payload)
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        frame_decoder.decode(dimensions, payload)
+        times.append(time.perf_counter() - start)
+    print('\nDecoding a bs32-lz4 4M frame: {:.1f} ms'.format(min(times) * 1000))
+    assert min(times) < 1.0
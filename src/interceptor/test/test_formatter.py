@@ -0,0 +1,38 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the precompiled result formatter
+"""
+
+from interceptor import packagefinder
+from interceptor.command_line.benchmark_run import legacy_make_result_string
+from interceptor.connector.output import ResultFormatter
+
+
+def get_config(beamline='DEFAULT', **options):
+    config = packagefinder('startup.cfg', 'connector', read_config=True)
+    for key, value in options.items():
+        config.set(beamline, key, value)
+    return config[beamline]
+
+
+def check_output(cfg, make_info):
+    formatter = ResultFormatter(cfg)
+    for info in [make_info(), dict(make_info(), reporting='REPORT:', prc_error='x')]:
+        assert formatter.render(info) == legacy_make_result_string(cfg, info)
+
+
+def test_default_format(make_info):
+    check_output(get_config(), make_info)
+    assert ResultFormatter(get_config()).render(make_info()) == (
+        "RESULTS: series 1 frame 1 result {641 0 10 1.64 8 1.41 NA NA {}} "
+        "mapping {} filename hdf5_test_0361-000_master.h5"
+    )
+
+
+def test_custom_format(make_info):
+    check_output(get_config(
+        output_delimiter=';',
+        output_format='series, frame (), [proc_name], result {}, filename []',
+    ), make_info)
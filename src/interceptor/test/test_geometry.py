@@ -0,0 +1,109 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the per-series detector geometry cache
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from interceptor.connector import utils
+from interceptor.connector.geometry import (
+    GEOMETRIES, DetectorGeometry, GeometryCache
+)
+from interceptor.connector.processor import FastProcessor
+
+SHAPE = (400, 300)
+
+
+@pytest.fixture
+def header(make_frames):
+    """ Series header (header2) of the test images """
+    return utils.decode_frame(make_frames()[1][:-1])
+
+
+def bragg_d(header, row, col):
+    """ d-spacing of a pixel center from Bragg's law """
+    x = (col + 0.5 - header['beam_center_x']) * header['x_pixel_size']
+    y = (row + 0.5 - header['beam_center_y']) * header['y_pixel_size']
+    two_theta = np.arctan(np.hypot(x, y) / header['detector_distance'])
+    return header['wavelength'] / (2 * np.sin(two_theta / 2))
+
+
+def test_d_spacing(header):
+    header.update(beam_center_x=150.0, beam_center_y=200.0)
+    geometry = DetectorGeometry.compute(header, SHAPE, n_bins=100)
+    for row, col in [(0, 0), (10, 250), (399, 0), (201, 151)]:
+        assert geometry.d_spacing[row, col] == pytest.approx(
+            bragg_d(header, row, col), rel=1e-5)
+
+    # pixels are in the radial bin of their d-spacing
+    inv_d2 = 1 / geometry.d_spacing.astype(np.float64) ** 2
+    edges = geometry.bin_edges
+    lower = edges[geometry.radial_bin]
+    upper = edges[geometry.radial_bin + 1]
+    assert np.all((inv_d2 >= lower * (1 - 1e-5)) & (inv_d2 <= upper * (1 + 1e-5)))
+    assert geometry.radial_bin.max() == 99
+    assert len(geometry.bin_d) == 100
+
+    # arrays are shared, so they can't be written to
+    with pytest.raises(ValueError):
+        geometry.d_spacing[0, 0] = 0
+    assert geometry.mask is None
+
+
+def test_resolution_mask(header):
+    header.update(beam_center_x=150.0, beam_center_y=200.0)
+    geometry = DetectorGeometry.compute(header, SHAPE, d_min=3.0, d_max=10.0)
+    d_spacing = geometry.d_spacing
+    assert np.array_equal(geometry.mask, (d_spacing >= 3) & (d_spacing <= 10))
+    assert 0 < geometry.mask.sum() < geometry.mask.size
+
+
+def test_cache(tmp_path, header):
+    GEOMETRIES.clear()
+    cache = GeometryCache(n_bins=50, cache_dir=str(tmp_path), max_entries=1)
+    geometry = cache.get(header, SHAPE)
+    assert cache.get(header, SHAPE) is geometry
+    assert len(os.listdir(str(tmp_path))) == 1
+
+    # a new setting replaces the old one in memory
+    moved = dict(header, detector_distance=0.3)
+    assert cache.get(moved, SHAPE) is not geometry
+    assert len(cache.geometries) == 1
+
+    # geometries in memory are shared by every cache in the process
+    assert GeometryCache(n_bins=50).get(moved, SHAPE) is cache.get(moved, SHAPE)
+
+    # a new cache (e.g. in another Reader) starts warm, from memory-mapped files
+    warm = GeometryCache(n_bins=50, cache_dir=str(tmp_path)).get(header, SHAPE)
+    assert isinstance(warm.d_spacing, np.memmap)
+    assert np.array_equal(warm.d_spacing, geometry.d_spacing)
+    assert np.array_equal(warm.radial_bin, geometry.radial_bin)
+    assert warm.mask is None
+
+
+def test_processor_hres(make_image, make_data):
+    image, _, _ = make_image()
+    processor = FastProcessor()
+    info = processor.run(make_data(image), 'test', info={})
+    geometry = processor.detector['geometry']
+    assert geometry.d_spacing.shape == image.shape
+    assert info['n_spots'] > 0
+    assert info['hres'] == pytest.approx(float(geometry.d_spacing.min()), rel=0.02)
+
+
+def test_processor_geometry(make_image, make_data):
+    # a processor remade for a new run mode (or one per processing thread)
+    # reuses the geometry of the series
+    image, _, _ = make_image()
+    geometries = []
+    for run_mode in ('DEFAULT', 'other'):
+        processor = FastProcessor(run_mode=run_mode)
+        processor.run(make_data(image), 'test', info={})
+        geometries.append(processor.detector['geometry'])
+    assert geometries[0] is not None
+    assert geometries[1] is geometries[0]
@@ -0,0 +1,167 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for Reader heartbeats and liveness tracking
+"""
+
+import json
+import queue
+import time
+from collections import deque
+
+from interceptor.connector import shm_ring
+from interceptor.connector.connector import Connector
+
+
+def test_make_heartbeat(make_reader):
+    reader = make_reader('-b test')
+    heartbeat = reader.make_heartbeat()
+    assert heartbeat['state'] == 'heartbeat'
+    assert heartbeat['last_frame'] == 0
+    assert heartbeat['queues']['batch'][0] == 0
+
+
+def test_liveness(make_reader, make_collector):
+    collector = make_collector()
+    events = []
+    collector.publish = lambda topic, message: events.append((topic, message))
+    for name in ('ZMQ_001', 'ZMQ_002'):
+        collector.understand_info({
+            "proc_name": name,
+            "proc_url": "tcp://localhost:9999",
+            "state": "connected",
+        })
+    heartbeat = make_reader('-b test').make_heartbeat()
+    heartbeat['proc_name'] = 'ZMQ_001'
+    assert collector.understand_info(heartbeat)
+    assert collector.readers['ZMQ_001']['heartbeat'] == heartbeat
+
+    # readers without heartbeats are never reported down
+    for reader in collector.readers.values():
+        reader['last_reported'] -= 2 * collector.heartbeat_timeout
+    collector.check_liveness()
+    assert events[0][0] == b"reader-down"
+    assert events[0][1]['reader'] == 'ZMQ_001'
+    assert len(events) == 1
+    assert collector.readers['ZMQ_001']['status'] == 'DOWN'
+    collector.check_liveness()
+    assert len(events) == 1
+
+    collector.understand_info(heartbeat)
+    collector.check_liveness()
+    assert events[1][0] == b"reader-up"
+    assert collector.readers['ZMQ_001']['status'] == 'IDLE'
+
+
+def test_hung_reader(make_reader, make_collector):
+    collector = make_collector()
+    events = []
+    collector.publish = lambda topic, message: events.append((topic, message))
+    collector.understand_info({
+        "proc_name": "ZMQ_001",
+        "proc_url": "tcp://localhost:9999",
+        "state": "connected",
+    })
+
+    # the reader keeps heartbeating, but has been stuck on a frame
+    reader = make_reader('-b test')
+    reader.name = 'ZMQ_001'
+    reader.last_frame = time.time() - 2 * collector.heartbeat_timeout
+    collector.understand_info(reader.make_heartbeat())
+    collector.check_liveness()
+    assert not events  # idle, waiting for frames
+
+    reader.busy = True
+    collector.understand_info(reader.make_heartbeat())
+    collector.check_liveness()
+    assert events[0][0] == b"reader-down"
+    assert events[0][1]['hung']
+    assert collector.readers['ZMQ_001']['status'] == 'DOWN'
+
+    # done with the frame: back in business
+    reader.busy = False
+    collector.understand_info(reader.make_heartbeat())
+    collector.check_liveness()
+    assert events[1][0] == b"reader-up"
+
+    # in staged mode, frames waiting in the queue are work held
+    reader.frame_queue = queue.Queue()
+    reader.result_queue = queue.Queue()
+    reader.frame_queue.put(None)
+    collector.understand_info(reader.make_heartbeat())
+    collector.check_liveness()
+    assert events[2][0] == b"reader-down"
+
+
+def test_drop_reader(make_args):
+    connector = Connector(name='test', args=make_args('-b test --broker'))
+    connector.ring = shm_ring.FrameRing(
+        name='intxr_test_heartbeat', n_slots=4, slot_size=64, create=True)
+    try:
+        frames = [b'header', b'frame', b'dimensions', b'times', bytes(64)]
+        for identity in (b'ZMQ_001', b'ZMQ_002'):
+            connector.shm_readers.add(identity)
+            connector.dispatch([identity, b''], frames, time.time())
+        connector.readers = deque([[b'ZMQ_001', b''], [b'ZMQ_002', b'']] * 2)
+        assert len(connector.ring.free) == 2
+
+        connector.drop_reader(
+            [b"reader-down", json.dumps({"reader": "ZMQ_001"}).encode()])
+        assert list(connector.readers) == [[b'ZMQ_002', b'']] * 2
+        assert len(connector.ring.free) == 3
+        assert b'ZMQ_001' not in connector.shm_slots
+    finally:
+        connector.ring.close()
+        connector.close_sockets()
+
+
+def test_late_ack(make_args):
+    connector = Connector(name='test', args=make_args('-b test --broker'))
+    connector.ring = shm_ring.FrameRing(
+        name='intxr_test_late_ack', n_slots=2, slot_size=64, create=True)
+    try:
+        frames = [b'header', b'frame', b'dimensions', b'times', bytes(64)]
+        for identity in (b'ZMQ_001', b'ZMQ_002'):
+            connector.shm_readers.add(identity)
+            connector.dispatch([identity, b''], frames, time.time())
+        connector.drop_reader(
+            [b"reader-down", json.dumps({"reader": "ZMQ_001"}).encode()])
+
+        # the slot ZMQ_001 held goes to ZMQ_002, before ZMQ_001's ack arrives
+        connector.dispatch([b'ZMQ_002', b''], frames, time.time())
+        assert connector.shm_slots[b'ZMQ_002'] == {0, 1}
+        connector.handle_request(
+            [b'ZMQ_001', b'', shm_ring.make_request(b'ZMQ_001', acks=[0])])
+        assert connector.ring.in_use == {0, 1}
+
+        # ZMQ_002's own ack does free the slot
+        connector.handle_request(
+            [b'ZMQ_002', b'', shm_ring.make_request(b'ZMQ_002', acks=[0])])
+        assert connector.ring.in_use == {1}
+        assert connector.shm_slots[b'ZMQ_002'] == {1}
+    finally:
+        connector.ring.close()
+        connector.close_sockets()
+
+
+def test_reconnect_frees_slots(make_args):
+    connector = Connector(name='test', args=make_args('-b test --broker'))
+    connector.ring = shm_ring.FrameRing(
+        name='intxr_test_hello', n_slots=2, slot_size=64, create=True)
+    try:
+        frames = [b'header', b'frame', b'dimensions', b'times', bytes(64)]
+        connector.shm_readers.add(b'ZMQ_001')
+        connector.dispatch([b'ZMQ_001', b''], frames, time.time())
+        connector.dispatch([b'ZMQ_001', b''], frames, time.time())
+        assert not connector.ring.free
+
+        # the reply with slot 1 was lost; the reader reconnects and acks slot 0
+        connector.handle_request(
+            [b'ZMQ_001', b'', shm_ring.make_request(b'Hello', acks=[0])])
+        assert not connector.ring.in_use
+        assert b'ZMQ_001' not in connector.shm_slots
+        assert list(connector.readers) == [[b'ZMQ_001', b'']]
+    finally:
+        connector.ring.close()
+        connector.close_sockets()
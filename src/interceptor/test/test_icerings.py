@@ -0,0 +1,91 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test and benchmark for ice-ring detection
+"""
+
+import json
+import time
+
+import numpy as np
+import pytest
+
+from interceptor.connector import utils
+from interceptor.connector.geometry import DetectorGeometry
+from interceptor.connector.icerings import IceRingDetector
+from interceptor.connector.processor import FastProcessor
+
+# Eiger 4M
+HEIGHT, WIDTH = 2167, 2070
+BEAM_CENTER = (1035.0, 1083.0)
+
+
+@pytest.fixture
+def geometry(make_frames):
+    header = utils.decode_frame(make_frames()[1][:-1])
+    header.update(beam_center_x=BEAM_CENTER[0], beam_center_y=BEAM_CENTER[1])
+    return DetectorGeometry.compute(header, (HEIGHT, WIDTH))
+
+
+def add_rings(image, geometry, d_spacings, intensity=3):
+    inv_d2 = 1 / geometry.d_spacing.astype(np.float64) ** 2
+    for d in d_spacings:
+        image[np.abs(inv_d2 - 1 / d ** 2) < 0.0007] += intensity
+
+
+def test_count_rings(geometry, make_image):
+    image, _, _ = make_image()
+    detector = IceRingDetector(geometry)
+    assert detector.count_rings(image) == 0
+
+    add_rings(image, geometry, [3.897, 2.249])
+    assert detector.count_rings(image) == 2
+
+    # masked pixels don't count
+    mask = geometry.d_spacing > 3.0
+    assert IceRingDetector(geometry, mask).count_rings(image) == 1
+
+
+def test_on_ice_ring(geometry):
+    detector = IceRingDetector(geometry)
+    d_spacing = geometry.d_spacing
+    y, x = np.unravel_index(np.argmin(np.abs(d_spacing - 3.669)), d_spacing.shape)
+    assert detector.on_ice_ring([x + 0.5, 0.0], [y + 0.5, 0.0]).tolist() == [
+        True, False]
+
+
+def test_processor_ice_filter(geometry, make_image, make_data):
+    image, ys, _ = make_image()
+    data = make_data(image)
+    header = utils.decode_frame(data['header2'])
+    header.update(beam_center_x=BEAM_CENTER[0], beam_center_y=BEAM_CENTER[1])
+    data['header2'] = json.dumps(header).encode()
+    add_rings(image, geometry, [3.441])
+    data['streamfile_3'] = image.tobytes()
+
+    processor = FastProcessor()
+    processor.ice_filter = True
+    info = processor.run(data, 'test', info={})
+    assert info['n_ice_rings'] == 1
+
+    # the filter drops the spots with centroids on the ring
+    spots = processor.spotfinder.find_spots(*processor.read_image(data))
+    assert len(spots['size']) == len(ys)
+    on_ring = processor.detector['ice'].on_ice_ring(spots['x'], spots['y'])
+    assert on_ring.any()
+    assert info['n_spots'] == len(ys) - on_ring.sum()
+
+
+def test_ice_ring_time(geometry, make_image):
+    image, _, _ = make_image()
+    detector = IceRingDetector(geometry)
+    detector.count_rings(image)
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        detector.count_rings(image)
+        times.append(time.perf_counter() - start)
+    print('\nIce-ring detection on a 4M frame: {:.1f} ms ({:.0%} of the pixels)'
+          .format(min(times) * 1000, len(detector.pixels) / image.size))
+    assert min(times) < 1.0
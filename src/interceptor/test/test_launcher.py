@@ -0,0 +1,56 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the multiprocessing launcher
+"""
+
+import pytest
+
+from interceptor.command_line.connector_run_mp import Launcher
+
+
+class FakeProcess:
+    def __init__(self, name, events, stubborn=False):
+        self.name = name
+        self.events = events
+        self.stubborn = stubborn  # ignores SIGTERM
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.events.append(('terminate', self.name))
+        self.alive = self.stubborn
+
+    def kill(self):
+        self.events.append(('kill', self.name))
+        self.alive = False
+
+    def join(self, timeout=None):
+        self.events.append(('join', self.name))
+
+
+@pytest.mark.parametrize('argstring, names', [
+    ('-b test -n 4', ['collector', 'reader_1', 'reader_2', 'reader_3']),
+    ('-b test -n 4 --broker', ['collector', 'connector', 'reader_2', 'reader_3']),
+])
+def test_shutdown_order(make_args, tmp_path, monkeypatch, argstring, names):
+    monkeypatch.chdir(tmp_path)
+    events = []
+    launcher = Launcher(make_args(argstring))
+    launcher.processes = [
+        FakeProcess(name, events, stubborn=(name == 'reader_3')) for name in names]
+    launcher.shutdown(timeout=0)
+
+    # every Reader is gone (killed, if it has to be) before the Connector or the
+    # Collector is terminated
+    readers = [name for name in names if name.startswith('reader')]
+    last_reader = max(i for i, (_, name) in enumerate(events) if name in readers)
+    first_server = min(i for i, (_, name) in enumerate(events)
+                       if name not in readers)
+    assert last_reader < first_server
+    assert ('kill', 'reader_3') in events
+    assert events[-2:] == [('terminate', 'collector'), ('join', 'collector')]
+    assert not any(process.alive for process in launcher.processes)
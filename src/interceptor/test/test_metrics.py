@@ -0,0 +1,97 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the Collector metrics endpoint
+"""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from interceptor.connector import codec
+from interceptor.connector.metrics import MetricsServer, format_metrics
+
+
+def test_format_metrics():
+    text = format_metrics([
+        ('frames_total', 'counter', 'Frames', [('', None, 5)]),
+        ('latency_seconds', 'summary', 'Latency', [
+            ('', {'stage': 'proc', 'quantile': 0.5}, 0.25),
+            ('_count', {'stage': 'proc'}, 2),
+        ]),
+    ])
+    assert text.splitlines() == [
+        '# HELP frames_total Frames',
+        '# TYPE frames_total counter',
+        'frames_total 5.0',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds summary',
+        'latency_seconds{stage="proc",quantile="0.5"} 0.25',
+        'latency_seconds_count{stage="proc"} 2.0',
+    ]
+
+
+def test_metrics_server():
+    server = MetricsServer(
+        lambda: [('frames_total', 'counter', 'Frames', [('', None, 5)])],
+        port=0)
+    server.start()
+    try:
+        url = 'http://localhost:{}/metrics'.format(server.port)
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert b'frames_total 5.0' in response.read()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + '/other', timeout=5)
+    finally:
+        server.close()
+
+
+def test_collector_metrics(make_info, make_collector):
+    collector = make_collector()
+    collector.send_to_ui = lambda ui_msg: None
+    collector.handle_results(json.dumps({
+        "proc_name": "ZMQ_002",
+        "proc_url": "tcp://localhost:9999",
+        "state": "connected",
+    }).encode())
+    collector.make_metrics()
+
+    infos = [make_info(n) for n in range(1, 4)]
+    for info in infos:
+        info.update(broker_backlog=2, broker_dropped=5)
+    collector.handle_results(codec.encode_results(infos))
+    text = format_metrics(collector.make_metrics())
+    assert 'interceptor_frames_total 3.0' in text
+    assert 'interceptor_reader_frames_total{reader="ZMQ_002"} 3.0' in text
+    assert 'interceptor_broker_dropped_frames_total 5.0' in text
+    assert 'interceptor_stage_latency_seconds_count{stage="total"} 3.0' in text
+    assert 'interceptor_frame_rate 0.0' not in text
+
+
+def test_metrics_snapshot(make_info, make_collector):
+    collector = make_collector()
+    collector.send_to_ui = lambda ui_msg: None
+    collector.handle_results(json.dumps({
+        "proc_name": "ZMQ_002",
+        "proc_url": "tcp://localhost:9999",
+        "state": "connected",
+    }).encode())
+    collector.publish_metrics()
+    snapshot = collector.metrics_snapshot
+
+    # the snapshot served doesn't change while the Collector goes on
+    collector.handle_results(codec.encode_results([make_info(1)]))
+    collector.understand_info(dict(make_info(2), proc_name='ZMQ_003',
+                                   state='connected'))
+    assert collector.metrics_snapshot is snapshot
+    assert 'interceptor_frames_total 0.0' in format_metrics(snapshot)
+    assert 'ZMQ_003' not in format_metrics(snapshot)
+
+    collector.publish_metrics()
+    text = format_metrics(collector.metrics_snapshot)
+    assert 'interceptor_frames_total 1.0' in text
+    assert 'interceptor_reader_up{reader="ZMQ_003"} 1.0' in text
@@ -0,0 +1,117 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the Collector output handlers
+"""
+
+import os
+import time
+
+from interceptor.connector.output import ConsoleReporter, RecordWriter
+
+
+def read_lines(path):
+    with open(path) as rf:
+        return rf.read().splitlines()
+
+
+def test_record_writer_close(tmp_path):
+    path = str(tmp_path / 'records.txt')
+    writer = RecordWriter(path, buffer_size=1048576, fsync_interval=0)
+    writer.start()
+    for i in range(1000):
+        writer.write(["line {}\n".format(i)], series=1)
+
+    # everything queued is written out and flushed on close
+    writer.close()
+    assert not writer.is_alive()
+    assert read_lines(path) == ["line {}".format(i) for i in range(1000)]
+
+    # closing again does nothing, and later records are ignored
+    writer.close()
+    writer.write(["late\n"])
+    assert len(read_lines(path)) == 1000
+
+
+def test_record_writer_rotate(tmp_path):
+    path = str(tmp_path / 'records.txt')
+    writer = RecordWriter(path, rotate_by_series=True, max_size=20)
+    writer.start()
+    writer.write(["series 1\n"], series=1)
+    writer.write(["series 2\n"], series=2)
+    writer.write(["series 2, again\n"], series=2)  # reaches max_size
+    writer.write(["series 2, last\n"], series=2)
+    writer.close()
+    assert read_lines(path + '.1') == ["series 1"]
+    assert read_lines(path + '.2') == ["series 2", "series 2, again"]
+    assert read_lines(path) == ["series 2, last"]
+    assert not os.path.exists(path + '.3')
+
+
+def test_collector_close(tmp_path, make_collector):
+    path = str(tmp_path / 'records.txt')
+    collector = make_collector('-b test --record {}'.format(path))
+    collector.write_to_file(["frame 1\n"], series=1)
+    collector.close()
+    assert read_lines(path) == ["frame 1"]
+    assert collector.record_writer.closed
+
+
+def test_console_reporter(make_info, capsys):
+    reporter = ConsoleReporter(interval=5, sample_every=2, hit_threshold=10,
+                               queue_size=1)
+    infos = [
+        dict(make_info(1), proc_name='ZMQ_001', n_spots=20, total_time=0.2),
+        dict(make_info(2), proc_name='ZMQ_001', n_spots=5, total_time=0.4),
+        dict(make_info(3), n_spots=30),
+        dict(make_info(4), n_spots=50, sampled=0),  # skipped in overload mode
+    ]
+    for counter, info in enumerate(infos, start=1):
+        info['full_path'] = info['filename']
+        reporter.aggregate(counter, info, 'result {}'.format(counter))
+    assert (reporter.n_frames, reporter.n_sampled, reporter.n_hits) == (4, 3, 2)
+    assert reporter.reader_stats['ZMQ_001']['frames'] == 2
+
+    # every 2nd frame is printed in full
+    printed = capsys.readouterr().out
+    assert 'FRAME 2 ' in printed and 'FRAME 4 ' in printed
+    assert 'FRAME 1 ' not in printed and 'FRAME 3 ' not in printed
+
+    # frames that don't fit in the queue are counted, and not reported
+    reporter.add(5, make_info(5), None)
+    reporter.add(6, make_info(6), None)
+    assert reporter.skipped == 1
+
+    reporter.report()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].endswith('hit rate 66.7% (2 hits), sampled 75.0%')
+    assert lines[0].split(': ', 1)[1].startswith('4 frames in ')
+    assert lines[1] == ('  ZMQ_001: 2 frames, avg latency = 0.3000 sec, '
+                        'avg proc = 0.0410 sec')
+    assert lines[2].startswith('  ZMQ_002: 2 frames')
+    assert lines[3] == '  (1 frames not reported)'
+
+    # the window starts over after each report
+    assert reporter.n_frames == 0 and reporter.skipped == 0
+    reporter.report()
+    assert capsys.readouterr().out == ''
+
+
+def test_console_reporter_errors(make_info, capsys):
+    reporter = ConsoleReporter(interval=60, sample_every=1)
+    reporter.start()
+    reporter.add(1, make_info(1), 'result')  # no full_path: can't be printed
+    good = dict(make_info(2), full_path='test_master.h5')
+    reporter.add(2, good, 'result')
+    printed = ''
+    deadline = time.time() + 5
+    while 'FRAME 2 ' not in printed and time.time() < deadline:
+        time.sleep(0.01)
+        printed += capsys.readouterr().out
+
+    # the reporter thread carries on after the bad record
+    assert 'FRAME 2 ' in printed
+    assert reporter.is_alive()
+    assert reporter.n_frames == 2
+    assert reporter.errors == 1
@@ -0,0 +1,76 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for adaptive frame sampling (overload mode)
+"""
+
+import json
+
+from interceptor.connector import codec, overload
+
+
+def test_stamp():
+    stamp = overload.make_stamp(1234.5, 7, 3)
+    assert overload.read_stamp(stamp) == (1234.5, 7, 3)
+    assert overload.read_stamp(b"") is None
+
+
+def test_controller():
+    controller = overload.OverloadController(
+        max_latency=1.0, max_backlog=10, max_stride=4, window=4)
+
+    # keeping up: every frame is processed
+    assert all(controller.admit(latency=0.1) for _ in range(8))
+    assert controller.stride == 1
+
+    # falling behind: stride doubles every window, up to max_stride
+    admitted = [controller.admit(latency=3.0) for _ in range(12)]
+    assert controller.stride == 4
+    assert not all(admitted)
+    assert sum(controller.admit(backlog=20) for _ in range(4)) == 1
+    assert controller.stride == 4
+
+    # somewhat late frames keep the stride, and timely frames halve it
+    for _ in range(4):
+        controller.admit(latency=0.8)
+    assert controller.stride == 4
+    for _ in range(8):
+        controller.admit(latency=0.1)
+    assert controller.stride == 1
+
+
+def test_sampling_stats():
+    stats = overload.SamplingStats()
+    for n in range(10):
+        stats.add(n % 4 == 0)
+    report = stats.report()
+    assert report['frames'] == 10
+    assert report['sampled'] == 3
+    assert report['sampling_ratio'] == 0.3
+    stats.add(1)
+    report = stats.report()
+    assert report['sampling_ratio'] == 1.0
+    assert report['total_frames'] == 11
+    assert report['total_sampled'] == 4
+
+
+def test_collector_sampling(make_info, make_collector):
+    collector = make_collector()
+    sent = []
+    collector.send_to_ui = sent.append
+    collector.handle_results(json.dumps({
+        "proc_name": "ZMQ_002",
+        "proc_url": "tcp://localhost:9999",
+        "state": "connected",
+    }).encode())
+
+    infos = []
+    for n in range(1, 5):
+        info = make_info(n)
+        info['sampled'] = int(n % 2 == 0)
+        infos.append(info)
+    collector.handle_results(codec.encode_results(infos))
+    assert collector.counter == 4
+    assert len(sent) == 2
+    assert collector.make_status()['sampling_ratio'] == 0.5
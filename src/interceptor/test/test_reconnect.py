@@ -0,0 +1,99 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for Reader reconnection with backoff
+"""
+
+import zmq
+
+from interceptor.connector.reconnect import Reconnector
+
+
+def test_backoff():
+    reconnector = Reconnector(timeout=1.0, max_timeout=5.0, factor=2.0)
+    assert reconnector.poll_timeout() == 1000
+    timeouts = []
+    for _ in range(4):
+        reconnector.failed()
+        timeouts.append(reconnector.current)
+    assert timeouts == [2.0, 4.0, 5.0, 5.0]
+    assert reconnector.attempts == reconnector.idle_retries == 4
+
+    reconnector.succeeded()
+    assert reconnector.poll_timeout() == 1000
+    assert reconnector.attempts == 0
+    assert reconnector.idle_retries == 4
+
+    # no timeout: wait forever
+    assert Reconnector().poll_timeout() is None
+
+
+def make_peer(make_reader, argstring):
+    """ Reader connected to a ROUTER socket on a random port, which stands in
+    for the Connector or the Splitter """
+    context = zmq.Context()  # not the Reader's, which it terminates on close
+    peer = context.socket(zmq.ROUTER)
+    port = peer.bind_to_random_port('tcp://127.0.0.1')
+
+    reader = make_reader(argstring)
+    reader.name = 'ZMQ_001'
+    reader.data_address = lambda: ('127.0.0.1', port)
+    reader.collector_address = lambda: ('127.0.0.1', 7999)  # nothing listens
+    reader.registry.linger = 0
+    reader.initialize_zmq_sockets()
+    return reader, context, peer
+
+
+def close_peer(reader, context, peer):
+    reader.close_sockets()
+    peer.close(linger=0)
+    context.term()
+
+
+def test_socket_reuse(make_reader):
+    reader, context, connector = make_peer(make_reader, '-b test --broker')
+    try:
+        d_socket = reader.d_socket
+        reader.request_frames()
+        assert connector.poll(timeout=5000)
+        connector.recv_multipart()
+
+        # no reply: the REQ socket asks again, without being replaced
+        reader.reconnect()
+        assert reader.d_socket is d_socket
+        assert connector.poll(timeout=5000)
+        request = connector.recv_multipart()
+        assert request[0] == b'ZMQ_001'
+        assert request[-1] == b'Hello'
+        assert reader.reconnector.idle_retries == 1
+
+        # the reply to the latest request gets through
+        connector.send_multipart(request[:-1] + [b'frame'])
+        assert d_socket.poll(timeout=5000)
+        assert d_socket.recv_multipart() == [b'frame']
+    finally:
+        close_peer(reader, context, connector)
+
+
+def test_direct_retry(make_reader):
+    reader, context, splitter = make_peer(make_reader, '-b test')
+    try:
+        d_socket = reader.d_socket
+        assert zmq.REQ_RELAXED not in reader.data_socket_options()
+        reader.request_frames()
+        assert splitter.poll(timeout=5000)
+        request = splitter.recv_multipart()
+
+        # no reply: the Splitter still holds the request, so nothing is resent
+        reader.reconnect()
+        assert reader.d_socket is d_socket
+        assert not splitter.poll(timeout=200)
+        assert reader.reconnector.idle_retries == 1
+
+        # and its reply, when it comes, is not discarded
+        splitter.send_multipart(request[:-1] + [b'frame'])
+        assert d_socket.poll(timeout=5000)
+        assert d_socket.recv_multipart() == [b'frame']
+    finally:
+        close_peer(reader, context, splitter)
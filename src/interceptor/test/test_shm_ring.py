@@ -0,0 +1,58 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the shared-memory frame ring
+"""
+
+import os
+
+import numpy as np
+
+from interceptor.connector import shm_ring, utils
+
+
+def make_rings(n_slots=2, slot_size=4096):
+    name = shm_ring.ring_name('test_{}'.format(os.getpid()))
+    owner = shm_ring.FrameRing(name, n_slots=n_slots, slot_size=slot_size,
+                               create=True)
+    return owner, shm_ring.FrameRing(name)
+
+
+def test_ring_round_trip():
+    owner, reader = make_rings()
+    try:
+        payload = np.arange(1000, dtype=np.uint32).tobytes()
+        descriptor = owner.write(payload)
+        slot, view = reader.read(descriptor)
+        assert bytes(view) == payload
+        assert utils.frame_to_array(view, dtype=np.uint32)[-1] == 999
+
+        # slots are only reused once released
+        assert owner.write(payload) is not None
+        assert owner.write(payload) is None
+        owner.release(slot)
+        owner.release(slot)
+        assert len(owner.free) == 1
+        del view
+    finally:
+        reader.close()
+        owner.close()
+
+
+def test_payload_too_large():
+    owner, reader = make_rings(slot_size=16)
+    try:
+        assert owner.write(b'x' * 17) is None
+        assert len(owner.free) == 2
+    finally:
+        reader.close()
+        owner.close()
+
+
+def test_request_acks():
+    assert shm_ring.parse_request(b'ZMQ_002') == (b'ZMQ_002', False, [])
+    request = shm_ring.make_request(b'Hello', acks=[3, 4])
+    assert shm_ring.parse_request(request) == (b'Hello', True, [3, 4])
+    request = shm_ring.make_request(b'ZMQ_002')
+    assert shm_ring.parse_request(request) == (b'ZMQ_002', True, [])
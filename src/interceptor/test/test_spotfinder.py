@@ -0,0 +1,135 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test and benchmark for the dispersion spotfinder
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from interceptor.connector.processor import FastProcessor, calculate_score
+from interceptor.connector.spotfinder import DispersionSpotFinder
+
+
+def reference_strong_pixels(image, mask, overloads, finder):
+    """ Dispersion threshold, one pixel at a time """
+    k = finder.kernel_size
+    valid = mask & ~overloads
+    strong = overloads & mask
+    for i in range(image.shape[0]):
+        for j in range(image.shape[1]):
+            if not valid[i, j]:
+                continue
+            rows = slice(max(0, i - k), i + k + 1)
+            cols = slice(max(0, j - k), j + k + 1)
+            window = image[rows, cols][valid[rows, cols]].astype(np.float64)
+            n = len(window)
+            if n < max(finder.min_local, 2):
+                continue
+            mean = window.mean()
+            dispersion = window.var(ddof=1) / mean if mean > 0 else 0
+            strong[i, j] = (
+                dispersion > finder.gain * (
+                    1 + finder.sigma_background * np.sqrt(2 / (n - 1)))
+                and image[i, j] > mean + finder.sigma_strong * np.sqrt(
+                    finder.gain * mean)
+            )
+    return strong
+
+
+def test_threshold_matches_reference(make_image):
+    image, _, _ = make_image(shape=(70, 90), n_spots=12)
+    mask = np.ones(image.shape, dtype=bool)
+    mask[:, 40:43] = False
+    overloads = np.zeros(image.shape, dtype=bool)
+    overloads[20, 20] = overloads[50, 60] = True
+    image[overloads] = 100000
+
+    finder = DispersionSpotFinder()
+    strong = np.zeros(image.shape, dtype=bool)
+    strong.ravel()[finder.find_strong_pixels(image, mask, overloads)] = True
+    reference = reference_strong_pixels(image, mask, overloads, finder)
+    assert reference.sum() > 12
+    assert np.array_equal(strong, reference)
+
+
+def test_label_pixels():
+    width = 10
+    pixels = np.array([
+        0, 11, 22,  # diagonal: one spot
+        39, 40,  # end of one row and start of the next: not neighbors
+        55, 56, 65, 66,  # square
+    ])
+    labels = DispersionSpotFinder.label_pixels(np.sort(pixels), width)
+    spots = {}
+    for pixel, label in zip(np.sort(pixels), labels):
+        spots.setdefault(label, []).append(pixel)
+    assert sorted(spots.values()) == [[0, 11, 22], [39], [40], [55, 56, 65, 66]]
+
+
+def test_find_spots(make_image):
+    image, ys, xs = make_image()
+    finder = DispersionSpotFinder()
+    spots = finder.find_spots(image)
+    assert len(spots['size']) == len(ys)
+    found = set(zip(np.round(spots['y']).astype(int), np.round(spots['x']).astype(int)))
+    assert found == set(zip(ys, xs))
+    assert np.allclose(spots['shape_ratio'], 1, atol=0.1)
+    assert not spots['overloaded'].any()
+
+
+def test_processor(make_image, make_data):
+    image, ys, _ = make_image()
+    image[:, 1030:1040] = 0xFFFFFFFF  # module gap
+    image[ys[0] - 1: ys[0] + 2, 1000:1003] = 5000000  # overloaded spot
+
+    processor = FastProcessor()
+    processor.ice_filter = False  # spots are at random positions
+    info = processor.run(make_data(image), 'test', info={})
+    assert 'spf_error' not in info
+    assert processor.detector['cutoff'] == 4001400
+    assert processor.detector['beam_center'] == (2075.5, 2186.0)
+    assert info['n_spots'] == len(ys) + 1
+    assert info['n_overloads'] == 1
+    assert isinstance(info['n_spots'], int)
+    assert isinstance(info['mean_shape_ratio'], float)
+    assert info['score'] == calculate_score(info['n_spots'], info.get('hres'))
+    assert info['score'] >= 1
+
+    # a blank frame scores 0
+    info = processor.run(make_data(np.zeros_like(image)), 'test', info={})
+    assert info['n_spots'] == 0
+    assert info['score'] == 0
+
+    # errors are reported in the info dictionary
+    info = processor.run(make_data(image, encoding='unknown<'), 'test', info={})
+    assert info['spf_error'].startswith('SPOTFINDING ERROR')
+
+
+@pytest.mark.parametrize('n_spots, hres, score', [
+    (0, None, 0),
+    (9, 1.5, 0),  # too few spots for a hit
+    (10, None, 1),
+    (10, 5.0, 1),
+    (300, 3.5, 2),
+    (300, 2.0, 5),
+])
+def test_calculate_score(n_spots, hres, score):
+    assert calculate_score(n_spots, hres, min_spots=10) == score
+
+
+def test_spotfinding_time(make_image):
+    image, _, _ = make_image()
+    mask = np.ones(image.shape, dtype=bool)
+    finder = DispersionSpotFinder()
+    finder.find_spots(image, mask)
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        finder.find_spots(image, mask)
+        times.append(time.perf_counter() - start)
+    print('\nSpotfinding on a 4M frame: {:.1f} ms'.format(min(times) * 1000))
+    assert min(times) < 1.0
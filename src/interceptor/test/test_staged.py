@@ -0,0 +1,173 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for the staged (multi-threaded) Reader
+"""
+
+import json
+import time
+from threading import Thread
+
+import pytest
+import zmq
+
+from interceptor.connector import codec
+
+
+def connect(collector, name='ZMQ_002'):
+    collector.handle_results(json.dumps({
+        "proc_name": name,
+        "proc_url": "tcp://localhost:9999",
+        "state": "connected",
+    }).encode())
+
+
+@pytest.fixture
+def staged_reader(make_reader):
+    """ Reader with two processing threads, whose results go to a PULL socket
+    (reader.sink) in place of the Collector """
+    reader = make_reader('-b test')
+    reader.name = 'ZMQ_002'
+    reader.n_proc_threads = 2
+    reader.occupancy_interval = 0
+    reader.sink = zmq.Context.instance().socket(zmq.PULL)
+    reader.sink.bind('inproc://staged_test')
+    reader.r_socket = reader.make_socket(
+        socket_type='push', wid='ZMQ_002_2C', url='inproc://staged_test')
+    yield reader
+    reader.sink.close(linger=0)
+    reader.close_sockets()
+
+
+def queue_frames(reader, infos):
+    for info in infos:
+        time_info = {"receive_time": 0, "wait_time": 0, "parse_time": 0,
+                     "decode_time": 0, "total_time": 0}
+        reader.frame_queue.put(({}, info, time_info, time.time(), None))
+
+
+def receive_results(reader, n_results, timeout=5):
+    results = []
+    while len(results) < n_results and reader.sink.poll(timeout=timeout * 1000):
+        results.extend(codec.decode_results(reader.sink.recv()))
+    return results
+
+
+def test_stages(staged_reader, make_info):
+    reader = staged_reader
+
+    def process(info, frame, filename, processor=None, time_info=None):
+        info.update(n_spots=info['frame'], proc_time=0.001)
+        return info
+
+    reader.process = process
+    reader.start_stages(filename='test.stream')
+    queue_frames(reader, [make_info(n) for n in range(1, 6)])
+
+    # results are flushed on the batch deadline
+    results = receive_results(reader, 5)
+    assert sorted(r['frame'] for r in results) == [1, 2, 3, 4, 5]
+    assert all(r['n_spots'] == r['frame'] for r in results)
+    assert all(r['total_time'] > 0 for r in results)
+    reader.stop_stages()
+
+
+def test_stage_errors(staged_reader, make_info, make_collector):
+    reader = staged_reader
+
+    def process(info, frame, filename, processor=None, time_info=None):
+        raise ValueError('bad frame')
+
+    reader.process = process
+    reader.start_stages(filename='test.stream')
+    queue_frames(reader, [make_info(1)])
+    results = receive_results(reader, 1)
+    reader.stop_stages()
+    assert results[0]['state'] == 'error'
+    assert results[0]['dat_error'] == 'PROCESSING ERROR: bad frame'
+
+    # the Collector reports the error and carries on
+    collector = make_collector()
+    connect(collector)
+    collector.handle_results(codec.encode_results(results))
+    collector.handle_results(codec.encode_results([make_info(2)]))
+    assert collector.counter == 1
+
+
+def test_stop_stages(staged_reader, make_info):
+    reader = staged_reader
+    reader.batch_timeout = 60  # results are only sent on shutdown
+    reader.process = lambda info, **kwargs: info
+    reader.start_stages(filename='test.stream')
+    threads = list(reader.stage_threads)
+    queue_frames(reader, [make_info(n) for n in range(1, 4)])
+    reader.stop_stages()
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(receive_results(reader, 3)) == 3
+
+
+def test_collector_errors(make_collector, make_info):
+    collector = make_collector()
+    sent = []
+    collector.send_to_ui = sent.append
+    connect(collector)
+
+    # an error without a message, and a result from a reader that never
+    # connected, are reported and skipped; the results after them get through
+    error = dict(make_info(1), state='error')
+    unknown = dict(make_info(2), proc_name='ZMQ_099', state='unknown')
+    collector.handle_results(json.dumps([error, unknown, make_info(3)]).encode())
+    collector.handle_results(codec.encode_results([make_info(4)]))
+    assert collector.counter == 2
+    assert len(sent) == 2
+
+
+def test_read_stream_shutdown(make_reader, make_info, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # for the eiger_*.stream file
+    context = zmq.Context()  # not the Reader's, which it terminates on exit
+    splitter = context.socket(zmq.ROUTER)
+    port = splitter.bind_to_random_port('tcp://127.0.0.1')
+    sink = context.socket(zmq.PULL)
+    collector_port = sink.bind_to_random_port('tcp://127.0.0.1')
+
+    reader = make_reader('-b test')
+    reader.cfg['port'] = str(port)
+    reader.collector_address = lambda: ('127.0.0.1', collector_port)
+    reader.n_proc_threads = 1
+    reader.batch_timeout = 60  # the result is only sent on shutdown
+
+    def receive_frames():
+        # a result is pending when the Reader is told to exit
+        reader.post_result(make_info(1))
+        raise SystemExit(0)
+
+    reader.receive_frames = receive_frames
+    errors = []
+
+    def run():
+        try:
+            reader.read_stream()
+        except SystemExit as e:
+            errors.append(e)
+
+    thread = Thread(target=run)
+    try:
+        thread.start()
+        assert splitter.poll(timeout=5000)
+        request = splitter.recv_multipart()
+        splitter.send_multipart(request[:-1] + [b'frame'])
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert len(errors) == 1
+
+        states = []
+        while sink.poll(timeout=1000):
+            states.extend(r['state'] for r in codec.decode_results(sink.recv()))
+        assert [s for s in states if s != 'heartbeat'] == ['connected', 'process']
+        assert reader.stage_threads == []
+        assert reader.registry.base_context.closed
+    finally:
+        splitter.close(linger=0)
+        sink.close(linger=0)
+        context.term()
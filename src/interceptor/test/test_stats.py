@@ -0,0 +1,92 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for per-stage latency histograms
+"""
+
+import json
+
+import numpy as np
+
+from interceptor.connector import stats
+from interceptor.connector.output import make_latency_lines
+
+
+def test_buckets():
+    histogram = stats.LatencyHistogram(sub_bits=7)
+    previous = -1
+    for value_us in list(range(300)) + [10 ** n + k for n in range(3, 8)
+                                        for k in (-1, 0, 1)]:
+        index = histogram.bucket_index(value_us)
+        lower, width = histogram.bucket_range(index)
+        assert lower <= value_us < lower + width
+        assert width <= max(1, value_us / 64)
+        assert index >= previous
+        previous = index
+
+
+def test_percentiles():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=-4, sigma=1, size=10000)
+    histogram = stats.LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    assert histogram.count == len(values)
+    for p in stats.PERCENTILES:
+        expected = np.percentile(values, p)
+        assert abs(histogram.percentile(p) - expected) / expected < 0.02
+    assert histogram.summary()['max'] == values.max()
+
+
+def test_merge():
+    first, second, both = [stats.LatencyHistogram() for _ in range(3)]
+    for n in range(100):
+        (first if n % 3 else second).record(n / 1000)
+        both.record(n / 1000)
+
+    # through the sparse (JSON) representation, as reported by Readers
+    first.update(json.loads(json.dumps(second.to_dict())))
+    assert np.array_equal(first.counts, both.counts)
+    assert first.summary() == both.summary()
+
+
+def test_series_latency():
+    latency = stats.SeriesLatency()
+    for n in range(10):
+        latency.add({'proc_name': 'ZMQ_00{}'.format(n % 2 + 1), 'proc_time': 0.1,
+                     'total_time': 0.2})
+    latency.update('ZMQ_001', {'send': stats.StageHistograms(
+        stages=['send']).histograms['send'].to_dict()})
+    summary = latency.summary()
+    assert summary['global']['proc']['count'] == 10
+    assert set(summary['global']) == {'proc', 'total'}
+    assert summary['readers']['ZMQ_002']['total']['count'] == 5
+    assert len(make_latency_lines(summary)) == 1 + 2 + 2
+
+
+def test_collector_latency(make_info, make_collector):
+    collector = make_collector()
+    collector.send_to_ui = lambda ui_msg: None
+    collector.handle_results(json.dumps({
+        "proc_name": "ZMQ_002",
+        "proc_url": "tcp://localhost:9999",
+        "state": "connected",
+    }).encode())
+    infos = [make_info(n) for n in range(1, 4)]
+    infos[-1]['series'] += 1
+    for info in infos:
+        info['spf_time'] = 0.05
+    collector.handle_results(json.dumps(infos).encode())
+    histograms = stats.StageHistograms(stages=['serialize', 'send'])
+    histograms.add({'serialize_time': 0.001, 'send_time': 0.002})
+    collector.handle_results(json.dumps({
+        "proc_name": "ZMQ_002",
+        "state": "stats",
+        "latency": histograms.to_dict(),
+    }).encode())
+
+    summary = collector.make_status()['latency']
+    assert summary['series'] == infos[-1]['series']
+    assert summary['global']['spf']['count'] == 1
+    assert summary['global']['send']['count'] == 1
@@ -0,0 +1,147 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test for stream recording and replay
+"""
+
+import os
+import time
+from threading import Thread
+
+import numpy as np
+import pytest
+import zmq
+
+from interceptor.connector import streams
+
+MESSAGES = [
+    [b'{"htype": "dheader-1.0"}', b'{"header_detail": "basic"}'],
+    [b'frame', b'dimensions', b'\x00' * 1000, b'times'],
+    [b'{"htype": "dseries_end-1.0"}'],
+]
+
+
+def write_stream(path, messages=MESSAGES, interval=0.01):
+    with streams.StreamWriter(path) as writer:
+        for i, frames in enumerate(messages):
+            writer.write(frames, received=1000.0 + i * interval)
+
+
+def read_stream(path):
+    reader = streams.StreamReader(path)
+    messages = [[bytes(frame) for frame in frames] for frames in reader]
+    times = reader.times.tolist()
+    reader.close()
+    return messages, times
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / 'test.ixr')
+    write_stream(path)
+    messages, times = read_stream(path)
+    assert messages == MESSAGES
+    assert times == [1000.0, 1000.01, 1000.02]
+
+    # appending to an existing stream
+    write_stream(path, messages=MESSAGES[:1])
+    messages, _ = read_stream(path)
+    assert messages == MESSAGES + MESSAGES[:1]
+
+
+def test_index_recovery(tmp_path):
+    path = str(tmp_path / 'test.ixr')
+    write_stream(path)
+    os.remove(streams.index_path(path))
+    assert read_stream(path)[0] == MESSAGES
+    assert os.path.exists(streams.index_path(path))
+
+    # a recording that was cut short: the last (partial) record is dropped, and
+    # cut off when appending
+    with open(path, 'ab') as fh:
+        fh.write(streams.MESSAGE.pack(1001.0, 2) + b'\x01' * 10)
+    assert read_stream(path)[0] == MESSAGES
+    write_stream(path, messages=MESSAGES[1:2])
+    assert read_stream(path)[0] == MESSAGES + MESSAGES[1:2]
+
+
+def test_record_stream(tmp_path):
+    path = str(tmp_path / 'test.ixr')
+    context = zmq.Context()
+    source = context.socket(zmq.PUSH)
+    source.bind('inproc://record')
+    recorder = context.socket(zmq.PULL)
+    recorder.connect('inproc://record')
+    try:
+        for frames in MESSAGES:
+            source.send_multipart(frames)
+        with streams.StreamWriter(path) as writer:
+            n_recorded = streams.record_stream(recorder, writer, timeout=0.2)
+    finally:
+        source.close(linger=0)
+        recorder.close(linger=0)
+        context.term()
+    assert n_recorded == 3
+    assert read_stream(path)[0] == MESSAGES
+
+
+@pytest.mark.parametrize("rate, speed, expected", [
+    ('original', 1.0, 0.1),
+    ('original', 2.0, 0.05),
+    (100.0, 1.0, 0.1),
+    ('max', 1.0, 0.0),
+])
+def test_offsets(tmp_path, rate, speed, expected):
+    path = str(tmp_path / 'test.ixr')
+    write_stream(path, messages=MESSAGES * 4, interval=0.01)  # 12 messages
+    reader = streams.StreamReader(path)
+    offsets = streams.Replayer(reader, rate=rate, speed=speed, repeat=2).offsets()
+    reader.close()
+    assert len(offsets) == 24
+    assert np.all(np.diff(offsets) >= 0)
+    assert offsets[10] == pytest.approx(expected)
+    # the second repetition follows at the same rate
+    assert offsets[12] == pytest.approx(offsets[11] + offsets[1])
+
+
+@pytest.mark.parametrize("mode", ['push', 'router'])
+def test_replay(tmp_path, mode, make_frames):
+    path = str(tmp_path / 'test.ixr')
+    frames = make_frames()
+    write_stream(path, messages=[frames] * 5)
+    reader = streams.StreamReader(path)
+
+    context = zmq.Context()
+    source = context.socket(zmq.ROUTER if mode == 'router' else zmq.PUSH)
+    source.bind('inproc://replay')
+    sink = context.socket(zmq.REQ if mode == 'router' else zmq.PULL)
+    sink.connect('inproc://replay')
+    received = []
+    try:
+        replayer = streams.Replayer(reader, rate=50.0)
+        if mode == 'router':
+            thread = Thread(target=lambda: received.append(
+                replayer.replay(source, mode='router', timeout=5)))
+            thread.start()
+            for _ in range(5):
+                sink.send(b'ZMQ_001')
+                assert sink.poll(timeout=5000)
+                assert sink.recv_multipart() == frames
+            thread.join()
+            result = received[0]
+        else:
+            start = time.time()
+            result = replayer.replay(source)
+            for _ in range(5):
+                assert sink.poll(timeout=5000)
+                assert sink.recv_multipart() == frames
+            assert time.time() - start >= 0.08
+    finally:
+        source.close(linger=0)
+        sink.close(linger=0)
+        context.term()
+        reader.close()
+    assert result['sent'] == 5
+    assert result['elapsed'] >= 0.08  # 4 intervals at 50 Hz
+    assert len(replayer.send_times) == 5
+    assert np.all(np.diff(replayer.send_times) > 0)
@@ -0,0 +1,67 @@
+"""
+Author      : Cehovin, A.
+Created     : 10/17/2026
+Last Changed: 10/17/2026
+Description : Unit test and benchmark for the zero-copy frame receive path
+"""
+
+import tracemalloc
+
+import numpy as np
+import zmq
+
+from interceptor.connector import utils
+
+
+def receive_and_convert(reader, frames, n_frames=3):
+    """ Sends test multiparts over an inproc socket pair and measures the peak
+    memory allocated per frame while receiving and converting them to a data
+    dictionary, which is the amount of payload copied by the Reader """
+    context = zmq.Context.instance()
+    sender = context.socket(zmq.PUSH)
+    receiver = context.socket(zmq.PULL)
+    sender.bind('inproc://zero_copy_test')
+    receiver.connect('inproc://zero_copy_test')
+
+    peaks = []
+    try:
+        for _ in range(n_frames):
+            sender.send_multipart(frames)
+            tracemalloc.start()
+            received = receiver.recv_multipart(copy=not reader.zero_copy)
+            data, info = reader.make_data_dict(received)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks.append(peak)
+    finally:
+        sender.close(linger=0)
+        receiver.close(linger=0)
+    return sum(peaks) / len(peaks), received, data, info
+
+
+def test_zero_copy_payload(make_reader, make_frames):
+    reader = make_reader('-b test --zero_copy')
+    payload_size = len(make_frames()[4])
+    _, frames, data, info = receive_and_convert(reader, make_frames(), n_frames=1)
+    assert info['state'] == 'process'
+    assert info['frame'] == 1
+    # payload must be a view on the received frame, not a copy
+    assert isinstance(data['streamfile_3'], memoryview)
+    image = utils.frame_to_array(data['streamfile_3'], dtype=np.uint32)
+    assert np.shares_memory(image, utils.frame_to_array(frames[4], dtype=np.uint32))
+    assert image[-1] == payload_size // 4 - 1
+    assert 'shape' in bytes(data['streamfile_2']).decode()
+
+
+def test_bytes_copied_per_frame(make_reader, make_frames):
+    frames = make_frames()
+    payload_size = len(frames[4])
+    copy_bytes, _, copy_data, _ = receive_and_convert(make_reader('-b test'), frames)
+    zc_bytes, _, zc_data, _ = receive_and_convert(
+        make_reader('-b test --zero_copy'), frames)
+
+    print('\nBytes copied per frame: {:.0f} (copy), {:.0f} (zero-copy)'.format(
+        copy_bytes, zc_bytes))
+    assert bytes(copy_data['streamfile_3']) == bytes(zc_data['streamfile_3'])
+    assert copy_bytes >= payload_size
+    assert zc_bytes < payload_size // 100